@@ -0,0 +1,82 @@
+import sys, os, time, argparse
+import cv2
+import numpy as np
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src import config  # noqa: E402
+from src.engine import LaneMeasurer  # noqa: E402
+from src.measurement import pixel_to_real_world  # noqa: E402
+from synthetic import synthetic_intrinsics, distort_maps, lane_row_track, road_frame  # noqa: E402
+
+CM_PER_ROAD_PX = 0.5
+
+
+def keystone(size, squeeze):
+    """Road texture (top-down, CM_PER_ROAD_PX) -> camera image: the far edge squeezed to 1 - squeeze of the width."""
+    w, h = size
+    road = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+    image = np.float32([[squeeze * w / 2, 0], [w - squeeze * w / 2, 0], [w, h], [0, h]])
+    P = cv2.getPerspectiveTransform(road, image)
+    H = np.diag([CM_PER_ROAD_PX, CM_PER_ROAD_PX, 1.0]) @ np.linalg.inv(P)
+    return P, H / H[2, 2]
+
+
+def truth_cm(rows, wheel, H):
+    """Distance from the wheel to the (flat) lane edge along the road line under the wheel's image column."""
+    origin = np.array(pixel_to_real_world(wheel, H))
+    along = np.array(pixel_to_real_world((wheel[0], wheel[1] - 1), H)) - origin
+    along /= np.linalg.norm(along)
+    return (rows * CM_PER_ROAD_PX - origin[1]) / along[1] + config.WHEEL_OFFSET_CM
+
+
+def run(measurer, frames, repeat):
+    best, cm = 0.0, None
+    for _ in range(repeat):
+        measurer.reset()
+        t0 = time.perf_counter()
+        cm = np.array([np.nan if m.cm_to_lane is None else m.cm_to_lane
+                       for m in measurer.process_stream(frames)])
+        best = max(best, len(frames) / (time.perf_counter() - t0))
+    return cm, best
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Image-space detection (whole frame) vs the bird's-eye road patch "
+                                            "under a perspective camera: speed, patch size, cm accuracy.")
+    p.add_argument("--width", type=int, default=1920, help="Frame width. Default=1920")
+    p.add_argument("--height", type=int, default=1080, help="Frame height. Default=1080")
+    p.add_argument("--frames", type=int, default=200, help="Synthetic frames. Default=200")
+    p.add_argument("--squeeze", type=float, default=0.4,
+                   help="Perspective: fraction of the far road edge's width lost in the image. Default=0.4")
+    p.add_argument("--repeat", type=int, default=3, help="Passes over the frames (best is kept). Default=3")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    size = (args.width, args.height)
+    camera_matrix, dist_coeffs = synthetic_intrinsics(*size)
+    dmaps = distort_maps(camera_matrix, dist_coeffs, size)
+    P, H = keystone(size, args.squeeze)
+
+    rng = np.random.default_rng(1)
+    rows = lane_row_track(args.frames, args.height)
+    frames = [cv2.remap(cv2.warpPerspective(road_frame(size, r, rng, slope=0.0), P, size),
+                        dmaps[0], dmaps[1], cv2.INTER_LINEAR) for r in rows]
+    wheel = (int(0.55 * args.width), int(0.62 * args.height))
+    truth = truth_cm(rows, wheel, H)
+
+    print(f"[bench] frame size {size}, {len(frames)} frames, keystone squeeze {args.squeeze}")
+    for label, birdseye in (("image", False), ("bird's-eye", True)):
+        measurer = LaneMeasurer(camera_matrix, dist_coeffs, H, wheel, size, cache_dir=None, birdseye=birdseye)
+        x0, y0, x1, y1 = measurer.roi.rect
+        cm, fps = run(measurer, frames, args.repeat)
+        err = np.abs(cm - truth)[~np.isnan(cm)]
+        print(f"[bench] {label:<10}: patch {x1 - x0}x{y1 - y0}, {fps:6.1f} frames/sec, "
+              f"{len(err)}/{len(frames)} valid, |error| mean {err.mean():5.2f} cm, "
+              f"p95 {np.percentile(err, 95):5.2f} cm, max {err.max():5.2f} cm")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import sys, os, time, argparse, resource, tracemalloc
+import cv2
+import numpy as np
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src import config  # noqa: E402
+from src.detection import FrameBuffers, prepare_frame, filter_contours  # noqa: E402
+from src.undistort import get_undistort_maps, undistort  # noqa: E402
+from src.roi import make_strip_roi  # noqa: E402
+from synthetic import synthetic_intrinsics, distort_maps, lane_row_track, road_frame  # noqa: E402
+
+
+def reference_prepare(frame, maps, roi):
+    """The previous per-frame code: a new array from every step, kernel rebuilt per frame."""
+    if roi is None:
+        image = undistort(frame, maps)
+    else:
+        sx0, sy0, sx1, sy1 = roi.src_rect
+        image = undistort(frame[sy0:sy1, sx0:sx1], roi.maps)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(gray, config.GAUSSIAN_KERNEL, 0)
+    adaptive = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY,
+                                     blockSize=config.BLOCK_SIZE, C=config.C_CONST)
+    adaptive = filter_contours(adaptive, out=adaptive)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, config.MORPH_KERNEL)
+    adaptive = cv2.morphologyEx(adaptive, cv2.MORPH_CLOSE, kernel, iterations=1)
+    return cv2.morphologyEx(adaptive, cv2.MORPH_OPEN, kernel, iterations=1)
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def run(variants, frames, n_iter, samples=10):
+    """
+    Per variant: median ms/frame, minor page faults/frame (fresh pages from the
+    OS) and RSS samples over the run. The variants take turns frame by frame,
+    so drift on a busy machine hits them alike.
+    """
+    times = {label: [] for label in variants}
+    faults = dict.fromkeys(variants, 0)
+    rss = {label: [] for label in variants}
+    for i in range(n_iter):
+        frame = frames[i % len(frames)]
+        for label, prepare in variants.items():
+            faults0 = resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+            t0 = time.perf_counter()
+            prepare(frame)
+            times[label].append(time.perf_counter() - t0)
+            faults[label] += resource.getrusage(resource.RUSAGE_SELF).ru_minflt - faults0
+            if i % max(1, n_iter // samples) == 0:
+                rss[label].append(rss_mb())
+    return {label: (float(np.median(times[label])) * 1000, faults[label] / n_iter, rss[label])
+            for label in variants}
+
+
+def transient_kb(prepare, frames):
+    """
+    Mean per-frame peak of memory allocated and released again within the frame
+    (NumPy arrays OpenCV returns are traced by tracemalloc): what the allocator
+    has to hand out and take back every frame.
+    """
+    tracemalloc.start()
+    peaks = []
+    for frame in frames:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        prepare(frame)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    return float(np.mean(peaks)) / 1e3
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Fresh arrays per frame vs preallocated FrameBuffers: "
+                                            "speed, per-frame allocations and RSS over a long run.")
+    p.add_argument("--width", type=int, default=1920, help="Frame width. Default=1920")
+    p.add_argument("--height", type=int, default=1080, help="Frame height. Default=1080")
+    p.add_argument("--iterations", type=int, default=2000, help="Frames per variant. Default=2000")
+    p.add_argument("--strip", action="store_true",
+                   help="Process the strip around the wheel point (as a strip frame store holds) instead of "
+                        "whole frames")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    size = (args.width, args.height)
+    camera_matrix, dist_coeffs = synthetic_intrinsics(*size)
+    maps = get_undistort_maps(camera_matrix, dist_coeffs, size, cache_dir=None)
+    dmaps = distort_maps(camera_matrix, dist_coeffs, size)
+    rng = np.random.default_rng(1)
+    frames = [road_frame(size, r, rng, distort=dmaps) for r in lane_row_track(16, args.height)]
+    wheel = (int(0.55 * args.width), int(0.62 * args.height))
+    roi = make_strip_roi(maps, wheel[0], wheel[1], size) if args.strip else None
+
+    # same binary images from both
+    buffers = FrameBuffers()
+    same = all(np.array_equal(reference_prepare(f, maps, roi), prepare_frame(f, maps, roi, buffers=buffers)[0])
+               for f in frames)
+
+    variants = {"fresh arrays": lambda f: reference_prepare(f, maps, roi),
+                "FrameBuffers": lambda f: prepare_frame(f, maps, roi, buffers=buffers)[0]}
+    results = run(variants, frames, args.iterations)
+
+    shape = "full frame" if roi is None else f"ROI {roi.rect[2] - roi.rect[0]}x{roi.rect[3] - roi.rect[1]}"
+    print(f"[bench] frame size {size}, {shape}, {args.iterations} frames per variant")
+    for label, prepare in variants.items():
+        ms, faults, rss = results[label]
+        print(f"[bench] {label:<13}: {ms:6.2f} ms/frame (median), {transient_kb(prepare, frames):8.1f} kB "
+              f"allocated+freed/frame, {faults:5.2f} page faults/frame, "
+              f"RSS {rss[0]:.1f} → {rss[-1]:.1f} MB (max {max(rss):.1f})")
+    print(f"[bench] binary images identical: {same}")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
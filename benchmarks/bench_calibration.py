@@ -0,0 +1,85 @@
+import sys, os, time, argparse, tempfile, contextlib, io
+import cv2
+import numpy as np
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.calibration import calibrate_camera, detect_images, _make_object_points  # noqa: E402
+from synthetic import write_chessboard_set  # noqa: E402
+
+
+def reference_detect(image_files, chessboard_dims):
+    """The original serial full-resolution detection loop, kept as the reference."""
+    crit = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 1e-3)
+    results = []
+    for fname in image_files:
+        gray = cv2.cvtColor(cv2.imread(fname), cv2.COLOR_BGR2GRAY)
+        found, corners = cv2.findChessboardCorners(gray, chessboard_dims, None)
+        corners = cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), crit) if found else None
+        results.append((gray.shape[::-1], corners))
+    return results
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Serial full-res vs parallel coarse-to-fine chessboard detection.")
+    p.add_argument("--width", type=int, default=3000, help="Image width. Default=3000 (6 MP)")
+    p.add_argument("--height", type=int, default=2000, help="Image height. Default=2000")
+    p.add_argument("--images", type=int, default=8, help="Images with a board. Default=8")
+    p.add_argument("--empty", type=int, default=2, help="Images without a board. Default=2")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    dims = (9, 6)
+    tmp = tempfile.mkdtemp(prefix="bench_calibration_")
+    files = write_chessboard_set(os.path.join(tmp, "images"), (args.width, args.height), dims,
+                                 args.images, args.empty, ext=".jpg")
+    cache = os.path.join(tmp, "cache")
+
+    t0 = time.perf_counter()
+    ref = reference_detect(files, dims)
+    t_ref = time.perf_counter() - t0
+    print(f"[bench] serial full-res      : {t_ref:6.2f} s")
+
+    t0 = time.perf_counter()
+    new = detect_images(files, dims, args.workers, cache_dir=cache)
+    t_new = time.perf_counter() - t0
+    print(f"[bench] coarse-to-fine ({args.workers}w) : {t_new:6.2f} s ({t_ref / t_new:.1f}x)")
+
+    t0 = time.perf_counter()
+    cached = detect_images(files, dims, args.workers, cache_dir=cache)
+    t_cached = time.perf_counter() - t0
+    print(f"[bench] cached rerun         : {t_cached:6.2f} s ({t_ref / t_cached:.1f}x)")
+
+    found_ref = [c is not None for _, c in ref]
+    found_new = [c is not None for _, c in new]
+    same_cache = all((a is None and b is None) or np.array_equal(a, b)
+                     for (_, a), (_, b) in zip(new, cached))
+    diffs = [np.abs(a - b).max() for (_, a), (_, b) in zip(ref, new) if a is not None and b is not None]
+    print(f"[bench] boards found         : serial {sum(found_ref)}/{len(files)}, "
+          f"coarse-to-fine {sum(found_new)}/{len(files)}, same images: {found_ref == found_new}")
+    print(f"[bench] corner difference    : max {max(diffs, default=0):.4f} px")
+    print(f"[bench] cache reproduces     : {same_cache}")
+
+    # calibration from both sets of corners
+    objp = _make_object_points(dims, 25.0)
+    size = ref[0][0]
+    results = []
+    for dets in (ref, new):
+        imgpoints = [c for _, c in dets if c is not None]
+        results.append(cv2.calibrateCamera([objp] * len(imgpoints), imgpoints, size, None, None))
+    (rms_a, K_a, d_a, _, _), (rms_b, K_b, d_b, _, _) = results
+    print(f"[bench] RMS                  : serial {rms_a:.5f}  coarse-to-fine {rms_b:.5f}")
+    print(f"[bench] fx/fy/cx/cy change   : {np.abs(K_a - K_b)[[0, 1, 0, 1], [0, 1, 2, 2]].max():.4f} px")
+    print(f"[bench] dist coeffs change   : {np.abs(d_a - d_b).max():.2e}")
+
+    # end to end through the public API (cached)
+    with contextlib.redirect_stdout(io.StringIO()):
+        out = calibrate_camera(files, dims, 25.0, workers=args.workers, cache_dir=cache, max_views=None)
+    print(f"[bench] calibrate_camera     : RMS {out[2]:.5f}, {out[4]} images used")
+
+
+if __name__ == "__main__":
+    main()
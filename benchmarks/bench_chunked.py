@@ -0,0 +1,57 @@
+import sys, os, time, argparse, filecmp, tempfile
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.pipeline import measure_video  # noqa: E402
+from src.chunking import measure_video_chunked  # noqa: E402
+from synthetic import (synthetic_intrinsics, synthetic_homography, distort_maps,  # noqa: E402
+                       write_road_video, write_calibration, write_homography)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Sequential vs chunked measurement: speed and CSV equivalence.")
+    p.add_argument("--width", type=int, default=960, help="Frame width. Default=960")
+    p.add_argument("--height", type=int, default=540, help="Frame height. Default=540")
+    p.add_argument("--frames", type=int, default=600, help="Synthetic video length. Default=600")
+    p.add_argument("--chunks", type=int, default=4, help="Chunks. Default=4")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    size = (args.width, args.height)
+    tmp = tempfile.mkdtemp(prefix="bench_chunked_")
+    video = os.path.join(tmp, "drive.mp4")
+    calib = os.path.join(tmp, "calib.npz")
+    homog = os.path.join(tmp, "homography.json")
+
+    camera_matrix, dist_coeffs = synthetic_intrinsics(*size)
+    write_road_video(video, size, args.frames, distort=distort_maps(camera_matrix, dist_coeffs, size))
+    write_calibration(calib, camera_matrix, dist_coeffs, size)
+    write_homography(homog, synthetic_homography())
+    wheel = (int(0.55 * args.width), int(0.62 * args.height))
+
+    seq_csv = os.path.join(tmp, "sequential.csv")
+    t0 = time.perf_counter()
+    measure_video(video, homog, wheel, calib, seq_csv, progress=False)
+    t_seq = time.perf_counter() - t0
+    print(f"[bench] sequential        : {t_seq:.2f} s ({args.frames / t_seq:.1f} frames/sec)")
+
+    ok = True
+    # warmup=0 and keyframe_interval=1 force every chunk through the re-run fallback
+    for warmup, kf in ((30, None), (5, 1), (0, 1)):
+        out_csv = os.path.join(tmp, f"chunked_w{warmup}.csv")
+        stats = measure_video_chunked(video, homog, wheel, calib, out_csv, n_chunks=args.chunks,
+                                      workers=args.workers, warmup=warmup, keyframe_interval=kf)
+        same = filecmp.cmp(seq_csv, out_csv, shallow=False)
+        ok &= same
+        print(f"[bench] chunked warmup={warmup:<3}: {stats['seconds']:.2f} s, {stats['chunks']} chunks, "
+              f"{stats['reruns']} re-runs, identical CSV: {same}")
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import sys, os, time, argparse, tempfile, filecmp
+import cv2
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.pipeline import measure_video  # noqa: E402
+from synthetic import (synthetic_intrinsics, synthetic_homography, distort_maps,  # noqa: E402
+                       write_road_video, write_calibration, write_homography)
+
+
+def video_info(path):
+    cap = cv2.VideoCapture(path)
+    info = (int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    cap.release()
+    return info
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Cost of each debug video mode (off/all/every/events/scaled).")
+    p.add_argument("--width", type=int, default=1280, help="Frame width. Default=1280")
+    p.add_argument("--height", type=int, default=720, help="Frame height. Default=720")
+    p.add_argument("--frames", type=int, default=600, help="Synthetic video length. Default=600")
+    p.add_argument("--threads", type=int, default=0, help="Pipeline threads (measure_video threads=). Default=0")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    size = (args.width, args.height)
+    tmp = tempfile.mkdtemp(prefix="bench_debug_video_")
+    video = os.path.join(tmp, "drive.mp4")
+    calib = os.path.join(tmp, "calib.npz")
+    homog = os.path.join(tmp, "homography.json")
+
+    camera_matrix, dist_coeffs = synthetic_intrinsics(*size)
+    write_road_video(video, size, args.frames, distort=distort_maps(camera_matrix, dist_coeffs, size))
+    write_calibration(calib, camera_matrix, dist_coeffs, size)
+    write_homography(homog, synthetic_homography())
+    wheel = (int(0.55 * args.width), int(0.62 * args.height))
+
+    modes = (("off", {"debug_mode": "off"}),
+             ("all", {"debug_mode": "all"}),
+             ("all, scale 0.5", {"debug_mode": "all", "debug_scale": 0.5}),
+             ("every 10", {"debug_mode": "every", "debug_every": 10}),
+             ("events, context 3", {"debug_mode": "events", "debug_context": 3}))
+
+    ok = True
+    ref_csv = None
+    t_off = None
+    for label, kw in modes:
+        out_csv = os.path.join(tmp, f"{label.replace(' ', '_').replace(',', '')}.csv")
+        out_vid = out_csv.replace(".csv", "_debug.mp4")
+        t0 = time.perf_counter()
+        stats = measure_video(video, homog, wheel, calib, out_csv, out_video_path=out_vid,
+                              progress=False, threads=args.threads, **kw)
+        seconds = time.perf_counter() - t0
+        t_off = t_off or seconds
+        ref_csv = ref_csv or out_csv
+        same = filecmp.cmp(ref_csv, out_csv, shallow=False)
+        ok &= same
+        line = f"[bench] {label:<17}: {seconds:6.2f} s ({seconds / t_off:4.2f}x off)  same CSV: {same}"
+        if kw["debug_mode"] != "off":
+            n, w, h = video_info(out_vid)
+            ok &= n == stats["debug_frames"]
+            line += (f"  {stats['debug_frames']:>4} frames {w}x{h}, "
+                     f"{os.path.getsize(out_vid) / 1e6:.1f} MB, "
+                     f"main-thread wait {stats['stage_seconds'].get('encode', 0.0):.2f} s")
+        print(line)
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
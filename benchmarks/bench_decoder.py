@@ -0,0 +1,125 @@
+import sys, os, time, argparse, tempfile, shutil
+import cv2
+import numpy as np
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src import config  # noqa: E402
+from src.measurement import pixel_to_real_world, lateral_positions  # noqa: E402
+from src.pipeline import measure_video  # noqa: E402
+from src.decoder import open_decoder  # noqa: E402
+from synthetic import (synthetic_intrinsics, synthetic_homography, distort_maps,  # noqa: E402
+                       write_road_video, write_calibration, write_homography, lane_edge_truth, DROPOUT_EVERY)
+
+
+def ffmpeg_parity(video, max_mean_level=1.0, max_level=2, max_ms=1.0):
+    """
+    Frame-by-frame check of the ffmpeg decoder against OpenCV BGR decoding +
+    cvtColor: same frame count, timestamps within max_ms, grey levels within
+    max_mean_level on average and max_level for 99.9% of pixels. Returns a list
+    of failures (empty when it matches), or None without ffmpeg/ffprobe.
+    """
+    if not (shutil.which("ffmpeg") and shutil.which("ffprobe")):
+        return None
+    failures = []
+    ref, dec = open_decoder(video), open_decoder(video, "ffmpeg")
+    try:
+        while True:
+            a, b = ref.read(), dec.read()
+            if a is None or b is None:
+                if a is not None or b is not None:
+                    failures.append(f"frame count differs: {'ffmpeg' if a else 'opencv'} ended at frame "
+                                    f"{(a or b)[0]}")
+                break
+            idx, ts, frame = a
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            diff = np.abs(gray.astype(np.int16) - b[2])
+            if abs(ts - b[1]) > max_ms:
+                failures.append(f"frame {idx}: timestamp {b[1]:.2f} ms vs {ts:.2f} ms")
+            if diff.mean() > max_mean_level or np.percentile(diff, 99.9) > max_level:
+                failures.append(f"frame {idx}: grey levels off by {diff.mean():.2f} on average, "
+                                f"{np.percentile(diff, 99.9):.0f} at the 99.9th percentile")
+    finally:
+        ref.release()
+        dec.release()
+    return failures
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Decoder settings on one synthetic drive: BGR vs luma-only decoding, "
+                                            "decode threads and decode-time downscaling; ms/frame and cm error.")
+    p.add_argument("--width", type=int, default=1920, help="Frame width. Default=1920")
+    p.add_argument("--height", type=int, default=1080, help="Frame height. Default=1080")
+    p.add_argument("--frames", type=int, default=150, help="Synthetic video length. Default=150")
+    p.add_argument("--decode-threads", type=int, default=2, help="Decoder threads for the threaded case. Default=2")
+    p.add_argument("--check", action="store_true",
+                   help="Only check the ffmpeg decoder's frames and timestamps against OpenCV (skipped, "
+                        "exit 0, without ffmpeg/ffprobe; exit 1 on a mismatch)")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    size = (args.width, args.height)
+    tmp = tempfile.mkdtemp(prefix="bench_decoder_")
+    video = os.path.join(tmp, "drive.mp4")
+    calib = os.path.join(tmp, "calib.npz")
+    homog = os.path.join(tmp, "homography.json")
+
+    camera_matrix, dist_coeffs = synthetic_intrinsics(*size)
+    H = synthetic_homography()
+    rows = write_road_video(video, size, args.frames, distort=distort_maps(camera_matrix, dist_coeffs, size))
+    write_calibration(calib, camera_matrix, dist_coeffs, size)
+    write_homography(homog, H)
+
+    failures = ffmpeg_parity(video)
+    if failures is None:
+        print("[bench] ffmpeg/ffprobe not found: skipping the ffmpeg parity check and decoder")
+    else:
+        for failure in failures[:10]:
+            print(f"[bench] ffmpeg parity: {failure}")
+        print(f"[bench] ffmpeg frames and timestamps match OpenCV: {not failures}")
+    if args.check:
+        shutil.rmtree(tmp, ignore_errors=True)
+        sys.exit(1 if failures else 0)
+
+    wheel = (int(0.55 * args.width), int(0.62 * args.height))
+    truth_y = lane_edge_truth(rows, wheel[0], args.width, config.COLUMN_WIDTH)
+    truth_cm = lateral_positions(pixel_to_real_world(wheel, H),
+                                 np.column_stack([np.full(len(rows), wheel[0]), truth_y]), H)
+    has_lane = np.arange(len(rows)) % DROPOUT_EVERY != DROPOUT_EVERY - 1
+
+    cases = [("opencv BGR", {}),
+             ("opencv luma", {"luma": True}),
+             (f"luma, {args.decode_threads} dec threads", {"luma": True, "decode_threads": args.decode_threads}),
+             ("luma, downscale 0.5", {"luma": True, "downscale": 0.5})]
+    if failures is not None:
+        cases.append(("ffmpeg pipe", {"decoder": "ffmpeg"}))
+
+    print(f"[bench] frame size {size}, {args.frames} frames")
+    base_cm = None
+    for label, kw in cases:
+        out_npz = os.path.join(tmp, "m.npz")
+        t0 = time.perf_counter()
+        stats = measure_video(video, homog, wheel, calib, os.path.join(tmp, "m.csv"), progress=False,
+                              out_npz_path=out_npz, **kw)
+        seconds = time.perf_counter() - t0
+        with np.load(out_npz) as data:
+            frames, cm = data["frame"], data["cm_to_lane"]
+        n = max(1, len(frames))
+        hit = has_lane[frames] & ~np.isnan(cm)
+        err = np.abs(cm - truth_cm[frames])[hit]
+        if base_cm is None:
+            base_cm = cm
+        both = ~np.isnan(cm) & ~np.isnan(base_cm)
+        st = stats["stage_seconds"]
+        print(f"[bench] {label:<24}: {seconds / n * 1000:6.2f} ms/frame (decode {st['decode'] / n * 1000:5.2f}, "
+              f"process {st['process'] / n * 1000:5.2f}), detected {hit.sum()}/{has_lane.sum()}, "
+              f"|error| mean {err.mean():.2f} cm, vs BGR max {np.abs(cm - base_cm)[both].max():.2f} cm")
+    shutil.rmtree(tmp, ignore_errors=True)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import sys, os, time, argparse
+import numpy as np
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.engine import LaneMeasurer  # noqa: E402
+from src.measurement import pixel_to_real_world, lateral_position  # noqa: E402
+from src.undistort import get_undistort_maps  # noqa: E402
+from src.detection import prepare_frame, search_band  # noqa: E402
+from synthetic import (synthetic_intrinsics, synthetic_homography, distort_maps,  # noqa: E402
+                       lane_row_track, road_frame)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="LaneMeasurer.process_frame vs a hand-written prepare_frame/"
+                                            "search_band loop: speed and cm_to_lane parity.")
+    p.add_argument("--width", type=int, default=1920, help="Frame width. Default=1920")
+    p.add_argument("--height", type=int, default=1080, help="Frame height. Default=1080")
+    p.add_argument("--frames", type=int, default=200, help="Synthetic frames. Default=200")
+    p.add_argument("--repeat", type=int, default=3, help="Passes over the frames (best is kept). Default=3")
+    return p.parse_args()
+
+
+def per_call(frames, camera_matrix, dist_coeffs, H, wheel, size):
+    """What an embedding caller had to do before: set everything up and thread the state by hand."""
+    maps = get_undistort_maps(camera_matrix, dist_coeffs, size, cache_dir=None)
+    real_wheel = pixel_to_real_world(wheel, H)
+    prev, out = None, []
+    for frame in frames:
+        binary, _, x0 = prepare_frame(frame, maps)
+        band = search_band(binary, x0, wheel[0], wheel[1], prev)
+        if band:
+            prev = (wheel[0], band.lane_y)
+            out.append(lateral_position(real_wheel, prev, H))
+        else:
+            out.append(np.nan)
+    return np.array(out)
+
+
+def engine(frames, camera_matrix, dist_coeffs, H, wheel, size):
+    measurer = LaneMeasurer(camera_matrix, dist_coeffs, H, wheel, size, cache_dir=None)
+    return np.array([np.nan if m.cm_to_lane is None else m.cm_to_lane
+                     for m in measurer.process_stream(frames)])
+
+
+def best_fps(fn, frames, repeat, *args):
+    best, result = 0.0, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(frames, *args)
+        best = max(best, len(frames) / (time.perf_counter() - t0))
+    return result, best
+
+
+def main():
+    args = parse_args()
+    size = (args.width, args.height)
+    camera_matrix, dist_coeffs = synthetic_intrinsics(*size)
+    dmaps = distort_maps(camera_matrix, dist_coeffs, size)
+    H = synthetic_homography()
+
+    rng = np.random.default_rng(1)
+    rows = lane_row_track(args.frames, args.height)
+    frames = [road_frame(size, r, rng, distort=dmaps, dropout=(i % 17 == 16)) for i, r in enumerate(rows)]
+    wheel = (int(0.55 * args.width), int(0.62 * args.height))
+
+    setup = (camera_matrix, dist_coeffs, H, wheel, size)
+    ref, fps_ref = best_fps(per_call, frames, args.repeat, *setup)
+    new, fps_new = best_fps(engine, frames, args.repeat, *setup)
+
+    same = np.array_equal(ref, new, equal_nan=True)
+    print(f"[bench] frame size       : {size}, {len(frames)} frames")
+    print(f"[bench] hand-written loop: {fps_ref:.1f} frames/sec (setup included)")
+    print(f"[bench] LaneMeasurer     : {fps_new:.1f} frames/sec ({fps_new / fps_ref:.2f}x, setup included)")
+    print(f"[bench] cm_to_lane identical: {same}")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
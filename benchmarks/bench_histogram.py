@@ -0,0 +1,131 @@
+import sys, os, time, argparse
+import numpy as np
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src import config  # noqa: E402
+from src.detection import find_lane_band  # noqa: E402
+
+
+def reference_find_lane_line_by_histogram(binary_img, wheel_x, wheel_y, prev_detection=None):
+    """The original per-row Python loop, kept as the reference implementation."""
+    x_min = max(0, wheel_x - config.COLUMN_WIDTH)
+    x_max = min(binary_img.shape[1], wheel_x + config.COLUMN_WIDTH)
+    strip = binary_img[0:wheel_y, x_min:x_max]
+    if strip.size == 0:
+        return None
+
+    histogram = np.sum(strip == 255, axis=1).astype(np.float32)
+    if histogram.max() == 0:
+        return None
+
+    peak_threshold = histogram.max() * 0.2
+    above = histogram >= peak_threshold
+
+    continuous_peaks = []
+    start = None
+    for i, is_peak in enumerate(above):
+        if is_peak and start is None:
+            start = i
+        elif not is_peak and start is not None:
+            end = i - 1
+            length = end - start + 1
+            total = histogram[start:end+1].sum()
+            if length >= config.MIN_LANE_WIDTH and total >= (config.MIN_LANE_WIDTH * 2):
+                continuous_peaks.append((start, end, length, total))
+            start = None
+    if start is not None:
+        end = len(above) - 1
+        length = end - start + 1
+        total = histogram[start:end+1].sum()
+        if length >= config.MIN_LANE_WIDTH and total >= (config.MIN_LANE_WIDTH * 2):
+            continuous_peaks.append((start, end, length, total))
+
+    if not continuous_peaks:
+        return None
+
+    # prefer temporal continuity if available
+    best_peak = None
+    if prev_detection is not None:
+        prev_row = prev_detection[1]
+        candidates = [p for p in continuous_peaks if abs((p[0] + p[1]) / 2 - prev_row) <= config.MAX_JUMP]
+        if candidates:
+            best_peak = max(candidates, key=lambda p: p[3])
+
+    # fallback: strongest, then nearer center
+    if best_peak is None:
+        img_center = len(histogram) / 2
+        best_peak = max(continuous_peaks, key=lambda p: (p[3], -abs(((p[0] + p[1]) / 2) - img_center)))
+
+    start_idx, end_idx, _, _ = best_peak
+    band_top, band_bottom = start_idx, end_idx
+
+    # pick the farther side from the wheel
+    d_top = abs(wheel_y - band_top)
+    d_bottom = abs(wheel_y - band_bottom)
+    lane_y = band_top if d_top >= d_bottom else band_bottom
+
+    return (wheel_x, lane_y)
+
+
+def vectorized(binary_img, wheel_x, wheel_y, prev_detection=None):
+    """find_lane_band, reduced to the reference's (wheel_x, lane_y) result."""
+    band = find_lane_band(binary_img, wheel_x, wheel_y, prev_detection)
+    return (wheel_x, band.lane_y) if band else None
+
+
+def random_strip(rng, height, width):
+    """Binary strip with random bands (some wider than the strip), gaps and speckle."""
+    img = np.zeros((height, width), np.uint8)
+    for _ in range(rng.integers(0, 6)):
+        top = rng.integers(0, height)
+        band_h = rng.integers(1, max(2, height // 4))
+        cols = rng.integers(1, width + 1)
+        img[top:top + band_h, :cols] = 255
+    speckle = rng.random((height, width)) < rng.uniform(0, 0.3)
+    img[speckle] = 255
+    holes = rng.random((height, width)) < rng.uniform(0, 0.2)
+    img[holes] = 0
+    return img
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Vectorized vs loop histogram search: equivalence + speed.")
+    p.add_argument("--cases", type=int, default=5000, help="Randomized equivalence cases. Default=5000")
+    p.add_argument("--repeat", type=int, default=2000, help="Timing repetitions per height. Default=2000")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(0)
+    width = 2 * config.COLUMN_WIDTH + 1
+    wheel_x = config.COLUMN_WIDTH
+
+    # randomized property check: identical output for any strip and prev_detection
+    for case in range(args.cases):
+        height = int(rng.integers(1, 400))
+        img = random_strip(rng, height + int(rng.integers(0, 20)), width)
+        prev = None if rng.random() < 0.3 else (wheel_x, int(rng.integers(0, height + 1)))
+        a = reference_find_lane_line_by_histogram(img, wheel_x, height, prev)
+        b = vectorized(img, wheel_x, height, prev)
+        if a != b:
+            print(f"[bench] MISMATCH case {case}: height={height} prev={prev} loop={a} vectorized={b}")
+            sys.exit(1)
+    print(f"[bench] equivalence: {args.cases} random strips identical")
+
+    for height in (120, 480, 1080, 2160):
+        img = random_strip(rng, height, width)
+        prev = (wheel_x, height // 2)
+        timings = []
+        for fn in (reference_find_lane_line_by_histogram, vectorized):
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                fn(img, wheel_x, height, prev)
+            timings.append((time.perf_counter() - t0) / args.repeat * 1e6)
+        print(f"[bench] strip height {height:>4}: loop {timings[0]:8.1f} us  "
+              f"vectorized {timings[1]:7.1f} us  ({timings[0] / timings[1]:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import sys, os, time, argparse, tempfile
+import cv2
+import numpy as np
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.homography import compute_homography, estimate_homography, board_points_cm  # noqa: E402
+from src.measurement import pixels_to_real_world  # noqa: E402
+from synthetic import synthetic_intrinsics, distort_maps, chessboard_texture  # noqa: E402
+
+DIMS = (8, 5)
+CELL_CM = (12.0, 10.0)
+SQUARE_PX = 40  # texture pixels per board square
+
+
+def road_camera(size):
+    """Road (cm, board's first inner corner = origin) -> undistorted image, seen from a low, pitched camera."""
+    w, h = size
+    road = np.float32([[-60, -40], [160, -40], [160, 120], [-60, 120]])
+    image = np.float32([[0.3 * w, 0.25 * h], [0.7 * w, 0.25 * h], [0.97 * w, 0.95 * h], [0.03 * w, 0.95 * h]])
+    return cv2.getPerspectiveTransform(road, image)
+
+
+def write_board_video(path, size, n_frames, P, distort, seed=0, occluded_every=7):
+    """A parked camera filming a board on the road: sensor noise per frame, a passer-by every few frames."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    tex = chessboard_texture(DIMS, SQUARE_PX)
+    # texture pixel -> road cm (inner corner 0 sits one margin square + one square in)
+    A = np.array([[CELL_CM[0] / SQUARE_PX, 0, -2 * CELL_CM[0]], [0, CELL_CM[1] / SQUARE_PX, -2 * CELL_CM[1]],
+                  [0, 0, 1]])
+    M = P @ A
+    board = cv2.warpPerspective(tex, M, size, flags=cv2.INTER_AREA).astype(np.float32)
+    mask = cv2.warpPerspective(np.full_like(tex, 255), M, size, flags=cv2.INTER_NEAREST) > 0
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30.0, size)
+    for i in range(n_frames):
+        scene = np.full((h, w), 110, np.float32)
+        scene[mask] = board[mask]
+        if i % occluded_every == occluded_every - 1:
+            x = int(rng.uniform(0.3, 0.6) * w)
+            cv2.rectangle(scene, (x, int(0.2 * h)), (x + w // 8, h), 40, -1)
+        scene += rng.normal(0, 4.0, (h, w)).astype(np.float32)
+        frame = cv2.cvtColor(np.clip(scene, 0, 255).astype(np.uint8), cv2.COLOR_GRAY2BGR)
+        out.write(cv2.remap(frame, distort[0], distort[1], cv2.INTER_LINEAR))
+    out.release()
+
+
+def road_error_cm(H, H_true, size):
+    """cm error of H over the road seen in the lower 3/4 of the frame (|H(p) - H_true(p)|)."""
+    w, h = size
+    xs, ys = np.meshgrid(np.linspace(0.05 * w, 0.95 * w, 40), np.linspace(0.3 * h, 0.95 * h, 30))
+    px = np.column_stack([xs.ravel(), ys.ravel()])
+    err = np.linalg.norm(pixels_to_real_world(px, H) - pixels_to_real_world(px, H_true), axis=1)
+    return err.mean(), err.max()
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Four clicked corners on one frame vs automatic multi-frame "
+                                            "board homography: accuracy against the known road plane, and time.")
+    p.add_argument("--width", type=int, default=1920, help="Frame width. Default=1920")
+    p.add_argument("--height", type=int, default=1080, help="Frame height. Default=1080")
+    p.add_argument("--frames", type=int, default=150, help="Homography video length. Default=150 (5 s)")
+    p.add_argument("--max-frames", type=int, default=60, help="Frames sampled by the automatic fit. Default=60")
+    p.add_argument("--click-px", type=float, default=1.5, help="Simulated clicking error (px). Default=1.5")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    size = (args.width, args.height)
+    camera_matrix, dist_coeffs = synthetic_intrinsics(*size)
+    P = road_camera(size)
+    H_true = np.linalg.inv(P)
+    H_true /= H_true[2, 2]
+
+    tmp = tempfile.mkdtemp(prefix="bench_homography_")
+    video = os.path.join(tmp, "board.mp4")
+    write_board_video(video, size, args.frames, P, distort_maps(camera_matrix, dist_coeffs, size))
+
+    # the manual procedure: four outer corners clicked (with a little error) on one undistorted frame
+    rng = np.random.default_rng(2)
+    real = board_points_cm(DIMS, CELL_CM).reshape(DIMS[1], DIMS[0], 2)
+    corners = np.array([real[0, 0], real[0, -1], real[-1, -1], real[-1, 0]])
+    clicked = pixels_to_real_world(corners, P) + rng.uniform(-args.click_px, args.click_px, (4, 2))
+    print(f"[bench] frame size {size}, {args.frames} frames, board {DIMS[0]}x{DIMS[1]} corners, "
+          f"cells {CELL_CM[0]:g}x{CELL_CM[1]:g} cm")
+    mean, worst = road_error_cm(compute_homography(clicked, corners), H_true, size)
+    print(f"[bench] 4 clicks, 1 frame (±{args.click_px:g} px): road error mean {mean:.3f} cm, max {worst:.3f} cm")
+
+    for workers in sorted({1, args.workers}):
+        t0 = time.perf_counter()
+        H, report = estimate_homography(video, DIMS, CELL_CM, camera_matrix, dist_coeffs,
+                                        max_frames=args.max_frames, workers=workers)
+        seconds = time.perf_counter() - t0
+        mean, worst = road_error_cm(H, H_true, size)
+        print(f"[bench] automatic ({workers}w)        : road error mean {mean:.3f} cm, max {worst:.3f} cm, "
+              f"{seconds:5.2f} s, board in {report['frames_with_board']}/{report['frames_sampled']} frames, "
+              f"reprojection p95 {report['error_px']['p95']:.3f} px")
+
+
+if __name__ == "__main__":
+    main()
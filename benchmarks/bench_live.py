@@ -0,0 +1,127 @@
+import sys, os, time, argparse, tempfile, threading, queue
+from array import array
+
+import cv2
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.engine import LaneMeasurer  # noqa: E402
+from src.live import run_live, latency_summary  # noqa: E402
+from synthetic import (synthetic_intrinsics, synthetic_homography, distort_maps,  # noqa: E402
+                       write_road_video, write_calibration, write_homography)
+
+
+class MemoryCamera:
+    """
+    Pre-decoded frames delivered at fps like a camera (frames that are due while
+    nobody reads are lost), so decoding does not compete with processing for CPU.
+    """
+
+    def __init__(self, frames, fps):
+        self.frames, self.fps = frames, fps
+        self._t0 = None
+
+    def read(self):
+        now = time.perf_counter()
+        if self._t0 is None:
+            self._t0 = now
+            self._next = 0
+        due = self._t0 + self._next / self.fps
+        if now < due:
+            time.sleep(due - now)
+        else:
+            self._next = max(self._next, int((now - self._t0) * self.fps))
+        if self._next >= len(self.frames):
+            return None
+        self._next += 1
+        return self._next - 1, self.frames[self._next - 1]
+
+    def release(self):
+        pass
+
+
+def load_frames(video):
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+class NullPublisher:
+    def publish(self, message):
+        pass
+
+    def close(self):
+        pass
+
+
+def run_fifo(source, homog, wheel, calib, size):
+    """The obvious alternative: queue every camera frame and work through them in order."""
+    measurer = LaneMeasurer.from_files(calib, homog, wheel, size)
+    frames = queue.Queue()
+
+    def grab():
+        while True:
+            item = source.read()
+            frames.put(None if item is None else (*item, time.perf_counter()))
+            if item is None:
+                return
+
+    threading.Thread(target=grab, daemon=True).start()
+    latencies = array("d")
+    t0 = time.perf_counter()
+    while True:
+        item = frames.get()
+        if item is None:
+            break
+        frame_idx, frame, t_capture = item
+        measurer.process_frame(frame, frame_idx)
+        latencies.append((time.perf_counter() - t_capture) * 1000.0)
+    source.release()
+    return len(latencies), time.perf_counter() - t0, latency_summary(latencies)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Live mode (freshest frame) vs a FIFO frame queue: "
+                                            "end-to-end latency when the camera outpaces processing.")
+    p.add_argument("--width", type=int, default=1280, help="Frame width. Default=1280")
+    p.add_argument("--height", type=int, default=720, help="Frame height. Default=720")
+    p.add_argument("--frames", type=int, default=300, help="Synthetic video length. Default=300")
+    p.add_argument("--speeds", type=float, nargs="+", default=[1.0, 2.0, 4.0],
+                   help="Camera frame rate as a multiple of 30 fps. Default=1 2 4")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    size = (args.width, args.height)
+    tmp = tempfile.mkdtemp(prefix="bench_live_")
+    video = os.path.join(tmp, "drive.mp4")
+    calib = os.path.join(tmp, "calib.npz")
+    homog = os.path.join(tmp, "homography.json")
+
+    camera_matrix, dist_coeffs = synthetic_intrinsics(*size)
+    write_road_video(video, size, args.frames, distort=distort_maps(camera_matrix, dist_coeffs, size))
+    write_calibration(calib, camera_matrix, dist_coeffs, size)
+    write_homography(homog, synthetic_homography())
+    wheel = (int(0.55 * args.width), int(0.62 * args.height))
+    LaneMeasurer.from_files(calib, homog, wheel, size)  # warm the undistortion map cache
+    frames = load_frames(video)
+
+    for speed in args.speeds:
+        live = run_live(MemoryCamera(frames, 30 * speed), homog, wheel, calib, NullPublisher())
+        n, seconds, fifo = run_fifo(MemoryCamera(frames, 30 * speed), homog, wheel, calib, size)
+        lat = live["latency"]
+        print(f"[bench] {30 * speed:5.0f} fps camera  live: {live['frames_processed']:>4} processed, "
+              f"{live['frames_dropped']:>4} dropped, latency p50 {lat['p50_ms']:7.1f} ms, "
+              f"p99 {lat['p99_ms']:7.1f} ms | FIFO: {n:>4} processed, latency p50 {fifo['p50_ms']:7.1f} ms, "
+              f"p99 {fifo['p99_ms']:7.1f} ms ({seconds:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
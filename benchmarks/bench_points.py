@@ -0,0 +1,69 @@
+import sys, os, time, argparse, tempfile, shutil
+import numpy as np
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.pipeline import measure_video  # noqa: E402
+from src.points import ReferencePoint  # noqa: E402
+from synthetic import (synthetic_intrinsics, synthetic_homography, distort_maps,  # noqa: E402
+                       write_road_video, write_calibration, write_homography)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="One run per reference point vs all points in one pass: "
+                                            "wall time and per-point agreement.")
+    p.add_argument("--width", type=int, default=1280, help="Frame width. Default=1280")
+    p.add_argument("--height", type=int, default=720, help="Frame height. Default=720")
+    p.add_argument("--frames", type=int, default=300, help="Synthetic video length. Default=300")
+    p.add_argument("--threads", type=int, default=0, help="measure_video threads. Default=0 (serial)")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    w, h = size = (args.width, args.height)
+    tmp = tempfile.mkdtemp(prefix="bench_points_")
+    video = os.path.join(tmp, "drive.mp4")
+    calib = os.path.join(tmp, "calib.npz")
+    homog = os.path.join(tmp, "homography.json")
+
+    camera_matrix, dist_coeffs = synthetic_intrinsics(w, h)
+    write_road_video(video, size, args.frames, distort=distort_maps(camera_matrix, dist_coeffs, size))
+    write_calibration(calib, camera_matrix, dist_coeffs, size)
+    write_homography(homog, synthetic_homography())
+    points = [ReferencePoint("front", (int(0.55 * w), int(0.62 * h))),
+              ReferencePoint("rear", (int(0.35 * w), int(0.62 * h)), wheel_offset_cm=70.0),
+              ReferencePoint("mirror", (int(0.75 * w), int(0.62 * h))),
+              ReferencePoint("hood", (int(0.55 * w), int(0.1 * h)), direction="down")]
+    kw = {"progress": False, "threads": args.threads, "debug_mode": "off"}
+    measure_video(video, homog, points[0].wheel, calib, os.path.join(tmp, "warm.csv"), **kw)  # map cache
+
+    singles, t_single = {}, 0.0
+    for p in points:
+        out_npz = os.path.join(tmp, f"{p.name}.npz")
+        t0 = time.perf_counter()
+        measure_video(video, homog, None, calib, os.path.join(tmp, f"{p.name}.csv"), out_npz_path=out_npz,
+                      points=[p], **kw)
+        t_single += time.perf_counter() - t0
+        with np.load(out_npz) as data:
+            singles[p.name] = data[f"cm_to_lane_{p.name}"]
+
+    out_npz = os.path.join(tmp, "all.npz")
+    t0 = time.perf_counter()
+    measure_video(video, homog, None, calib, os.path.join(tmp, "all.csv"), out_npz_path=out_npz, points=points, **kw)
+    t_multi = time.perf_counter() - t0
+
+    print(f"[bench] frame size {size}, {args.frames} frames, {len(points)} points")
+    print(f"[bench] one run per point : {t_single:.2f} s")
+    print(f"[bench] all in one pass   : {t_multi:.2f} s ({t_single / t_multi:.1f}x)")
+    with np.load(out_npz) as data:
+        for p in points:
+            cm, ref = data[f"cm_to_lane_{p.name}"], singles[p.name]
+            same = np.mean((cm == ref) | (np.isnan(cm) & np.isnan(ref)))
+            print(f"[bench]   {p.name:<7} ({p.direction:<4}): detected {np.sum(~np.isnan(cm))}/{len(cm)}, "
+                  f"same cm as its own run in {same * 100:.1f}% of frames")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import sys, os, time, argparse, tempfile
+import numpy as np
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.pipeline import measure_video  # noqa: E402
+from src.sidecar import load_detections  # noqa: E402
+from synthetic import (synthetic_intrinsics, synthetic_homography, distort_maps,  # noqa: E402
+                       write_road_video, write_calibration, write_homography)
+
+
+def read_cm(csv_path):
+    data = np.genfromtxt(csv_path, delimiter=",", skip_header=1)
+    return data[:, 0].astype(int), data[:, 1]
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Every frame vs --stride/--target-hz sampling: speed + row agreement.")
+    p.add_argument("--width", type=int, default=960, help="Frame width. Default=960")
+    p.add_argument("--height", type=int, default=540, help="Frame height. Default=540")
+    p.add_argument("--frames", type=int, default=600, help="Synthetic video length. Default=600")
+    p.add_argument("--fps", type=float, default=60.0, help="Synthetic video frame rate. Default=60")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    size = (args.width, args.height)
+    tmp = tempfile.mkdtemp(prefix="bench_stride_")
+    video = os.path.join(tmp, "drive.mp4")
+    calib = os.path.join(tmp, "calib.npz")
+    homog = os.path.join(tmp, "homography.json")
+
+    camera_matrix, dist_coeffs = synthetic_intrinsics(*size)
+    write_road_video(video, size, args.frames, fps=args.fps,
+                     distort=distort_maps(camera_matrix, dist_coeffs, size))
+    write_calibration(calib, camera_matrix, dist_coeffs, size)
+    write_homography(homog, synthetic_homography())
+    wheel = (int(0.55 * args.width), int(0.62 * args.height))
+
+    full_csv = os.path.join(tmp, "full.csv")
+    t0 = time.perf_counter()
+    measure_video(video, homog, wheel, calib, full_csv, progress=False)
+    t_full = time.perf_counter() - t0
+    full_frames, full_cm = read_cm(full_csv)
+    print(f"[bench] every frame      : {t_full:.2f} s ({len(full_frames)} rows)")
+
+    ok = True
+    for label, kw in (("stride 2", {"stride": 2}), ("target 10 Hz", {"target_hz": 10}),
+                      ("target 5 Hz", {"target_hz": 5})):
+        out_csv = os.path.join(tmp, f"sampled_{label.replace(' ', '_')}.csv")
+        out_det = out_csv.replace(".csv", "_detections.npz")
+        t0 = time.perf_counter()
+        stats = measure_video(video, homog, wheel, calib, out_csv, progress=False,
+                              out_detections_path=out_det, **kw)
+        seconds = time.perf_counter() - t0
+        stride = stats["stride"]
+        frames, cm = read_cm(out_csv)
+        det = load_detections(out_det)
+
+        # rows carry the source frame index and timestamp
+        index_ok = np.array_equal(frames, np.arange(0, len(full_frames), stride))
+        ts_ok = np.allclose(det["timestamp_ms"], frames * 1000.0 / args.fps, atol=1e-3)
+        both = ~np.isnan(cm) & ~np.isnan(full_cm[frames])
+        agree = np.mean(np.isclose(cm[both], full_cm[frames][both])) if both.any() else 0.0
+        ok &= index_ok and ts_ok
+        print(f"[bench] {label:<16}: {seconds:.2f} s ({t_full / seconds:.1f}x, stride {stride}, "
+              f"{len(frames)} rows)  frame index ok: {index_ok}  timestamps ok: {ts_ok}  "
+              f"same cm as full run: {agree * 100:.1f}% of rows")
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
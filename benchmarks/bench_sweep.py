@@ -0,0 +1,72 @@
+import sys, os, time, argparse, tempfile
+import cv2
+import numpy as np
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.engine import LaneMeasurer, read_frames  # noqa: E402
+from src.framestore import build_frame_store  # noqa: E402
+from src.sweep import expand_grid, widest_params, run_sweep  # noqa: E402
+from synthetic import synthetic_intrinsics, synthetic_homography, distort_maps, write_road_video  # noqa: E402
+
+
+def end_to_end(video, camera_matrix, dist_coeffs, H, wheel, size, params):
+    """What a sweep cost before: decode, undistort and measure the whole video again for every set."""
+    measurer = LaneMeasurer(camera_matrix, dist_coeffs, H, wheel, size, params=params)
+    cap = cv2.VideoCapture(video)
+    cm = [np.nan if m.cm_to_lane is None else m.cm_to_lane for m in measurer.process_stream(read_frames(cap))]
+    cap.release()
+    return np.array(cm)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Parameter sweep: full re-run per set vs one frame store + "
+                                            "parallel evaluation. Time and agreement of the results.")
+    p.add_argument("--width", type=int, default=1280, help="Frame width. Default=1280")
+    p.add_argument("--height", type=int, default=720, help="Frame height. Default=720")
+    p.add_argument("--frames", type=int, default=300, help="Synthetic video length. Default=300")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    size = (args.width, args.height)
+    tmp = tempfile.mkdtemp(prefix="bench_sweep_")
+    video = os.path.join(tmp, "drive.mp4")
+    camera_matrix, dist_coeffs = synthetic_intrinsics(*size)
+    write_road_video(video, size, args.frames, distort=distort_maps(camera_matrix, dist_coeffs, size))
+    H = synthetic_homography()
+    wheel = (int(0.55 * args.width), int(0.62 * args.height))
+    sets = expand_grid({"block_size": [15, 25, 35], "c_const": [-12, -8], "morph_kernel": [(5, 9), (10, 15)]})
+
+    t0 = time.perf_counter()
+    reference = [end_to_end(video, camera_matrix, dist_coeffs, H, wheel, size, p) for p in sets]
+    t_ref = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    store = build_frame_store(video, camera_matrix, dist_coeffs, wheel, widest_params(sets),
+                              cache_dir=os.path.join(tmp, "frames"))
+    t_store = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    results = run_sweep(store, sets, H, wheel, workers=args.workers)
+    t_sweep = time.perf_counter() - t0
+
+    # same detections as the full runs? (strip-store scores are approximations: contours cut
+    # by the strip edges can be filtered differently than in the whole frame)
+    by_params = {tuple(r["params"].values()): r for r in results}
+    agree = [by_params[tuple(p)]["detected"] == int((~np.isnan(ref)).sum()) and
+             np.isclose(by_params[tuple(p)]["mean_cm"] or np.nan, np.nanmean(ref), equal_nan=True)
+             for p, ref in zip(sets, reference)]
+
+    n = len(sets)
+    print(f"[bench] frame size {size}, {args.frames} frames, {n} parameter sets, {args.workers} worker(s)")
+    print(f"[bench] full run per set     : {t_ref:6.1f} s ({t_ref / n:.2f} s per set)")
+    print(f"[bench] frame store (once)   : {t_store:6.1f} s, {store.frames.nbytes / 1e6:.0f} MB")
+    print(f"[bench] sweep over the store : {t_sweep:6.1f} s ({t_sweep / n:.2f} s per set), "
+          f"{(t_store + t_sweep):.1f} s total ({t_ref / (t_store + t_sweep):.1f}x)")
+    print(f"[bench] same detections and mean cm_to_lane as the full runs: {sum(agree)}/{n} sets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import sys, os, time, argparse
+import cv2
+import numpy as np
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src import config  # noqa: E402
+from src.engine import LaneMeasurer  # noqa: E402
+from synthetic import (synthetic_intrinsics, synthetic_homography, distort_maps, lane_row_track,  # noqa: E402
+                       lane_edge_truth, road_frame, DROPOUT_EVERY)
+
+WRONG_ROWS = 5  # a detection further than this from the true lane edge picked the wrong band
+
+
+def distractor_rows(n_frames, height, every=40, length=12, seed=3):
+    """Row of a second, lane-like band (crossing, old paint) for bursts of frames; -1 = none."""
+    rng = np.random.default_rng(seed)
+    rows = np.full(n_frames, -1)
+    for start in range(every // 2, n_frames, every):
+        rows[start:start + length] = int(rng.uniform(0.08, 0.18) * height)
+    return rows
+
+
+def make_frames(size, n_frames, dmaps):
+    """Distorted road frames with a wandering lane, dropouts and bursts of a second band above it."""
+    rng = np.random.default_rng(1)
+    rows = lane_row_track(n_frames, size[1])
+    distractors = distractor_rows(n_frames, size[1])
+    frames = []
+    for i, (r, d) in enumerate(zip(rows, distractors)):
+        img = road_frame(size, r, rng, dropout=i % DROPOUT_EVERY == DROPOUT_EVERY - 1)
+        if d >= 0:
+            cv2.rectangle(img, (0, d), (size[0] - 1, d + 29), (235, 235, 235), -1)
+        frames.append(cv2.remap(img, dmaps[0], dmaps[1], cv2.INTER_LINEAR))
+    return rows, frames
+
+
+def run(measurer, frames, repeat):
+    best, results = np.inf, None
+    for _ in range(repeat):
+        measurer.reset()
+        t0 = time.perf_counter()
+        results = list(measurer.process_stream(frames))
+        best = min(best, (time.perf_counter() - t0) / len(frames) * 1000.0)
+    return results, best
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Full-frame search vs Kalman-tracked row window on a lane with "
+                                            "dropouts and intermittent second bands: wrong picks, cm error, speed.")
+    p.add_argument("--width", type=int, default=1280, help="Frame width. Default=1280")
+    p.add_argument("--height", type=int, default=720, help="Frame height. Default=720")
+    p.add_argument("--frames", type=int, default=240, help="Synthetic frames. Default=240")
+    p.add_argument("--repeat", type=int, default=3, help="Passes over the frames (best is kept). Default=3")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    size = (args.width, args.height)
+    camera_matrix, dist_coeffs = synthetic_intrinsics(*size)
+    rows, frames = make_frames(size, args.frames, distort_maps(camera_matrix, dist_coeffs, size))
+    wheel = (args.width // 2, int(0.62 * args.height))
+    truth_row = lane_edge_truth(rows, wheel[0], args.width, config.COLUMN_WIDTH)
+    lane_present = np.arange(args.frames) % DROPOUT_EVERY != DROPOUT_EVERY - 1
+
+    print(f"[bench] frame size {size}, {len(frames)} frames, lane absent in {(~lane_present).sum()}, "
+          f"second band in {(distractor_rows(args.frames, args.height) >= 0).sum()}")
+    for label, track in (("full frame", False), ("tracked", True)):
+        measurer = LaneMeasurer(camera_matrix, dist_coeffs, synthetic_homography(), wheel, size,
+                                cache_dir=None, track=track)
+        results, ms = run(measurer, frames, args.repeat)
+        truth_cm = np.array([measurer.project(r)[1] for r in truth_row])
+        lane_y = np.array([np.nan if m.lane_y is None else m.lane_y for m in results])
+        found = ~np.isnan(lane_y)
+        wrong = found & ~(np.abs(lane_y - truth_row) <= WRONG_ROWS)
+        right = found & ~wrong
+        cm = np.array([np.nan if m.cm_to_lane is None else m.cm_to_lane for m in results])
+        line = (f"[bench] {label:<10}: {ms:6.2f} ms/frame, detected {found.sum()}/{len(frames)}, "
+                f"wrong band {wrong.sum()}, |error| (right band) mean {np.abs(cm - truth_cm)[right].mean():.2f} cm")
+        if track:
+            smooth = np.array([np.nan if m.smoothed_cm is None else m.smoothed_cm for m in results])
+            has = ~np.isnan(smooth)
+            err = np.abs(smooth - truth_cm)[has]
+            innovation = np.array([m.innovation for m in results if m.innovation is not None])
+            line += (f"\n[bench] {'':<10}  smoothed |error| mean {err.mean():.2f} cm, p95 "
+                     f"{np.percentile(err, 95):.2f} cm over {has.sum()} frames ({(has & ~lane_present).sum()} "
+                     f"without a lane); |innovation| p95 {np.percentile(np.abs(innovation), 95):.1f} rows")
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import sys, os, time, argparse
+import cv2
+import numpy as np
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.undistort import load_intrinsics, get_undistort_maps, undistort  # noqa: E402
+from synthetic import synthetic_intrinsics  # noqa: E402
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Compare cv2.undistort against precomputed remap maps.")
+    p.add_argument("--calib", default=None,
+                   help="camera_intrinsics.npz to use (default: synthetic wide-angle intrinsics)")
+    p.add_argument("--width", type=int, default=1920, help="Frame width. Default=1920")
+    p.add_argument("--height", type=int, default=1080, help="Frame height. Default=1080")
+    p.add_argument("--frames", type=int, default=60, help="Frames timed per method. Default=60")
+    return p.parse_args()
+
+
+def time_fps(fn, frames, n):
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(frames[i % len(frames)])
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    args = parse_args()
+    size = (args.width, args.height)
+    if args.calib:
+        camera_matrix, dist_coeffs = load_intrinsics(args.calib)
+    else:
+        camera_matrix, dist_coeffs = synthetic_intrinsics(*size)
+
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(4)]
+
+    t0 = time.perf_counter()
+    maps = get_undistort_maps(camera_matrix, dist_coeffs, size, cache_dir=None)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    fps_undistort = time_fps(lambda f: cv2.undistort(f, camera_matrix, dist_coeffs), frames, args.frames)
+    dst = np.empty_like(frames[0])
+    fps_remap = time_fps(lambda f: undistort(f, maps, dst=dst), frames, args.frames)
+
+    # numerical agreement with the previous per-frame path
+    max_diff = 0
+    n_diff = 0
+    for f in frames:
+        a = cv2.undistort(f, camera_matrix, dist_coeffs)
+        b = undistort(f, maps)
+        d = cv2.absdiff(a, b)
+        max_diff = max(max_diff, int(d.max()))
+        n_diff += int(np.count_nonzero(d))
+
+    print(f"[bench] frame size      : {size}")
+    print(f"[bench] map build       : {build_ms:.1f} ms (once per intrinsics/size)")
+    print(f"[bench] cv2.undistort   : {fps_undistort:.1f} frames/sec")
+    print(f"[bench] remap (cached)  : {fps_remap:.1f} frames/sec ({fps_remap / fps_undistort:.2f}x)")
+    print(f"[bench] max abs diff    : {max_diff} (differing values: {n_diff})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import sys, os, time, argparse
+import cv2
+import numpy as np
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.calibration import calibrate_views, _make_object_points  # noqa: E402
+from synthetic import synthetic_intrinsics  # noqa: E402
+
+
+def synthetic_detections(rng, objp, dims, size, n_poses, frames_per_pose, n_outliers):
+    """
+    Corner sets as an operator dumping video frames would produce them: a few
+    distinct board poses, each held for many near-identical frames, plus some
+    views with corrupted corners (e.g. a mis-ordered or motion-blurred board).
+    """
+    camera_matrix, dist_coeffs = synthetic_intrinsics(*size)
+    w, h = size
+    board_w = objp[:, 0].max()
+    views = []
+    for _ in range(n_poses):
+        rvec = rng.uniform(-0.6, 0.6, 3) * np.array([1, 1, 0.5])
+        depth = camera_matrix[0, 0] * board_w / (rng.uniform(0.3, 0.6) * w)
+        tvec = np.array([rng.uniform(-0.25, 0.25) * depth * w / camera_matrix[0, 0] - board_w / 2,
+                         rng.uniform(-0.25, 0.25) * depth * h / camera_matrix[1, 1] - board_w / 3, depth])
+        for _ in range(frames_per_pose):
+            r = rvec + rng.normal(0, 0.003, 3)
+            t = tvec + rng.normal(0, 0.5, 3)
+            pts, _ = cv2.projectPoints(objp, r, t, camera_matrix, dist_coeffs)
+            views.append((pts + rng.normal(0, 0.15, pts.shape)).astype(np.float32))
+    for i in rng.choice(len(views), n_outliers, replace=False):
+        bad = views[i].copy()
+        bad[: len(bad) // 2] += rng.normal(0, 4.0, bad[: len(bad) // 2].shape).astype(np.float32)
+        views[i] = bad
+    return views, camera_matrix, dist_coeffs
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Calibration on all views vs a diverse, outlier-free subset.")
+    p.add_argument("--poses", type=int, default=30, help="Distinct board poses. Default=30")
+    p.add_argument("--frames-per-pose", type=int, default=10, help="Near-duplicate frames per pose. Default=10")
+    p.add_argument("--outliers", type=int, default=8, help="Corrupted views. Default=8")
+    p.add_argument("--max-views", type=int, default=40, help="Selection cap. Default=40")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(0)
+    dims, size = (9, 6), (1920, 1080)
+    objp = _make_object_points(dims, 25.0)
+    views, K_true, d_true = synthetic_detections(rng, objp, dims, size, args.poses,
+                                                 args.frames_per_pose, args.outliers)
+    print(f"[bench] {len(views)} detections ({args.poses} poses x {args.frames_per_pose} frames, "
+          f"{args.outliers} corrupted)")
+
+    def run(label, **kw):
+        t0 = time.perf_counter()
+        rms, K, d, status, errors = calibrate_views(objp, views, dims, size, **kw)
+        seconds = time.perf_counter() - t0
+        f_err = np.abs(K[[0, 1], [0, 1]] - K_true[[0, 1], [0, 1]]).max()
+        c_err = np.abs(K[:2, 2] - K_true[:2, 2]).max()
+        print(f"[bench] {label:<26}: {seconds:6.2f} s  views {status.count('used'):>3}  "
+              f"outliers {status.count('outlier'):>2}  RMS {rms:.4f}  |fx,fy err| {f_err:6.2f} px  "
+              f"|cx,cy err| {c_err:5.2f} px")
+
+    run("all views, no rejection", max_views=None, outlier_factor=float("inf"))
+    run("all views + rejection", max_views=None)
+    run(f"diverse {args.max_views} + rejection", max_views=args.max_views)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import sys, os, time, argparse, tempfile, csv, tracemalloc
+import numpy as np
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.output import MeasurementWriter  # noqa: E402
+from src.sidecar import open_detections, detection_metadata, DETECTION_COLUMNS  # noqa: E402
+from src.stats import RunningStats  # noqa: E402
+
+
+def synthetic_rows(n, seed=0, block=10_000):
+    """
+    Yield per-frame (frame, timestamp_ms, cm, lane_y, band_top, band_bottom,
+    strength) tuples with ~6% dropouts, generated block by block so the input
+    itself takes no memory worth measuring.
+    """
+    rng = np.random.default_rng(seed)
+    for lo in range(0, n, block):
+        idx = np.arange(lo, min(n, lo + block))
+        lane_y = np.round(200 + 40 * np.sin(idx / 900) + rng.normal(0, 1, len(idx))).astype(int)
+        cm = 160 + 0.5 * (lane_y - 200) + rng.normal(0, 0.2, len(idx))
+        missing = rng.random(len(idx)) < 0.06
+        cm[missing] = np.nan
+        lane_y[missing] = -1
+        yield from zip(idx.tolist(), (idx * 1000 / 30).tolist(), cm.tolist(), lane_y.tolist(),
+                       (lane_y - 12).tolist(), lane_y.tolist(), np.where(missing, 0.0, 9000.0).tolist())
+
+
+def reference_write(path, det_path, rows):
+    """The previous per-row csv.writerow loop with everything kept in lists until the end."""
+    all_distances, nan_count = [], 0
+    columns = {k: [] for k in DETECTION_COLUMNS}
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["frame", "cm_to_lane"])
+        for frame, ts, cm, lane_y, top, bottom, strength in rows:
+            if cm == cm:
+                all_distances.append(cm)
+            else:
+                nan_count += 1
+            for k, v in zip(DETECTION_COLUMNS, (frame, ts, lane_y, top, bottom, strength)):
+                columns[k].append(v)
+            writer.writerow([frame, "NaN" if cm != cm else cm])
+    np.savez(det_path, **{k: np.asarray(v, dtype=dt) for (k, dt), v in zip(DETECTION_COLUMNS.items(),
+                                                                          columns.values())})
+    stats = RunningStats()
+    stats.add_many(all_distances)
+    stats.nan_count += nan_count
+    return stats.summary()
+
+
+def streaming_write(path, det_path, rows, npz_path=None):
+    """Rows appended one at a time, as the measurement loop does."""
+    out = MeasurementWriter(path, npz_path, utc_start_s=12600.0)
+    det = open_detections(det_path)
+    for frame, ts, cm, lane_y, top, bottom, strength in rows:
+        out.append(frame, ts, cm, lane_y, strength / 9000.0)
+        det.append(frame, ts, lane_y, top, bottom, strength)
+    det.close(**detection_metadata((0, 0), (1, 1), 30.0, "bench.mp4", 1))
+    return out.close()
+
+
+def measure(fn, n, *paths):
+    """Run twice: once timed, once under tracemalloc (which slows Python down) for the peak."""
+    t0 = time.perf_counter()
+    result = fn(*paths[:2], synthetic_rows(n), *paths[2:])
+    seconds = time.perf_counter() - t0
+    tracemalloc.start()
+    fn(*paths[:2], synthetic_rows(n), *paths[2:])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Per-row CSV + in-memory lists vs buffered streaming writer.")
+    p.add_argument("--rows", type=int, nargs="+", default=[50_000, 200_000, 800_000],
+                   help="Frame counts to write (800k = ~7.4 h at 30 fps). Default=50k 200k 800k")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    tmp = tempfile.mkdtemp(prefix="bench_writer_")
+    for n in args.rows:
+        exact = float(np.nanmedian([r[2] for r in synthetic_rows(n)]))
+        ref, t_ref, m_ref = measure(reference_write, n, os.path.join(tmp, "ref.csv"),
+                                    os.path.join(tmp, "ref_det.npz"))
+        new, t_new, m_new = measure(streaming_write, n, os.path.join(tmp, "new.csv"),
+                                    os.path.join(tmp, "new_det.npz"))
+        _, t_npz, m_npz = measure(streaming_write, n, os.path.join(tmp, "npz.csv"),
+                                  os.path.join(tmp, "npz_det.npz"), os.path.join(tmp, "npz.npz"))
+        print(f"[bench] {n:>9} rows  per-row+lists: {t_ref:5.2f} s, peak {m_ref / 1e6:7.1f} MB | "
+              f"streaming: {t_new:5.2f} s, peak {m_new / 1e6:5.2f} MB | +npz: {t_npz:5.2f} s, "
+              f"peak {m_npz / 1e6:5.2f} MB")
+        print(f"[bench] {'':>9}       mean diff {abs(ref['mean'] - new['mean']):.1e}, "
+              f"sd diff {abs(ref['sd'] - new['sd']):.1e}, median {new['median']:.3f} vs exact "
+              f"{exact:.3f} (error {abs(new['median'] - exact):.3f} cm)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Benchmark suite on synthetic data: measurement throughput, per-stage latency
+and cm_to_lane accuracy against ground truth at several resolutions, plus
+calibrate_camera speed and accuracy against the known camera. Results are
+written as JSON; --compare checks them against an earlier run.
+"""
+import sys, os, time, json, argparse, tempfile, contextlib, io, socket
+from datetime import datetime
+
+import numpy as np
+
+# make 'src' importable when run from benchmarks/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src import config  # noqa: E402
+from src.calibration import calibrate_camera  # noqa: E402
+from src.measurement import pixel_to_real_world, lateral_positions  # noqa: E402
+from src.pipeline import measure_video  # noqa: E402
+from src.profiling import machine_info, config_snapshot  # noqa: E402
+from synthetic import (synthetic_intrinsics, synthetic_homography, distort_maps,  # noqa: E402
+                       write_road_video, write_calibration, write_homography,
+                       write_chessboard_set, lane_edge_truth, DROPOUT_EVERY)
+
+SUITE_VERSION = 1
+DEFAULT_RESOLUTIONS = ("640x360", "1280x720", "1920x1080")
+STAGE_FIELDS = ("count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+
+
+def parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def percentiles(values, prefix):
+    values = np.abs(np.asarray(values, dtype=np.float64))
+    if not len(values):
+        return {f"{prefix}_mean": None, f"{prefix}_p95": None, f"{prefix}_max": None}
+    return {f"{prefix}_mean": float(values.mean()), f"{prefix}_p95": float(np.percentile(values, 95)),
+            f"{prefix}_max": float(values.max())}
+
+
+def measurement_case(tmp, size, n_frames, threads, seed):
+    """Synthetic drive at one resolution through measure_video; speed, stage latency, accuracy."""
+    w, h = size
+    name = f"measure_{w}x{h}"
+    video = os.path.join(tmp, f"{name}.mp4")
+    calib = os.path.join(tmp, f"{name}_calib.npz")
+    homog = os.path.join(tmp, f"{name}_homography.json")
+    camera_matrix, dist_coeffs = synthetic_intrinsics(w, h)
+    H = synthetic_homography()
+    rows = write_road_video(video, size, n_frames, seed=seed,
+                            distort=distort_maps(camera_matrix, dist_coeffs, size))
+    write_calibration(calib, camera_matrix, dist_coeffs, size)
+    write_homography(homog, H)
+    wheel = (int(0.55 * w), int(0.62 * h))
+
+    out_csv = os.path.join(tmp, f"{name}_measurements.csv")
+    out_npz = os.path.join(tmp, f"{name}_measurements.npz")
+    stats = measure_video(video, homog, wheel, calib, out_csv, progress=False, threads=threads,
+                          out_profile_path=os.path.join(tmp, f"{name}_profile.json"),
+                          out_npz_path=out_npz)
+    with np.load(out_npz) as data:
+        frames, cm, lane_y = data["frame"], data["cm_to_lane"], data["lane_y"]
+
+    # ground truth: painted lane edge at the wheel column, and frames with no lane at all
+    truth_y = lane_edge_truth(rows, wheel[0], w, config.COLUMN_WIDTH)[frames]
+    truth_cm = lateral_positions(pixel_to_real_world(wheel, H),
+                                 np.column_stack([np.full(len(frames), wheel[0]), truth_y]), H)
+    has_lane = frames % DROPOUT_EVERY != DROPOUT_EVERY - 1
+    found = ~np.isnan(cm)
+    hit = has_lane & found
+
+    profile = stats["profile"]
+    return {
+        "name": name,
+        "kind": "measurement",
+        "resolution": [w, h],
+        "frames": int(len(frames)),
+        "threads": threads,
+        "seconds": profile["wall_seconds"],
+        "frames_per_second": profile["frames_per_second"],
+        "stages": {stage: {k: s[k] for k in STAGE_FIELDS} for stage, s in profile["stages"].items()},
+        "accuracy": {
+            "detection_rate": float(hit.sum() / max(1, has_lane.sum())),
+            "false_detection_rate": float((found & ~has_lane).sum() / max(1, (~has_lane).sum())),
+            **percentiles(lane_y[hit] - truth_y[hit], "lane_y_abs_error_px"),
+            **percentiles(cm[hit] - truth_cm[hit], "cm_abs_error"),
+            "cm_bias": float(np.mean(cm[hit] - truth_cm[hit])) if hit.any() else None,
+        },
+    }
+
+
+def calibration_case(tmp, size, n_images, n_empty, workers, seed):
+    """calibrate_camera on rendered chessboard photos (cold cache); speed and intrinsics error."""
+    w, h = size
+    name = f"calibrate_{w}x{h}"
+    dims = (9, 6)
+    files = write_chessboard_set(os.path.join(tmp, name), size, dims, n_images, n_empty, seed=seed,
+                                 ext=".jpg")
+    camera_matrix, dist_coeffs = synthetic_intrinsics(w, h)
+
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        K, d, rms, _, n_used = calibrate_camera(files, dims, 25.0, workers=workers,
+                                                cache_dir=os.path.join(tmp, name + "_cache"))
+    seconds = time.perf_counter() - t0
+
+    d = np.ravel(d)
+    n = min(len(d), len(dist_coeffs))
+    return {
+        "name": name,
+        "kind": "calibration",
+        "resolution": [w, h],
+        "images": n_images + n_empty,
+        "workers": workers,
+        "seconds": seconds,
+        "images_per_second": (n_images + n_empty) / seconds,
+        "accuracy": {
+            "rms_px": float(rms),
+            "images_used": int(n_used),
+            "focal_error_px": float(np.abs(np.diag(K)[:2] - np.diag(camera_matrix)[:2]).max()),
+            "principal_point_error_px": float(np.abs(K[:2, 2] - camera_matrix[:2, 2]).max()),
+            "dist_coeffs_max_error": float(np.abs(d[:n] - dist_coeffs[:n]).max()),
+        },
+    }
+
+
+def compare(results, baseline, tolerance, cm_tolerance):
+    """Print per-case changes against a baseline report; returns the list of regressions."""
+    regressions = []
+    old_cases = {c["name"]: c for c in baseline["cases"]}
+    print(f"\n[suite] compared with {baseline.get('created', '?')} on "
+          f"{baseline.get('machine', {}).get('processor', '?')}")
+    for case in results["cases"]:
+        old = old_cases.get(case["name"])
+        if old is None:
+            print(f"  {case['name']:<24} (not in baseline)")
+            continue
+        speed = old["seconds"] / case["seconds"] if case["seconds"] else float("nan")
+        line = f"  {case['name']:<24} speed {speed:5.2f}x"
+        if speed < 1 - tolerance:
+            regressions.append(f"{case['name']}: {speed:.2f}x baseline speed")
+        acc, old_acc = case["accuracy"], old["accuracy"]
+        if case["kind"] == "measurement":
+            err, old_err = acc["cm_abs_error_mean"], old_acc["cm_abs_error_mean"]
+            line += (f"  detection {old_acc['detection_rate'] * 100:.1f}% -> {acc['detection_rate'] * 100:.1f}%"
+                     f"  cm error {old_err if old_err is not None else float('nan'):.3f} -> "
+                     f"{err if err is not None else float('nan'):.3f}")
+            if acc["detection_rate"] < old_acc["detection_rate"] - 0.01:
+                regressions.append(f"{case['name']}: detection rate {acc['detection_rate']:.3f} "
+                                   f"(was {old_acc['detection_rate']:.3f})")
+            if err is not None and old_err is not None and err > old_err + cm_tolerance:
+                regressions.append(f"{case['name']}: mean cm error {err:.3f} (was {old_err:.3f})")
+        else:
+            line += (f"  focal error {old_acc['focal_error_px']:.2f} -> {acc['focal_error_px']:.2f} px"
+                     f"  RMS {old_acc['rms_px']:.3f} -> {acc['rms_px']:.3f}")
+            if acc["images_used"] < old_acc["images_used"]:
+                regressions.append(f"{case['name']}: {acc['images_used']} images used "
+                                   f"(was {old_acc['images_used']})")
+        print(line)
+    return regressions
+
+
+def print_results(results):
+    print("\n[suite results]")
+    for case in results["cases"]:
+        acc = case["accuracy"]
+        if case["kind"] == "measurement":
+            stages = sorted(case["stages"].items(), key=lambda kv: -kv[1]["mean_ms"])[:3]
+            slowest = ", ".join(f"{k} {v['mean_ms']:.2f}" for k, v in stages)
+            err = acc["cm_abs_error_mean"]
+            print(f"  {case['name']:<24} {case['frames_per_second']:7.1f} frames/s  "
+                  f"detected {acc['detection_rate'] * 100:5.1f}%  "
+                  f"cm error mean {err if err is not None else float('nan'):.3f} "
+                  f"p95 {acc['cm_abs_error_p95'] or float('nan'):.3f}  slowest ms: {slowest}")
+        else:
+            print(f"  {case['name']:<24} {case['seconds']:7.2f} s ({case['images_per_second']:.1f} images/s)  "
+                  f"RMS {acc['rms_px']:.3f} px  focal error {acc['focal_error_px']:.2f} px  "
+                  f"{acc['images_used']} images used")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Synthetic benchmark suite with JSON results.")
+    p.add_argument("--resolutions", nargs="+", default=list(DEFAULT_RESOLUTIONS),
+                   help=f"Measurement resolutions WxH. Default={' '.join(DEFAULT_RESOLUTIONS)}")
+    p.add_argument("--frames", type=int, default=240, help="Frames per synthetic drive. Default=240")
+    p.add_argument("--threads", type=int, default=0, help="measure_video threads. Default=0 (serial)")
+    p.add_argument("--calib-size", default="1600x1200", help="Chessboard photo size WxH. Default=1600x1200")
+    p.add_argument("--calib-images", type=int, default=12, help="Chessboard photos (+2 empty). Default=12")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                   help="calibrate_camera worker processes. Default = number of CPU cores")
+    p.add_argument("--skip-calibration", action="store_true", help="Only run the measurement cases")
+    p.add_argument("--seed", type=int, default=0, help="Synthetic data seed. Default=0")
+    p.add_argument("--out", default=None,
+                   help="Results JSON (default: benchmarks/results/suite_<host>_<time>.json)")
+    p.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    p.add_argument("--tolerance", type=float, default=0.20,
+                   help="Allowed slowdown vs --compare before it counts as a regression (run-to-run "
+                        "noise on a busy machine is ~10%%). Default=0.20")
+    p.add_argument("--cm-tolerance", type=float, default=0.25,
+                   help="Allowed increase of the mean cm error vs --compare. Default=0.25")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    created = datetime.now()
+    tmp = tempfile.mkdtemp(prefix="bench_suite_")
+
+    cases = []
+    for text in args.resolutions:
+        size = parse_size(text)
+        print(f"[suite] measurement {size[0]}x{size[1]}, {args.frames} frames ...", flush=True)
+        cases.append(measurement_case(tmp, size, args.frames, args.threads, args.seed))
+    if not args.skip_calibration:
+        size = parse_size(args.calib_size)
+        print(f"[suite] calibration {size[0]}x{size[1]}, {args.calib_images} boards ...", flush=True)
+        cases.append(calibration_case(tmp, size, args.calib_images, 2, args.workers, args.seed))
+
+    results = {
+        "suite_version": SUITE_VERSION,
+        "created": created.isoformat(timespec="seconds"),
+        "host": socket.gethostname(),
+        "machine": machine_info(),
+        "config": config_snapshot(),
+        "args": vars(args),
+        "cases": cases,
+    }
+    print_results(results)
+
+    out_path = args.out or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                        f"suite_{results['host']}_{created:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n[suite] results → {out_path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.cm_tolerance)
+        if regressions:
+            print("\n[suite] REGRESSIONS")
+            for r in regressions:
+                print(f"  {r}")
+            sys.exit(1)
+        print("\n[suite] no regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Synthetic camera models, road frames and chessboard photos for benchmarks (no real footage needed)."""
+import json
+import os
+
+import cv2
+import numpy as np
+
+
+def synthetic_intrinsics(width, height):
+    """Wide-angle pinhole camera with noticeable barrel distortion."""
+    f = 0.75 * width
+    camera_matrix = np.array([[f, 0, width / 2], [0, f, height / 2], [0, 0, 1]], dtype=np.float64)
+    dist_coeffs = np.array([-0.30, 0.10, 0.001, -0.001, -0.02], dtype=np.float64)
+    return camera_matrix, dist_coeffs
+
+
+def synthetic_homography(cm_per_px=0.5):
+    """Simple top-down homography: pixels scaled to centimetres."""
+    return np.array([[cm_per_px, 0, 0], [0, cm_per_px, 0], [0, 0, 1]], dtype=np.float64)
+
+
+def distort_maps(camera_matrix, dist_coeffs, size):
+    """Remap tables that take an ideal (undistorted) image to what the lens records."""
+    w, h = size
+    xs, ys = np.meshgrid(np.arange(w, dtype=np.float32), np.arange(h, dtype=np.float32))
+    pts = np.stack([xs.ravel(), ys.ravel()], axis=1).reshape(-1, 1, 2)
+    ideal = cv2.undistortPoints(pts, camera_matrix, dist_coeffs, P=camera_matrix)
+    ideal = ideal.reshape(h, w, 2)
+    return cv2.convertMaps(ideal[..., 0], ideal[..., 1], cv2.CV_16SC2)
+
+
+DROPOUT_EVERY = 17  # write_road_video leaves the lane out of every 17th frame
+LANE_BLOCK = 64     # lane paint is drawn in horizontal blocks this wide
+
+
+def lane_block_top(lane_row, x, width, slope=0.02):
+    """Top row of the painted lane block that covers column x (see road_frame)."""
+    x0 = (x // LANE_BLOCK) * LANE_BLOCK
+    return int(round(lane_row + slope * (x0 - width / 2)))
+
+
+def lane_edge_truth(rows, wheel_x, width, column_width, slope=0.02):
+    """
+    Ground-truth lane pixel row the histogram search should report for each
+    lane_row in rows: the topmost painted row within column_width of wheel_x
+    (the band edge farther from a wheel point below the lane).
+    """
+    xs = range(max(0, wheel_x - column_width), min(width, wheel_x + column_width))
+    return np.array([min(lane_block_top(r, x, width, slope) for x in xs) for r in rows])
+
+
+def lane_row_track(n_frames, height, seed=0):
+    """Smoothly wandering lane band position (top row) for n_frames."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_frames)
+    base = 0.35 * height + 0.08 * height * np.sin(2 * np.pi * t / max(n_frames, 60))
+    return np.round(base + rng.normal(0, 1.0, n_frames)).astype(int)
+
+
+def road_frame(size, lane_row, rng, lane_height=30, noise=12.0, speckles=400,
+               distort=None, slope=0.02, dropout=False, streaks=0):
+    """
+    Render one BGR road frame with a horizontal lane band starting at lane_row.
+
+    The band spans the frame width with a slight slope, asphalt gets Gaussian noise
+    plus bright speckles, and a weaker marking is added lower down so the histogram
+    search has more than one candidate. distort is an optional (map1, map2) pair
+    from distort_maps(). dropout=True leaves the lane out of the frame. streaks adds
+    that many random bright line segments (cracks, tar seams) up to half the frame
+    wide, which join up with the lane and speckles into large irregular contours.
+    """
+    w, h = size
+    img = np.full((h, w), 90, np.float32)
+    img += rng.normal(0, noise, (h, w)).astype(np.float32)
+
+    if not dropout:
+        for x0 in range(0, w, LANE_BLOCK):
+            y = lane_block_top(lane_row, x0, w, slope)
+            cv2.rectangle(img, (x0, y), (x0 + LANE_BLOCK - 1, y + lane_height - 1), 225, -1)
+
+    # faint secondary marking (e.g. worn paint)
+    y2 = int(0.75 * h)
+    cv2.rectangle(img, (0, y2), (w - 1, y2 + lane_height // 3), 160, -1)
+
+    xs = rng.integers(0, w, speckles)
+    ys = rng.integers(0, h, speckles)
+    for x, y in zip(xs, ys):
+        cv2.circle(img, (int(x), int(y)), int(rng.integers(1, 4)), 200, -1)
+
+    for _ in range(streaks):
+        x, y = int(rng.integers(0, w)), int(rng.integers(0, h))
+        length, angle = rng.uniform(20, w / 2), rng.uniform(0, np.pi)
+        end = (int(x + length * np.cos(angle)), int(y + length * np.sin(angle)))
+        cv2.line(img, (x, y), end, float(rng.uniform(150, 230)), int(rng.integers(1, 5)))
+
+    frame = cv2.cvtColor(np.clip(img, 0, 255).astype(np.uint8), cv2.COLOR_GRAY2BGR)
+    if distort is not None:
+        frame = cv2.remap(frame, distort[0], distort[1], cv2.INTER_LINEAR)
+    return frame
+
+
+def write_road_video(path, size, n_frames, fps=30.0, seed=0, distort=None):
+    """Write a synthetic driving video (mp4v) and return the lane top row per frame."""
+    rng = np.random.default_rng(seed)
+    rows = lane_row_track(n_frames, size[1], seed=seed)
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    if not out.isOpened():
+        raise RuntimeError(f"Failed to open VideoWriter for {path}")
+    for i, r in enumerate(rows):
+        out.write(road_frame(size, r, rng, distort=distort, dropout=(i % DROPOUT_EVERY == DROPOUT_EVERY - 1)))
+    out.release()
+    return rows
+
+
+def write_calibration(path, camera_matrix, dist_coeffs, size):
+    """Save intrinsics in the same .npz layout as scripts/run_calibration.py."""
+    np.savez(path, camera_matrix=camera_matrix, dist_coeffs=dist_coeffs, rms=0.0,
+             image_size=size, n_images_used=0)
+
+
+def write_homography(path, H):
+    """Save a homography in the same JSON layout as src/homography.save_homography."""
+    with open(path, "w") as f:
+        json.dump({"homography_matrix": np.asarray(H).tolist()}, f, indent=2)
+
+
+def chessboard_texture(chessboard_dims, square_px=60, margin_squares=1):
+    """Flat chessboard (inner corners = chessboard_dims) with a white margin, as uint8 gray."""
+    cols, rows = chessboard_dims
+    n_x, n_y = cols + 1 + 2 * margin_squares, rows + 1 + 2 * margin_squares
+    board = np.full((n_y * square_px, n_x * square_px), 255, np.uint8)
+    for j in range(rows + 1):
+        for i in range(cols + 1):
+            if (i + j) % 2 == 0:
+                y0, x0 = (j + margin_squares) * square_px, (i + margin_squares) * square_px
+                board[y0:y0 + square_px, x0:x0 + square_px] = 0
+    return board
+
+
+def chessboard_view(size, chessboard_dims, rng, camera_matrix=None, distort=None, board=True,
+                    square_px=60):
+    """
+    One BGR photo of a chessboard seen from a random pose (or an empty scene).
+
+    The board is tilted up to ~35 degrees, placed to fill roughly a third to two
+    thirds of the frame, rendered with a perspective warp, then lens-distorted
+    with distort (maps from distort_maps()) and given sensor noise.
+    """
+    w, h = size
+    scene = np.full((h, w), 120, np.float32)
+    if board:
+        tex = chessboard_texture(chessboard_dims, square_px)
+        th, tw = tex.shape
+        K = camera_matrix if camera_matrix is not None else synthetic_intrinsics(w, h)[0]
+        rvec = rng.uniform(-0.6, 0.6, 3) * np.array([1, 1, 0.5])
+        R, _ = cv2.Rodrigues(rvec)
+        board_w = rng.uniform(0.35, 0.65) * w
+        s = board_w / tw  # board units -> image pixels at unit depth scale
+        depth = K[0, 0]
+        t = np.array([rng.uniform(-0.15, 0.15) * w, rng.uniform(-0.15, 0.15) * h, depth])
+        # texture pixel (u, v) -> board-plane point centred on the board
+        A = np.array([[s, 0, -s * tw / 2], [0, s, -s * th / 2], [0, 0, 1]])
+        H = K @ np.column_stack([R[:, 0], R[:, 1], t]) @ A
+        warped = cv2.warpPerspective(tex, H, (w, h), flags=cv2.INTER_AREA, borderValue=0)
+        mask = cv2.warpPerspective(np.full_like(tex, 255), H, (w, h), flags=cv2.INTER_NEAREST)
+        scene[mask > 0] = warped[mask > 0]
+    scene += rng.normal(0, 4.0, (h, w)).astype(np.float32)
+    frame = cv2.cvtColor(np.clip(scene, 0, 255).astype(np.uint8), cv2.COLOR_GRAY2BGR)
+    if distort is not None:
+        frame = cv2.remap(frame, distort[0], distort[1], cv2.INTER_LINEAR)
+    return frame
+
+
+def write_chessboard_set(out_dir, size, chessboard_dims, n_images, n_empty=0, seed=0, ext=".png"):
+    """Write n_images chessboard photos plus n_empty board-less ones; returns the file list."""
+    rng = np.random.default_rng(seed)
+    camera_matrix, dist_coeffs = synthetic_intrinsics(*size)
+    distort = distort_maps(camera_matrix, dist_coeffs, size)
+    os.makedirs(out_dir, exist_ok=True)
+    files = []
+    for i in range(n_images + n_empty):
+        img = chessboard_view(size, chessboard_dims, rng, camera_matrix, distort, board=i < n_images)
+        path = os.path.join(out_dir, f"board_{i:03d}{ext}")
+        cv2.imwrite(path, img)
+        files.append(path)
+    return files
@@ -0,0 +1,215 @@
+import sys, os, csv, json, argparse, time, traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# make 'src' importable when run from scripts/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.debug_video import DEBUG_MODES  # noqa: E402
+from src.output import measurements_npz_path_for  # noqa: E402
+from src.pipeline import measure_video, init_worker  # noqa: E402
+from src.profiling import profile_path_for  # noqa: E402
+from src.sidecar import detections_path_for  # noqa: E402
+from src.decoder import DECODERS  # noqa: E402
+from src.points import load_points  # noqa: E402
+from src.stats import csv_stats  # noqa: E402
+
+DEFAULT_CALIB = "data/calib/camera_intrinsics.npz"
+DEFAULT_OUT_DIR = "output/csv"
+DEFAULT_VIDEO_DIR = "output/videos"
+
+
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Headless batch lane measurement for many videos in parallel.",
+        epilog="Manifest columns (CSV header or JSON keys): video, homography, wheel_x, wheel_y, "
+               f"and optionally calib (default: {DEFAULT_CALIB}) and points (a reference points JSON, "
+               "see run_measurement.py --points, in place of wheel_x/wheel_y).",
+    )
+    p.add_argument("manifest", help="Manifest file (.csv or .json list of objects)")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                   help="Videos processed in parallel. Default = number of CPU cores")
+    p.add_argument("--opencv-threads", type=int, default=1,
+                   help="OpenCV threads per worker process. Default=1")
+    p.add_argument("--threads", type=int, default=0,
+                   help="Pipelined processing threads inside each worker. Default=0 (serial)")
+    p.add_argument("--out-dir", default=DEFAULT_OUT_DIR,
+                   help=f"Folder for measurement CSVs (default: {DEFAULT_OUT_DIR})")
+    p.add_argument("--debug-video", choices=DEBUG_MODES, nargs="?", const="all", default="off",
+                   help=f"Also write debug videos to {DEFAULT_VIDEO_DIR}: all frames (all, the default "
+                        "when given without a mode), every --debug-every-th frame (every) or only "
+                        "around failed detections/jumps (events). Default=off")
+    p.add_argument("--debug-every", type=int, default=10,
+                   help="Frame interval for --debug-video every. Default=10")
+    p.add_argument("--debug-scale", type=float, default=1.0,
+                   help="Scale factor for the debug video frames, e.g. 0.5. Default=1.0")
+    p.add_argument("--debug-context", type=int, default=15,
+                   help="Frames kept before and after each event for --debug-video events. Default=15")
+    rate = p.add_mutually_exclusive_group()
+    rate.add_argument("--stride", type=int, default=1,
+                      help="Process only every Nth frame of each video. Default=1")
+    rate.add_argument("--target-hz", type=float, default=None,
+                      help="Process frames at about this rate (stride picked per video from its fps)")
+    p.add_argument("--npz", action="store_true",
+                   help="Also write each video's measurements as a columnar .npz next to its CSV")
+    p.add_argument("--birdseye", action="store_true",
+                   help="Detect in a top-down road patch in cm (no detections sidecar)")
+    p.add_argument("--track", action="store_true",
+                   help="Follow the lane with a Kalman filter and search only around its prediction "
+                        "(no detections sidecar)")
+    p.add_argument("--decoder", choices=DECODERS, default="opencv",
+                   help="Video decoder: OpenCV, or an ffmpeg subprocess piping raw luma with per-frame "
+                        "timestamps (needs ffmpeg/ffprobe). Default=opencv")
+    p.add_argument("--luma", action="store_true",
+                   help="Decode straight to grey (the Y plane) instead of BGR; cm moves by up to ~0.5. "
+                        "With --decoder opencv decoding is not faster and the run can be slower than BGR")
+    p.add_argument("--decode-threads", type=int, default=0,
+                   help="Threads for the video decoder itself. Default=0 (decoder's default)")
+    p.add_argument("--downscale", type=float, default=1.0,
+                   help="Shrink frames while decoding, e.g. 0.5, and measure at that size (no detections sidecar). "
+                        "Default=1.0")
+    p.add_argument("--profile", action="store_true",
+                   help="Write a per-stage timing report (*_profile.json) next to each CSV")
+    p.add_argument("--force", action="store_true",
+                   help="Reprocess videos even if their CSV is already complete")
+    return p.parse_args()
+
+
+def load_manifest(path):
+    """Read manifest rows into a list of job dicts."""
+    if path.lower().endswith(".json"):
+        with open(path, "r") as f:
+            rows = json.load(f)
+    else:
+        with open(path, "r", newline="") as f:
+            rows = list(csv.DictReader(f))
+
+    jobs = []
+    for i, row in enumerate(rows, 1):
+        points = row.get("points") or None
+        required = ("video", "homography") if points else ("video", "homography", "wheel_x", "wheel_y")
+        missing = [k for k in required if not row.get(k)]
+        if missing:
+            raise RuntimeError(f"Manifest row {i} is missing {', '.join(missing)}")
+        jobs.append({
+            "video": row["video"],
+            "homography": row["homography"],
+            "wheel": None if points else (int(float(row["wheel_x"])), int(float(row["wheel_y"]))),
+            "points": points,
+            "calib": row.get("calib") or DEFAULT_CALIB,
+        })
+    return jobs
+
+
+def output_base_names(jobs):
+    """
+    Output file stem of every job (its video's file name without extension).
+    Raises if two videos share one (compared case-insensitively, as on
+    Windows/macOS), since their CSVs, sidecars and debug videos would overwrite
+    each other.
+    """
+    names = [os.path.splitext(os.path.basename(job["video"]))[0] for job in jobs]
+    rows = {}
+    for i, name in enumerate(names, 1):
+        rows.setdefault(name.casefold(), []).append(i)
+    clashes = [r for r in rows.values() if len(r) > 1]
+    if clashes:
+        detail = "; ".join(f"rows {', '.join(map(str, r))} ({names[r[0] - 1]})" for r in clashes)
+        raise RuntimeError(f"Manifest videos share a file name, so their outputs would overwrite each other: "
+                           f"{detail}. Rename the videos or split the manifest")
+    return names
+
+
+def _run_job(job, out_csv_path, out_video_path, threads, profile, stride, target_hz, debug, npz, birdseye,
+             track, decode):
+    try:
+        stats = measure_video(job["video"], job["homography"], job["wheel"], job["calib"],
+                              out_csv_path, out_video_path=out_video_path, progress=False,
+                              threads=threads, out_detections_path=detections_path_for(out_csv_path),
+                              out_profile_path=profile_path_for(out_csv_path) if profile else None,
+                              stride=stride, target_hz=target_hz,
+                              out_npz_path=measurements_npz_path_for(out_csv_path) if npz else None,
+                              birdseye=birdseye, track=track, **debug, **decode,
+                              points=load_points(job["points"]) if job["points"] else None)
+        stats.pop("profile", None)  # already on disk; keep batch_summary.json small
+        stats["status"] = "done"
+    except Exception as e:
+        stats = {"status": "failed", "error": f"{type(e).__name__}: {e}",
+                 "traceback": traceback.format_exc()}
+    stats["video"] = job["video"]
+    stats["csv"] = out_csv_path
+    return stats
+
+
+def print_batch_summary(results, seconds):
+    print("\n[batch summary]")
+    for r in results:
+        name = os.path.basename(r["video"])
+        if r["status"] == "failed":
+            print(f"  FAILED   {name}: {r['error']}")
+            continue
+        total = r["frames_total"] or 1
+        mean = f"{r['mean']:.2f} cm" if r["frames_valid"] else "n/a"
+        print(f"  {r['status']:<8} {name}: {r['frames_valid']}/{r['frames_total']} valid "
+              f"({r['frames_valid']/total*100:.1f}%), mean {mean}")
+
+    n = {s: sum(r["status"] == s for r in results) for s in ("done", "skipped", "failed")}
+    frames = sum(r.get("frames_total", 0) for r in results if r["status"] == "done")
+    print(f"\n  Videos: {n['done']} processed, {n['skipped']} skipped (already complete), {n['failed']} failed")
+    print(f"  Wall time: {seconds:.1f} s" + (f" ({frames/seconds:.1f} frames/sec)" if frames and seconds else ""))
+
+
+def main():
+    args = parse_args()
+    jobs = load_manifest(args.manifest)
+    names = output_base_names(jobs)
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    results = []
+    pending = []
+    for job, base_name in zip(jobs, names):
+        out_csv_path = os.path.join(args.out_dir, f"{base_name}_measurements.csv")
+        out_video_path = (os.path.join(DEFAULT_VIDEO_DIR, f"{base_name}_debug.mp4")
+                          if args.debug_video != "off" else None)
+
+        # measure_video only renames its CSV into place once the video is finished
+        if os.path.exists(out_csv_path) and not args.force:
+            stats = csv_stats(out_csv_path)
+            stats.update(status="skipped", video=job["video"], csv=out_csv_path)
+            results.append(stats)
+            continue
+        pending.append((job, out_csv_path, out_video_path))
+
+    print(f"[batch] {len(jobs)} videos in manifest, {len(pending)} to process, "
+          f"{len(results)} already complete")
+
+    debug = {"debug_mode": args.debug_video, "debug_every": args.debug_every,
+             "debug_scale": args.debug_scale, "debug_context": args.debug_context}
+    decode = {"decoder": args.decoder, "luma": args.luma, "decode_threads": args.decode_threads,
+              "downscale": args.downscale}
+    t0 = time.perf_counter()
+    if pending:
+        workers = max(1, min(args.workers, len(pending)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(args.opencv_threads,)) as pool:
+            futures = [pool.submit(_run_job, *p, args.threads, args.profile, args.stride,
+                                   args.target_hz, debug, args.npz, args.birdseye, args.track, decode)
+                       for p in pending]
+            for fut in as_completed(futures):
+                r = fut.result()
+                results.append(r)
+                print(f"[batch] {r['status']}: {r['video']}")
+    seconds = time.perf_counter() - t0
+
+    print_batch_summary(results, seconds)
+
+    summary_json = os.path.join(args.out_dir, "batch_summary.json")
+    with open(summary_json, "w") as f:
+        json.dump({"manifest": os.path.abspath(args.manifest), "seconds": seconds, "videos": results},
+                  f, indent=2)
+    print(f"[batch] summary → {summary_json}")
+
+    if any(r["status"] == "failed" for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,8 @@ import numpy as np
 
 # make 'src' importable when run from scripts/
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
-from src.calibration import calibrate_camera  # noqa: E402
+from src import config  # noqa: E402
+from src.calibration import calibrate_camera, DEFAULT_MAX_VIEWS, OUTLIER_FACTOR  # noqa: E402
 
 DEFAULT_IMG_DIR = "data/chessboard_images"
 DEFAULT_OUT_NPZ = "data/calib/camera_intrinsics.npz"
@@ -25,6 +26,14 @@ def parse_args():
     p.add_argument("--square-mm", type=float, default=25.0, help="Square size in mm. Default=25.0")
     p.add_argument("--out", default=DEFAULT_OUT_NPZ,
                    help=f"Output .npz path (default: {DEFAULT_OUT_NPZ})")
+    p.add_argument("--workers", type=int, default=None,
+                   help="Processes for chessboard detection. Default = number of CPU cores")
+    p.add_argument("--max-views", type=int, default=DEFAULT_MAX_VIEWS,
+                   help=f"Most diverse views to calibrate on (0 = all). Default={DEFAULT_MAX_VIEWS}")
+    p.add_argument("--outlier-factor", type=float, default=OUTLIER_FACTOR,
+                   help=f"Drop views above this many times the median reprojection error. Default={OUTLIER_FACTOR}")
+    p.add_argument("--no-cache", action="store_true",
+                   help="Detect every image again instead of reusing cached corners")
     return p.parse_args()
 
 def main():
@@ -37,8 +46,11 @@ def main():
         raise RuntimeError(f"No chessboard images found in {args.img_dir}")
 
     # run calibration
-    cam_mtx, dist_coeffs, rms, image_size, n_used = calibrate_camera(
-        images, chessboard_dims, args.square_mm
+    cam_mtx, dist_coeffs, rms, image_size, n_used, views = calibrate_camera(
+        images, chessboard_dims, args.square_mm, workers=args.workers,
+        cache_dir=None if args.no_cache else config.CHESSBOARD_CACHE_DIR,
+        max_views=args.max_views or None, outlier_factor=args.outlier_factor,
+        return_views=True,
     )
 
     # save results
@@ -63,11 +75,15 @@ def main():
             {
                 "output_npz": args.out,
                 "image_dir": os.path.abspath(args.img_dir),
+                "images_total": len(images),
                 "images_used": n_used,
                 "image_size": image_size,
                 "rms": rms,
                 "chessboard_dims": {"cols": args.cols, "rows": args.rows},
                 "square_mm": args.square_mm,
+                "max_views": args.max_views or None,
+                "outlier_factor": args.outlier_factor,
+                "images": views,
             },
             f,
             indent=2,
@@ -1,15 +1,18 @@
-import cv2, json, os, sys
-import numpy as np
-import tkinter as tk
-from tkinter import filedialog
+import cv2, json, os, sys, argparse
 
 # add src/ to path
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 from src.utils import find_calibration_file
-from src.homography import compute_homography, save_homography
+from src.homography import (compute_homography, save_homography, estimate_homography,
+                            DEFAULT_MAX_FRAMES, RANSAC_CM)
+from src.measurement import pixels_to_real_world, calculate_distance
+from src.undistort import load_intrinsics, get_undistort_maps, undistort
 
 
 def choose_video():
+    import tkinter as tk  # only needed for the dialog, not for --video runs
+    from tkinter import filedialog
+
     root = tk.Tk(); root.withdraw()
     video_path = filedialog.askopenfilename(
         title="Select HOMOGRAPHY video",
@@ -76,27 +79,70 @@ def pick_points(img, min_points=4):
     return pts
 
 
-def pixel_to_real_world(pixel_point, H):
-    p = np.array([[pixel_point[0], pixel_point[1], 1]], dtype=np.float32).T
-    world = np.dot(H, p)
-    return (world[0] / world[2])[0], (world[1] / world[2])[0]
+def parse_args():
+    p = argparse.ArgumentParser(description="Compute the image → road-plane homography from a homography video.")
+    p.add_argument("--video", default=None, help="Homography video (default: choose in a dialog)")
+    p.add_argument("--calib", default=None, help="Intrinsics .npz (default: the one under data/calib)")
+    p.add_argument("--out", default=None,
+                   help="Output JSON (default: data/homography/<video>_homography.json)")
+    p.add_argument("--auto", action="store_true",
+                   help="Headless: detect a chessboard lying on the road in many frames instead of clicking corners")
+    p.add_argument("--cols", type=int, default=9, help="--auto: inner corners per row (columns). Default=9")
+    p.add_argument("--rows", type=int, default=6, help="--auto: inner corners per column (rows). Default=6")
+    p.add_argument("--cell-cm", type=float, nargs="+", metavar="CM",
+                   help="--auto: square size on the road in cm (one value, or width and height)")
+    p.add_argument("--max-frames", type=int, default=DEFAULT_MAX_FRAMES,
+                   help=f"--auto: frames sampled evenly over the video. Default={DEFAULT_MAX_FRAMES}")
+    p.add_argument("--workers", type=int, default=None,
+                   help="--auto: processes for board detection. Default = number of CPU cores")
+    p.add_argument("--ransac-cm", type=float, default=RANSAC_CM,
+                   help=f"--auto: RANSAC inlier threshold on the road in cm. Default={RANSAC_CM}")
+    args = p.parse_args()
+    if args.auto and (args.video is None or not args.cell_cm or len(args.cell_cm) > 2):
+        p.error("--auto needs --video and --cell-cm W [H]")
+    return args
+
+
+def run_auto(args, video_path, out_json, camera_matrix, dist_coeffs):
+    """Headless mode: board detection over many frames + robust fit, with a _summary.json report."""
+    cell_cm = args.cell_cm * 2 if len(args.cell_cm) == 1 else args.cell_cm
+    H, report = estimate_homography(video_path, (args.cols, args.rows), cell_cm, camera_matrix, dist_coeffs,
+                                    max_frames=args.max_frames, workers=args.workers, ransac_cm=args.ransac_cm)
+    save_homography(H, out_json)
+    summary_json = os.path.splitext(out_json)[0] + "_summary.json"
+    with open(summary_json, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"[homography] board found in {report['frames_with_board']}/{report['frames_sampled']} frames, "
+          f"{report['inliers']}/{report['points']} corners used")
+    for unit in ("cm", "px"):
+        e = report[f"error_{unit}"]
+        print(f"[homography] reprojection error ({unit}): mean {e['mean']:.3f}  median {e['median']:.3f}  "
+              f"p95 {e['p95']:.3f}  max {e['max']:.3f}")
+    print(f"[homography] saved → {os.path.abspath(out_json)}")
+    print(f"[homography] summary → {summary_json}")
+    return out_json
 
 
 def main():
+    args = parse_args()
+
     # Load calibration
-    calib_path = find_calibration_file()
-    calib = np.load(calib_path)
-    camera_matrix, dist_coeffs = calib["camera_matrix"], calib["dist_coeffs"]
+    calib_path = args.calib or find_calibration_file()
+    camera_matrix, dist_coeffs = load_intrinsics(calib_path)
 
     # Select video
-    video_path = choose_video()
+    video_path = args.video or choose_video()
     base_name = os.path.splitext(os.path.basename(video_path))[0]
-    out_json = os.path.join("data", "homography", f"{base_name}_homography.json")
+    out_json = args.out or os.path.join("data", "homography", f"{base_name}_homography.json")
 
     # Always overwrite existing JSON
     if os.path.exists(out_json):
         print(f"[homography] Overwriting existing file → {out_json}")
 
+    if args.auto:
+        return run_auto(args, video_path, out_json, camera_matrix, dist_coeffs)
+
     # Get first frame
     cap = cv2.VideoCapture(video_path)
     ok, frame = cap.read()
@@ -104,7 +150,8 @@ def main():
     if not ok:
         raise RuntimeError(f"Could not read first frame from {video_path}")
 
-    undistorted = cv2.undistort(frame, camera_matrix, dist_coeffs)
+    maps = get_undistort_maps(camera_matrix, dist_coeffs, frame.shape[1::-1])
+    undistorted = undistort(frame, maps)
     pts = pick_points(undistorted, min_points=4)
     if len(pts) < 4:
         print("[homography] Cancelled (not enough points).")
@@ -115,7 +162,6 @@ def main():
     H = compute_homography(pts, real_pts)
 
     # Save homography JSON
-    os.makedirs(os.path.dirname(out_json), exist_ok=True)
     save_homography(H, out_json)
     print(f"[homography] saved → {os.path.abspath(out_json)}")
 
@@ -156,9 +202,8 @@ def main():
 
         # If 2 points → compute distance right away
         if len(points) == 2:
-            rw_pts = [pixel_to_real_world(pt, H) for pt in points]
-            dist = np.sqrt((rw_pts[0][0] - rw_pts[1][0])**2 +
-                           (rw_pts[0][1] - rw_pts[1][1])**2)
+            rw_pts = pixels_to_real_world(points, H)
+            dist = calculate_distance(rw_pts[0], rw_pts[1])
             text = f"Distance: {dist:.2f} cm"
             cv2.putText(disp, text,
                         (w - 200, h - 10),
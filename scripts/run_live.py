@@ -0,0 +1,57 @@
+import sys, os, argparse, contextlib
+
+# make 'src' importable when run from scripts/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.live import run_live, open_publisher, print_live_summary  # noqa: E402
+from src.stats import print_summary  # noqa: E402
+
+DEFAULT_CALIB = "data/calib/camera_intrinsics.npz"
+
+
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Live lane measurement from a camera or stream, published as newline-delimited JSON.",
+        epilog="A video file as source is played back at real-time pace (--speed) as a stand-in camera.",
+    )
+    p.add_argument("source", help="Camera index (e.g. 0), stream URL, or a recorded video file")
+    p.add_argument("--homography", required=True, help="Homography JSON for this camera mount")
+    p.add_argument("--wheel", type=int, nargs=2, required=True, metavar=("X", "Y"),
+                   help="Reference (wheel) point in undistorted pixels")
+    p.add_argument("--calib", default=DEFAULT_CALIB, help=f"Intrinsics .npz (default: {DEFAULT_CALIB})")
+    p.add_argument("--publish", default="-",
+                   help="Where results go: - (stdout, default) or udp://host:port")
+    p.add_argument("--csv", default=None, help="Also write the measurements to this CSV")
+    p.add_argument("--speed", type=float, default=1.0,
+                   help="Playback rate for a video file source (1 = real time). Default=1.0")
+    p.add_argument("--max-frames", type=int, default=None, help="Stop after this many processed frames")
+    p.add_argument("--duration", type=float, default=None, help="Stop after this many seconds")
+    p.add_argument("--birdseye", action="store_true", help="Detect in a top-down road patch in cm")
+    p.add_argument("--track", action="store_true",
+                   help="Follow the lane with a Kalman filter and search only around its prediction "
+                        "(adds cm_smooth and innovation)")
+    args = p.parse_args()
+    if args.speed <= 0:
+        p.error("--speed must be > 0")
+    return args
+
+
+def main():
+    args = parse_args()
+    publisher = open_publisher(args.publish)
+    # stdout may carry the results, so progress and summaries go to stderr
+    print(f"[live] source → {args.source}, publishing → {args.publish} (Ctrl-C to stop)", file=sys.stderr)
+    try:
+        stats = run_live(args.source, args.homography, tuple(args.wheel), args.calib, publisher,
+                         speed=args.speed, max_frames=args.max_frames, duration_s=args.duration,
+                         out_csv_path=args.csv, birdseye=args.birdseye, track=args.track)
+    finally:
+        publisher.close()
+    print_live_summary(stats)
+    if args.csv:
+        print(f"[live] results → {args.csv}", file=sys.stderr)
+        with contextlib.redirect_stdout(sys.stderr):
+            print_summary(stats)
+
+
+if __name__ == "__main__":
+    main()
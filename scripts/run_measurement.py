@@ -1,78 +1,25 @@
-import cv2, os, json, csv, sys
-import numpy as np
-from tqdm import tqdm
-import tkinter as tk
-from tkinter import filedialog
+import cv2, os, sys, argparse
 
 # add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
-from src import config
-from src.measurement import pixel_to_real_world, calculate_distance
-
-
-# Lane detection by histogram peak finding
-def find_lane_line_by_histogram(binary_img, wheel_x, wheel_y, prev_detection=None):
-    x_min = max(0, wheel_x - config.COLUMN_WIDTH)
-    x_max = min(binary_img.shape[1], wheel_x + config.COLUMN_WIDTH)
-    strip = binary_img[0:wheel_y, x_min:x_max]
-    if strip.size == 0:
-        return None
-
-    histogram = np.sum(strip == 255, axis=1).astype(np.float32)
-    if histogram.max() == 0:
-        return None
-
-    peak_threshold = histogram.max() * 0.2
-    above = histogram >= peak_threshold
-
-    continuous_peaks = []
-    start = None
-    for i, is_peak in enumerate(above):
-        if is_peak and start is None:
-            start = i
-        elif not is_peak and start is not None:
-            end = i - 1
-            length = end - start + 1
-            total = histogram[start:end+1].sum()
-            if length >= config.MIN_LANE_WIDTH and total >= (config.MIN_LANE_WIDTH * 2):
-                continuous_peaks.append((start, end, length, total))
-            start = None
-    if start is not None:
-        end = len(above) - 1
-        length = end - start + 1
-        total = histogram[start:end+1].sum()
-        if length >= config.MIN_LANE_WIDTH and total >= (config.MIN_LANE_WIDTH * 2):
-            continuous_peaks.append((start, end, length, total))
-
-    if not continuous_peaks:
-        return None
-
-    # prefer temporal continuity if available
-    best_peak = None
-    if prev_detection is not None:
-        prev_row = prev_detection[1]
-        candidates = [p for p in continuous_peaks if abs((p[0] + p[1]) / 2 - prev_row) <= config.MAX_JUMP]
-        if candidates:
-            best_peak = max(candidates, key=lambda p: p[3])
-
-    # fallback: strongest, then nearer center
-    if best_peak is None:
-        img_center = len(histogram) / 2
-        best_peak = max(continuous_peaks, key=lambda p: (p[3], -abs(((p[0] + p[1]) / 2) - img_center)))
-
-    start_idx, end_idx, _, _ = best_peak
-    band_top, band_bottom = start_idx, end_idx
-
-    # pick the farther side from the wheel
-    d_top = abs(wheel_y - band_top)
-    d_bottom = abs(wheel_y - band_bottom)
-    lane_y = band_top if d_top >= d_bottom else band_bottom
-
-    return (wheel_x, lane_y)
+from src.undistort import load_intrinsics, get_undistort_maps, undistort
+from src.homography import load_homography
+from src.output import measurements_npz_path_for
+from src.pipeline import measure_video, print_stage_timings
+from src.profiling import profile_path_for, print_profile
+from src.sidecar import detections_path_for
+from src.stats import print_summary
+from src.chunking import measure_video_chunked
+from src.debug_video import DEBUG_MODES
+from src.decoder import DECODERS
+from src.points import load_points
 
 
 # File dialogs
 def choose_files():
+    import tkinter as tk  # only needed for the dialogs, not for --video/--homography runs
+    from tkinter import filedialog
+
     root = tk.Tk()
     root.withdraw()
 
@@ -96,44 +43,86 @@ def choose_files():
     return video_path, homog_path
 
 
-# Main processing
-def main():
-    video_path, homog_path = choose_files()
-    base_name = os.path.splitext(os.path.basename(video_path))[0]
-
-    # outputs
-    out_csv_path = os.path.join("output", "csv", f"{base_name}_measurements.csv")
-    out_video_path = os.path.join("output", "videos", f"{base_name}_debug.mp4")
-    os.makedirs(os.path.dirname(out_csv_path), exist_ok=True)
-    os.makedirs(os.path.dirname(out_video_path), exist_ok=True)
-
-    # load calibration
-    calib_path = "data/calib/camera_intrinsics.npz"
-    if not os.path.exists(calib_path):
-        raise RuntimeError("No calibration found. Run calibration first.")
-    calib = np.load(calib_path)
-    camera_matrix, dist_coeffs = calib["camera_matrix"], calib["dist_coeffs"]
-
-    # load homography (be tolerant to key names)
-    with open(homog_path, "r") as f:
-        data = json.load(f)
-    H_list = data.get("homography_matrix") or data.get("H") or data
-    homography_matrix = np.array(H_list, dtype=np.float32)
-    if homography_matrix.shape != (3, 3):
-        raise RuntimeError(f"Homography is not 3x3. Got shape {homography_matrix.shape} from {homog_path}")
-
-    print(f"[measurement] video → {video_path}")
-    print(f"[measurement] calibration → {calib_path}")
-    print(f"[measurement] homography → {homog_path}")
-
-    # open video + collect wheel click (ESC = abort)
+def parse_args():
+    p = argparse.ArgumentParser(description="Measure lateral lane position from a driving video.")
+    p.add_argument("--debug-video", choices=DEBUG_MODES, nargs="?", const="all", default="all",
+                   help="Debug video: every frame (all, default), every --debug-every-th frame (every), "
+                        "only around failed detections/jumps (events) or none (off)")
+    p.add_argument("--no-debug-video", dest="debug_video", action="store_const", const="off",
+                   help="Same as --debug-video off")
+    p.add_argument("--debug-every", type=int, default=10,
+                   help="Frame interval for --debug-video every. Default=10")
+    p.add_argument("--debug-scale", type=float, default=1.0,
+                   help="Scale factor for the debug video frames, e.g. 0.5. Default=1.0")
+    p.add_argument("--debug-context", type=int, default=15,
+                   help="Frames kept before and after each event for --debug-video events. Default=15")
+    p.add_argument("--threads", type=int, default=0,
+                   help="Pipeline decode / N processing threads / output over bounded queues. Default=0 (serial)")
+    p.add_argument("--chunks", type=int, default=0,
+                   help="Split the video into N frame ranges processed in parallel (no debug video)")
+    p.add_argument("--workers", type=int, default=None,
+                   help="Worker processes for --chunks. Default = number of CPU cores")
+    p.add_argument("--warmup", type=int, default=120,
+                   help="Frames each chunk decodes before its range to pick up lane tracking. Default=120")
+    rate = p.add_mutually_exclusive_group()
+    rate.add_argument("--stride", type=int, default=1,
+                      help="Process only every Nth frame (skipped frames are not decoded to images). Default=1")
+    rate.add_argument("--target-hz", type=float, default=None,
+                      help="Process frames at about this rate, e.g. 10 (stride picked from the video fps)")
+    p.add_argument("--npz", action="store_true",
+                   help="Also write the measurements as a columnar .npz (NumPy) next to the CSV")
+    p.add_argument("--birdseye", action="store_true",
+                   help="Detect in a top-down road patch in cm (one remap per frame; no detections sidecar)")
+    p.add_argument("--track", action="store_true",
+                   help="Follow the lane with a Kalman filter and search only around its prediction "
+                        "(adds cm_smooth and innovation columns; no detections sidecar)")
+    p.add_argument("--points", default=None,
+                   help="JSON list of named reference points (name, x, y, optional wheel_offset_cm, direction "
+                        "up/down, homography) measured together in one pass, one set of columns each; "
+                        "replaces the wheel click")
+    p.add_argument("--decoder", choices=DECODERS, default="opencv",
+                   help="Video decoder: OpenCV, or an ffmpeg subprocess piping raw luma with per-frame "
+                        "timestamps (needs ffmpeg/ffprobe on the PATH). Default=opencv")
+    p.add_argument("--luma", action="store_true",
+                   help="Decode straight to grey (the Y plane) instead of BGR; cm moves by up to ~0.5. "
+                        "With --decoder opencv decoding is not faster and the run can be slower than BGR")
+    p.add_argument("--decode-threads", type=int, default=0,
+                   help="Threads for the video decoder itself. Default=0 (decoder's default)")
+    p.add_argument("--downscale", type=float, default=1.0,
+                   help="Shrink frames while decoding, e.g. 0.5, and measure at that size (no detections sidecar). "
+                        "Default=1.0")
+    p.add_argument("--profile", action="store_true",
+                   help="Time every pipeline stage and write percentiles/histograms to *_profile.json")
+    args = p.parse_args()
+    if args.profile and args.chunks:
+        p.error("--profile is not supported with --chunks")
+    if args.chunks and (args.stride != 1 or args.target_hz):
+        p.error("--stride/--target-hz are not supported with --chunks")
+    if args.chunks and args.track:
+        p.error("--track is not supported with --chunks")
+    if args.chunks and args.points:
+        p.error("--points is not supported with --chunks")
+    if args.chunks and (args.decoder != "opencv" or args.luma or args.decode_threads or args.downscale != 1):
+        p.error("--decoder/--luma/--decode-threads/--downscale are not supported with --chunks")
+    if not 0 < args.downscale <= 1 or args.decode_threads < 0:
+        p.error("--downscale must be in (0, 1] and --decode-threads >= 0")
+    if args.stride < 1 or (args.target_hz is not None and args.target_hz <= 0):
+        p.error("--stride must be >= 1 and --target-hz > 0")
+    if args.debug_every < 1 or not 0 < args.debug_scale <= 1 or args.debug_context < 0:
+        p.error("--debug-every must be >= 1, --debug-scale in (0, 1] and --debug-context >= 0")
+    return args
+
+
+# First frame + wheel click (ESC = abort)
+def click_wheel(video_path, camera_matrix, dist_coeffs):
     cap = cv2.VideoCapture(video_path)
-    total_frames_meta = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))  # metadata
-
     ret, first_frame = cap.read()
+    cap.release()
     if not ret:
         raise RuntimeError("Could not read first frame")
-    first_frame = cv2.undistort(first_frame, camera_matrix, dist_coeffs)
+
+    maps = get_undistort_maps(camera_matrix, dist_coeffs, first_frame.shape[1::-1])
+    first_frame = undistort(first_frame, maps)
 
     wheel = {"x": None, "y": None, "set": False}
 
@@ -151,123 +140,88 @@ def main():
     cv2.destroyAllWindows()
     if not wheel["set"]:
         raise RuntimeError("Wheel point not selected (ESC pressed).")
+    return wheel
 
-    # fps fallback (some containers report 0)
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    if not fps or fps <= 1:
-        fps = 30.0
-
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out_vid = cv2.VideoWriter(out_video_path, fourcc, fps, (width, height))
-    if not out_vid.isOpened():
-        raise RuntimeError("Failed to open VideoWriter. Check codec/fps/frame size.")
-
-    # stats
-    all_distances = []
-    nan_count = 0
-    processed_frames = 0
-
-    with open(out_csv_path, "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(["frame", "cm_to_lane"])
-
-        prev_lane_detection = None
 
-        with tqdm(total=total_frames_meta if total_frames_meta > 0 else None, unit="frame") as pbar:
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-
-                frame_idx = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
-
-                undistorted = cv2.undistort(frame, camera_matrix, dist_coeffs)
-                gray = cv2.cvtColor(undistorted, cv2.COLOR_BGR2GRAY)
-                blurred = cv2.GaussianBlur(gray, config.GAUSSIAN_KERNEL, 0)
-                adaptive = cv2.adaptiveThreshold(
-                    blurred, 255,
-                    cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY,
-                    blockSize=config.BLOCK_SIZE, C=config.C_CONST
-                )
-
-                contours, _ = cv2.findContours(adaptive, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                clean = np.zeros_like(adaptive)
-                for cnt in contours:
-                    x, y, w, h = cv2.boundingRect(cnt)
-                    if w * h >= config.MIN_CONTOUR_AREA and max(w, h) / (min(w, h) + 1e-5) >= config.MIN_ASPECT_RATIO:
-                        cv2.drawContours(clean, [cnt], -1, 255, -1)
-                adaptive = clean
-
-                kernel = cv2.getStructuringElement(cv2.MORPH_RECT, config.MORPH_KERNEL)
-                adaptive = cv2.morphologyEx(adaptive, cv2.MORPH_CLOSE, kernel, iterations=1)
-                adaptive = cv2.morphologyEx(adaptive, cv2.MORPH_OPEN, kernel, iterations=1)
-
-                pt_lane = find_lane_line_by_histogram(adaptive, wheel["x"], wheel["y"], prev_lane_detection)
-                pt_wheel = (wheel["x"], wheel["y"])
+# Main processing
+def main():
+    args = parse_args()
+    debug_video = args.debug_video != "off" and not args.chunks
 
-                if pt_lane:
-                    prev_lane_detection = pt_lane
-                    real_wheel = pixel_to_real_world(pt_wheel, homography_matrix)
-                    real_lane = pixel_to_real_world(pt_lane, homography_matrix)
-                    dist = calculate_distance(real_wheel, real_lane)
-                    lateral_pos = dist + config.WHEEL_OFFSET_CM
-                    all_distances.append(lateral_pos)
-                    writer.writerow([frame_idx, lateral_pos])
+    video_path, homog_path = choose_files()
+    base_name = os.path.splitext(os.path.basename(video_path))[0]
 
-                    # overlay distance + line
-                    cv2.line(undistorted, pt_wheel, pt_lane, (255, 255, 255), 2)
-                    cv2.putText(undistorted, f"{lateral_pos:.1f}cm",
-                                (undistorted.shape[1]-140, undistorted.shape[0]-20),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,0,0), 4)
-                    cv2.putText(undistorted, f"{lateral_pos:.1f}cm",
-                                (undistorted.shape[1]-140, undistorted.shape[0]-20),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,255,255), 1)
-                else:
-                    nan_count += 1
-                    writer.writerow([frame_idx, "NaN"])
+    # outputs
+    out_csv_path = os.path.join("output", "csv", f"{base_name}_measurements.csv")
+    out_video_path = os.path.join("output", "videos", f"{base_name}_debug.mp4")
+    out_detections_path = detections_path_for(out_csv_path)
+    out_npz_path = measurements_npz_path_for(out_csv_path) if args.npz else None
+    out_profile_path = profile_path_for(out_csv_path) if args.profile else None
 
-                # always overlay frame number
-                cv2.putText(undistorted, f"Frame {frame_idx}",
-                            (10, undistorted.shape[0] - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,0,0), 2, cv2.LINE_AA)
-                cv2.putText(undistorted, f"Frame {frame_idx}",
-                            (10, undistorted.shape[0] - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,255,255), 1)
+    # load calibration + homography up front so bad inputs fail before the click
+    calib_path = "data/calib/camera_intrinsics.npz"
+    camera_matrix, dist_coeffs = load_intrinsics(calib_path)
+    load_homography(homog_path)
+    points = load_points(args.points) if args.points else None
+    for point in points or ():
+        if point.homography:
+            load_homography(point.homography)
 
-                # always write frame + update progress
-                out_vid.write(undistorted)
-                processed_frames += 1
-                if pbar is not None:
-                    pbar.update(1)
+    print(f"[measurement] video → {video_path}")
+    print(f"[measurement] calibration → {calib_path}")
+    print(f"[measurement] homography → {homog_path}")
 
-    cap.release()
-    out_vid.release()
+    if points:
+        wheel = None
+        for point in points:
+            print(f"[measurement] point {point.name} → {point.wheel}, lane {point.direction}"
+                  + (f", homography {point.homography}" if point.homography else ""))
+    else:
+        wheel = click_wheel(video_path, camera_matrix, dist_coeffs)
+
+    if debug_video:
+        print(f"[measurement] debug video mode → {args.debug_video}"
+              + (f" (scale {args.debug_scale:g})" if args.debug_scale != 1 else ""))
+
+    if args.chunks:
+        print(f"[measurement] chunked mode → {args.chunks} frame ranges in parallel")
+        stats = measure_video_chunked(
+            video_path, homog_path, (wheel["x"], wheel["y"]), calib_path, out_csv_path,
+            n_chunks=args.chunks, workers=args.workers, warmup=args.warmup,
+            out_detections_path=out_detections_path, out_npz_path=out_npz_path, birdseye=args.birdseye,
+        )
+    else:
+        stats = measure_video(
+            video_path, homog_path, None if points else (wheel["x"], wheel["y"]), calib_path, out_csv_path,
+            out_video_path=out_video_path if debug_video else None, threads=args.threads,
+            out_detections_path=out_detections_path, out_profile_path=out_profile_path,
+            stride=args.stride, target_hz=args.target_hz,
+            debug_mode=args.debug_video, debug_every=args.debug_every,
+            debug_scale=args.debug_scale, debug_context=args.debug_context, out_npz_path=out_npz_path,
+            birdseye=args.birdseye, track=args.track, decoder=args.decoder, luma=args.luma,
+            decode_threads=args.decode_threads, downscale=args.downscale, points=points,
+        )
+        if stats["stride"] > 1:
+            print(f"[measurement] sampled every {stats['stride']} frames")
     print(f"[measurement] results → {out_csv_path}")
-    print(f"[measurement] debug video → {out_video_path}")
-
-    # summary statistics
-    print("\n[summary statistics]")
-    frames_valid = len(all_distances)
-    frames_total = frames_valid + nan_count if (frames_valid + nan_count) > 0 else 1
-
-    if frames_valid > 0:
-        arr = np.array(all_distances, dtype=float)
-        print(f"  Frames with valid data: {frames_valid} / {frames_total} ({frames_valid/frames_total*100:.1f}%)")
-        print(f"  Frames with NaN: {nan_count} / {frames_total} ({nan_count/frames_total*100:.1f}%)")
-        print(f"  Mean:   {np.mean(arr):.2f} cm")
-        print(f"  Median: {np.median(arr):.2f} cm")
-        print(f"  Min:    {np.min(arr):.2f} cm")
-        print(f"  Max:    {np.max(arr):.2f} cm")
-        if frames_valid > 1:
-            print(f"  SD:     {np.std(arr, ddof=1):.2f} cm")
-        else:
-            print("  SD:     n/a (only one valid frame)")
+    if not args.birdseye and not args.track and args.downscale == 1 and not points:
+        print(f"[measurement] detections → {out_detections_path}")
+    if out_npz_path:
+        print(f"[measurement] columnar → {out_npz_path}")
+    if debug_video:
+        print(f"[measurement] debug video → {out_video_path} ({stats['debug_frames']} frames)")
+
+    if points:
+        for name, point_stats in stats["points"].items():
+            print(f"\n[point {name}]", end="")
+            print_summary(point_stats)
     else:
-        print(f"  Frames with valid data: 0 / {frames_total} (0.0%)")
-        print(f"  Frames with NaN: {nan_count} / {frames_total} (100.0%)")
-        print("  No valid lane detections.")
+        print_summary(stats)
+    if "stage_seconds" in stats:
+        print_stage_timings(stats["stage_seconds"], stats["frames_total"])
+    if "profile" in stats:
+        print_profile(stats["profile"])
+        print(f"[measurement] profile → {out_profile_path}")
 
 
 if __name__ == "__main__":
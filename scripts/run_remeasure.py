@@ -0,0 +1,49 @@
+import sys, os, argparse, time
+
+# make 'src' importable when run from scripts/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.output import measurements_npz_path_for  # noqa: E402
+from src.sidecar import remeasure  # noqa: E402
+from src.stats import print_summary  # noqa: E402
+
+
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Recompute a measurements CSV from saved detections (no video decode)."
+    )
+    p.add_argument("detections", help="*_detections.npz written next to the measurements CSV")
+    p.add_argument("--homography", required=True, help="Homography JSON to measure with")
+    p.add_argument("--wheel-offset-cm", type=float, default=None,
+                   help="Override wheel_offset_cm from config.json")
+    p.add_argument("--out", default=None,
+                   help="Output CSV (default: *_remeasured.csv next to the detections file)")
+    p.add_argument("--force", action="store_true", help="Overwrite an existing output CSV")
+    p.add_argument("--npz", action="store_true",
+                   help="Also write the measurements as a columnar .npz next to the CSV")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    out_csv_path = args.out
+    if out_csv_path is None:
+        suffix = "_detections.npz"
+        base = args.detections[:-len(suffix)] if args.detections.endswith(suffix) \
+            else os.path.splitext(args.detections)[0]
+        out_csv_path = base + "_remeasured.csv"
+    if os.path.exists(out_csv_path):
+        if not args.force:
+            sys.exit(f"[remeasure] {out_csv_path} exists; use --force to overwrite it or --out to write elsewhere")
+        print(f"[remeasure] Overwriting existing file → {out_csv_path}")
+
+    out_npz_path = measurements_npz_path_for(out_csv_path) if args.npz else None
+    t0 = time.perf_counter()
+    stats = remeasure(args.detections, args.homography, out_csv_path, args.wheel_offset_cm, out_npz_path)
+    print(f"[remeasure] results → {out_csv_path} ({time.perf_counter() - t0:.2f} s)")
+    if out_npz_path:
+        print(f"[remeasure] columnar → {out_npz_path}")
+    print_summary(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import sys, os, json, argparse, time
+
+# make 'src' importable when run from scripts/
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.detection import DetectionParams  # noqa: E402
+from src.framestore import build_frame_store  # noqa: E402
+from src.homography import load_homography  # noqa: E402
+from src.sweep import (parse_grid_value, expand_grid, widest_params, run_sweep, print_sweep,  # noqa: E402
+                       default_sweep_path)
+from src.undistort import load_intrinsics  # noqa: E402
+
+DEFAULT_CALIB = "data/calib/camera_intrinsics.npz"
+
+
+def parse_grid(specs):
+    """["block_size=15,25,35", "gaussian_kernel=7x7,15x15"] -> {field: [values]}"""
+    grid = {}
+    for spec in specs:
+        field, _, values = spec.partition("=")
+        if not values:
+            raise ValueError(f"Expected FIELD=V1,V2,... for --grid, got {spec}")
+        grid[field.strip()] = [parse_grid_value(field.strip(), v) for v in values.split(",")]
+    return grid
+
+
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Try a grid of detection settings on one video: decode + undistort once into a "
+                    "memory-mapped frame store, then evaluate every set in parallel.",
+        epilog=f"Fields: {', '.join(DetectionParams._fields)}. Unlisted fields keep their config.json values.",
+    )
+    p.add_argument("video", help="Driving video to tune on")
+    p.add_argument("--homography", required=True, help="Homography JSON for this camera mount")
+    p.add_argument("--wheel", type=int, nargs=2, required=True, metavar=("X", "Y"),
+                   help="Wheel reference point in undistorted pixels")
+    p.add_argument("--calib", default=DEFAULT_CALIB, help=f"Intrinsics .npz (default: {DEFAULT_CALIB})")
+    p.add_argument("--grid", action="append", required=True, metavar="FIELD=V1,V2,...",
+                   help="Values to try for one setting, e.g. block_size=15,25,35 or gaussian_kernel=7x7,15x15 "
+                        "(repeat for more settings; all combinations are tried)")
+    p.add_argument("--workers", type=int, default=None,
+                   help="Parameter sets evaluated in parallel. Default = number of CPU cores")
+    p.add_argument("--stride", type=int, default=1, help="Store only every Nth frame. Default=1")
+    p.add_argument("--full-frame", action="store_true",
+                   help="Store whole frames instead of the strip around the wheel: scores then match "
+                        "measure_video exactly, at the cost of a larger store")
+    p.add_argument("--out", default=None, help="Results JSON (default: output/sweeps/<video>_sweep.json)")
+    p.add_argument("--top", type=int, default=10, help="Best sets to print. Default=10")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    sets = expand_grid(parse_grid(args.grid))
+    camera_matrix, dist_coeffs = load_intrinsics(args.calib)
+    H = load_homography(args.homography)
+    print(f"[sweep] {len(sets)} parameter sets")
+
+    t0 = time.perf_counter()
+    store = build_frame_store(args.video, camera_matrix, dist_coeffs, args.wheel, widest_params(sets),
+                              full_frame=args.full_frame, stride=args.stride)
+    t_store = time.perf_counter() - t0
+    n, h, w = store.frames.shape
+    print(f"[sweep] frame store: {n} frames of {w}x{h} ({store.frames.nbytes / 1e6:.0f} MB) in {t_store:.1f} s "
+          f"→ {store.path}")
+    if not args.full_frame:
+        print("[sweep] strip store: scores approximate a real run (contours cut by the strip edges can differ); "
+              "use --full-frame for exact scores")
+
+    t0 = time.perf_counter()
+    results = run_sweep(store, sets, H, args.wheel, workers=args.workers,
+                        progress=lambda done, total: print(f"[sweep] {done}/{total} sets done", end="\r"))
+    t_sweep = time.perf_counter() - t0
+    print_sweep(results, args.top)
+
+    out = args.out or default_sweep_path(args.video)
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({"video": args.video, "homography": args.homography, "wheel": args.wheel,
+                   "stride": args.stride, "full_frame": args.full_frame, "frames": n,
+                   "store_seconds": t_store, "sweep_seconds": t_sweep,
+                   "results": results}, f, indent=2)
+    print(f"\n[sweep] {len(sets)} sets in {t_sweep:.1f} s ({t_sweep / len(sets):.2f} s per set)")
+    print(f"[sweep] results → {out}")
+
+
+if __name__ == "__main__":
+    main()
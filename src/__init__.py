@@ -1,8 +1,9 @@
 from . import config
-from .measurement import pixel_to_real_world, calculate_distance
+from .measurement import pixel_to_real_world, pixels_to_real_world, calculate_distance
 
 __all__ = [
     "config",
     "pixel_to_real_world",
+    "pixels_to_real_world",
     "calculate_distance",
 ]
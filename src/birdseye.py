@@ -0,0 +1,121 @@
+import math
+from typing import NamedTuple, Tuple
+
+import cv2
+import numpy as np
+
+from . import config
+from .measurement import pixels_to_real_world
+from .roi import StripROI, crop_maps
+
+
+class BirdsEyeView(NamedTuple):
+    roi: StripROI           # raw frame crop + remap tables straight into the patch (rect starts at 0, 0)
+    cm_per_px: float
+    wheel: Tuple[int, int]  # wheel point (column, row) in the patch
+    origin: np.ndarray      # wheel point on the road plane (cm)
+    along: np.ndarray       # road-plane unit vector up the wheel's image column (= decreasing patch row)
+    across: np.ndarray      # road-plane unit vector along patch columns (towards image +x)
+    H_inv: np.ndarray       # road plane -> undistorted pixels
+    column_width: int       # histogram search settings in patch pixels
+    min_width: int
+    max_jump: float
+
+    def distance_cm(self, row):
+        """Road distance from the wheel to patch row `row` on the wheel column."""
+        return (self.wheel[1] - row) * self.cm_per_px
+
+    def image_row(self, row):
+        """Undistorted-frame row of patch row `row` on the wheel column."""
+        point = self.origin + self.along * self.distance_cm(row)
+        return int(round(pixels_to_real_world(point, self.H_inv)[0, 1]))
+
+
+def patch_margin(params=None) -> int:
+    """Patch rows kept below the wheel so blur, threshold and morphology see the same footprint."""
+    _, gy = config.GAUSSIAN_KERNEL if params is None else params.gaussian_kernel
+    _, ky = config.MORPH_KERNEL if params is None else params.morph_kernel
+    block_size = config.BLOCK_SIZE if params is None else params.block_size
+    return gy // 2 + block_size // 2 + 4 * ky
+
+
+def distort_pixels(points, camera_matrix, dist_coeffs):
+    """Undistorted pixel coordinates (N,2) -> raw frame coordinates, the inverse of undistortion."""
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    K = np.asarray(camera_matrix, dtype=np.float64)
+    normalized = np.column_stack([(pts[:, 0] - K[0, 2]) / K[0, 0], (pts[:, 1] - K[1, 2]) / K[1, 1],
+                                  np.ones(len(pts))])
+    raw, _ = cv2.projectPoints(normalized, np.zeros(3), np.zeros(3), K, dist_coeffs)
+    return raw.reshape(-1, 2)
+
+
+def column_reach_cm(H, wheel, wheel_dir, max_cm):
+    """How far (cm) the wheel's image column reaches on the road before the frame top or the horizon."""
+    wheel_x, wheel_y = wheel
+    rows = np.arange(wheel_y, -1, -1, dtype=np.float64)
+    world = pixels_to_real_world(np.column_stack([np.full(len(rows), wheel_x), rows]), H)
+    dist = (world - pixels_to_real_world(wheel, H)[0]) @ wheel_dir
+    # stop where the mapping breaks down (horizon: NaN or distances turning back)
+    ok = np.isfinite(dist) & (np.diff(np.concatenate([[-np.inf], dist])) >= 0)
+    reach = dist[:np.argmin(ok)] if not ok.all() else dist
+    return float(min(max_cm, reach.max())) if len(reach) else float(max_cm)
+
+
+def make_birdseye_view(camera_matrix, dist_coeffs, H, wheel, frame_size, cm_per_px=None,
+                       width_cm=None, length_cm=None, params=None) -> BirdsEyeView:
+    """
+    Precompute one remap from the raw frame to a top-down road patch around the wheel.
+
+    Lens undistortion and the homography are composed into a single table: patch
+    pixel (c, r) is the road point origin + along * (wheel_row - r) * s + across
+    * (c - wheel_col) * s (s = cm_per_px), taken back through H^-1 to the
+    undistorted frame and through the lens model to the raw frame. Rows run from
+    length_cm ahead of the wheel along its image column (or as far as the frame
+    reaches) down to the wheel plus patch_margin(params); columns span width_cm.
+    Road points outside the undistorted frame stay black, as in image mode.
+    """
+    s = float(cm_per_px or config.BIRDSEYE_CM_PER_PX)
+    width_cm = float(width_cm or config.BIRDSEYE_WIDTH_CM)
+    length_cm = float(length_cm or config.BIRDSEYE_LENGTH_CM)
+    H = np.asarray(H, dtype=np.float64)
+    H_inv = np.linalg.inv(H)
+    w, h = int(frame_size[0]), int(frame_size[1])
+    wheel = (int(wheel[0]), int(wheel[1]))
+
+    if wheel[1] < 1:
+        raise ValueError("The wheel point needs image rows above it")
+    origin = pixels_to_real_world(wheel, H)[0]
+    up = pixels_to_real_world((wheel[0], wheel[1] - 1), H)[0] - origin
+    right = pixels_to_real_world((wheel[0] + 1, wheel[1]), H)[0] - origin
+    if not (np.isfinite(up).all() and np.isfinite(right).all()):
+        raise ValueError("Wheel point is on the horizon of the homography")
+    along = up / np.linalg.norm(up)
+    across = np.array([-along[1], along[0]])
+    if across @ right < 0:
+        across = -across
+
+    wheel_row = int(math.ceil(column_reach_cm(H, wheel, along, length_cm) / s))
+    n_rows = wheel_row + patch_margin(params) + 1
+    n_cols = int(round(width_cm / s)) | 1
+    wheel_col = n_cols // 2
+
+    cols, rows = np.meshgrid(np.arange(n_cols, dtype=np.float64), np.arange(n_rows, dtype=np.float64))
+    road = origin + np.multiply.outer((wheel_row - rows) * s, along) \
+        + np.multiply.outer((cols - wheel_col) * s, across)
+    undist = pixels_to_real_world(road.reshape(-1, 2), H_inv)
+    inside = np.isfinite(undist).all(axis=1) & (undist[:, 0] >= 0) & (undist[:, 0] <= w - 1) & \
+        (undist[:, 1] >= 0) & (undist[:, 1] <= h - 1)
+    raw = np.full_like(undist, -16.0)  # well outside the frame -> black
+    raw[inside] = distort_pixels(undist[inside], camera_matrix, dist_coeffs)
+    raw = np.clip(raw, -16.0, [w + 16.0, h + 16.0]).astype(np.float32).reshape(n_rows, n_cols, 2)
+    maps = cv2.convertMaps(raw, None, cv2.CV_16SC2)
+
+    rect = (0, 0, n_cols, n_rows)
+    src_rect, roi_maps = crop_maps(maps, rect, frame_size)
+    return BirdsEyeView(
+        roi=StripROI(rect, src_rect, roi_maps), cm_per_px=s, wheel=(wheel_col, wheel_row),
+        origin=origin, along=along, across=across, H_inv=H_inv,
+        column_width=max(1, int(round(config.BIRDSEYE_COLUMN_WIDTH_CM / s))),
+        min_width=max(1, int(round(config.BIRDSEYE_MIN_LANE_WIDTH_CM / s))),
+        max_jump=config.BIRDSEYE_MAX_JUMP_CM / s,
+    )
@@ -1,6 +1,28 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import cv2
 import numpy as np
-from typing import Iterable, Tuple, List
+from typing import Iterable, Tuple, List, Optional
+
+from . import config
+
+# coarse chessboard search runs on a copy whose longer side is at most this many pixels
+COARSE_MAX_SIDE = 1600
+COARSE_FLAGS = cv2.CALIB_CB_ADAPTIVE_THRESH + cv2.CALIB_CB_NORMALIZE_IMAGE + cv2.CALIB_CB_FAST_CHECK
+FULL_FLAGS = cv2.CALIB_CB_ADAPTIVE_THRESH + cv2.CALIB_CB_NORMALIZE_IMAGE  # OpenCV's default, no fast check
+
+# sub-pixel corner refinement criteria
+SUBPIX_CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 1e-3)
+SUBPIX_WINDOW = (11, 11)
+
+# view selection: cap on views passed to calibrateCamera, and outlier rejection rule
+DEFAULT_MAX_VIEWS = 40
+OUTLIER_FACTOR = 3.0      # a view is an outlier above this many times the median per-view error ...
+OUTLIER_MIN_PX = 0.5      # ... and above this absolute error
+MIN_VIEWS = 5             # never drop views below this count
+MAX_OUTLIER_ROUNDS = 5
 
 def _make_object_points(chessboard_dims: Tuple[int, int], square_size_mm: float) -> np.ndarray:
     """Create (N,3) grid of 3D object points in mm for a planar chessboard."""
@@ -10,69 +32,289 @@ def _make_object_points(chessboard_dims: Tuple[int, int], square_size_mm: float)
     objp *= float(square_size_mm)
     return objp
 
+def find_corners(gray: np.ndarray, chessboard_dims: Tuple[int, int],
+                 max_side: int = COARSE_MAX_SIDE) -> Optional[np.ndarray]:
+    """
+    Chessboard inner corners (N,1,2 float32, full-resolution pixels) or None.
+
+    The board is searched on a copy downscaled to max_side with
+    CALIB_CB_FAST_CHECK, so images without a board are rejected quickly, and
+    the corners found there are refined with cornerSubPix on the full image.
+    Boards too small to be found at the coarse scale (and images already
+    within max_side) are searched at full resolution with OpenCV's default
+    flags, i.e. without the fast check, as before the coarse search existed.
+    """
+    h, w = gray.shape[:2]
+    scale = max_side / max(w, h)
+    corners = None
+    if scale < 1:
+        small = cv2.resize(gray, (max(1, round(w * scale)), max(1, round(h * scale))),
+                           interpolation=cv2.INTER_AREA)
+        found, coarse = cv2.findChessboardCorners(small, chessboard_dims, None, COARSE_FLAGS)
+        if found:
+            # pixel centres: x_full + 0.5 = (x_small + 0.5) * w / w_small
+            sx, sy = w / small.shape[1], h / small.shape[0]
+            corners = ((coarse + 0.5) * np.array([sx, sy], np.float32) - 0.5).astype(np.float32)
+
+    if corners is None:
+        found, corners = cv2.findChessboardCorners(gray, chessboard_dims, None, FULL_FLAGS)
+        if not found:
+            return None
+
+    return cv2.cornerSubPix(gray, corners, SUBPIX_WINDOW, (-1, -1), SUBPIX_CRITERIA)
+
+
+def _cache_path(cache_dir: str, digest: str, chessboard_dims: Tuple[int, int], max_side: int) -> str:
+    cols, rows = chessboard_dims
+    # v2: full-resolution retries without CALIB_CB_FAST_CHECK (earlier entries may have missed boards)
+    return os.path.join(cache_dir, f"corners_v2_{digest}_{cols}x{rows}_s{max_side}.npz")
+
+
+def detect_image(fname: str, chessboard_dims: Tuple[int, int], max_side: int = COARSE_MAX_SIDE,
+                 cache_dir: Optional[str] = config.CHESSBOARD_CACHE_DIR):
+    """
+    Detect the chessboard in one image file.
+
+    Returns (image_size, corners): image_size is (w, h) or None if the file
+    cannot be read, corners is None when no board was found. Results are
+    cached on disk under cache_dir keyed by the file's SHA-1, the board
+    dimensions and max_side (cache_dir=None skips the cache), so unchanged
+    images are never decoded twice.
+    """
+    try:
+        with open(fname, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None, None
+
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = _cache_path(cache_dir, hashlib.sha1(data).hexdigest(), chessboard_dims, max_side)
+        if os.path.exists(cache_path):
+            try:
+                with np.load(cache_path) as cached:
+                    size = tuple(int(v) for v in cached["image_size"])
+                    return size, (cached["corners"] if bool(cached["found"]) else None)
+            except (OSError, KeyError, ValueError):
+                pass  # corrupt/partial cache entry -> detect again
+
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return None, None
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    size = gray.shape[::-1]  # (w, h)
+    corners = find_corners(gray, chessboard_dims, max_side)
+
+    if cache_path is not None:
+        # write-then-rename so concurrent runs never see a half-written file
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, image_size=np.array(size), found=corners is not None,
+                 corners=corners if corners is not None else np.zeros((0, 1, 2), np.float32))
+        os.replace(tmp_path, cache_path)
+    return size, corners
+
+
+def init_detect_worker():
+    """Process-pool initializer for corner detection: one image per process, so no nested OpenCV thread pools."""
+    cv2.setNumThreads(1)
+
+
+def detect_images(image_files: List[str], chessboard_dims: Tuple[int, int], workers: Optional[int] = None,
+                  max_side: int = COARSE_MAX_SIDE, cache_dir: Optional[str] = config.CHESSBOARD_CACHE_DIR):
+    """detect_image() for every file, over a process pool (workers=1 runs inline). Results keep input order."""
+    workers = workers or os.cpu_count() or 1
+    args = [(f, chessboard_dims, max_side, cache_dir) for f in image_files]
+    if workers == 1 or len(image_files) <= 1:
+        return [detect_image(*a) for a in args]
+    with ProcessPoolExecutor(max_workers=min(workers, len(image_files)),
+                             initializer=init_detect_worker) as pool:
+        return list(pool.map(detect_image, *zip(*args)))
+
+
+def view_features(corners: np.ndarray, chessboard_dims: Tuple[int, int], image_size: Tuple[int, int]) -> np.ndarray:
+    """
+    Pose/coverage descriptor of one detection: board centre and size in the
+    frame, perspective foreshortening along both board axes, and in-plane
+    rotation (mod 180 degrees, since corner order can flip).
+    """
+    cols, rows = chessboard_dims
+    w, h = image_size
+    grid = corners.reshape(rows, cols, 2).astype(np.float64)
+    diag = np.hypot(w, h)
+
+    centre = grid.reshape(-1, 2).mean(axis=0) / (w, h)
+    size = np.sqrt(cv2.contourArea(cv2.convexHull(grid.reshape(-1, 1, 2).astype(np.float32)))) / diag
+
+    def edge_len(pts):
+        return np.linalg.norm(pts[-1] - pts[0])
+
+    top, bottom = edge_len(grid[0]), edge_len(grid[-1])
+    left, right = edge_len(grid[:, 0]), edge_len(grid[:, -1])
+    tilt_x = (top - bottom) / (top + bottom)
+    tilt_y = (left - right) / (left + right)
+
+    dx, dy = grid[0, -1] - grid[0, 0]
+    angle = 2 * np.arctan2(dy, dx)
+    return np.array([centre[0], centre[1], 2 * size, 2 * tilt_x, 2 * tilt_y,
+                     0.25 * np.cos(angle), 0.25 * np.sin(angle)])
+
+
+def select_diverse_views(imgpoints: List[np.ndarray], chessboard_dims: Tuple[int, int],
+                         image_size: Tuple[int, int], max_views: Optional[int],
+                         exclude: Iterable[int] = ()) -> List[int]:
+    """
+    Indices (ascending) of at most max_views detections, not in exclude, that
+    spread over pose and frame coverage.
+
+    Greedy farthest-point sampling on view_features(): start from the largest
+    board, then repeatedly add the view farthest from everything chosen so
+    far, so near-identical poses (e.g. consecutive video frames) are picked
+    only once the distinct ones are used up.
+    """
+    exclude = set(exclude)
+    candidates = [i for i in range(len(imgpoints)) if i not in exclude]
+    if not max_views or len(candidates) <= max_views:
+        return candidates
+
+    feats = np.stack([view_features(imgpoints[i], chessboard_dims, image_size) for i in candidates])
+    chosen = [int(np.argmax(feats[:, 2]))]
+    dist = np.linalg.norm(feats - feats[chosen[0]], axis=1)
+    while len(chosen) < max_views:
+        nxt = int(np.argmax(dist))
+        chosen.append(nxt)
+        dist = np.minimum(dist, np.linalg.norm(feats - feats[nxt], axis=1))
+    return sorted(candidates[j] for j in chosen)
+
+
+def view_error(objp: np.ndarray, corners: np.ndarray, camera_matrix, dist_coeffs) -> float:
+    """RMS reprojection error (px) of one detection under given intrinsics (pose from solvePnP)."""
+    ok, rvec, tvec = cv2.solvePnP(objp, corners, camera_matrix, dist_coeffs)
+    if not ok:
+        return float("nan")
+    projected, _ = cv2.projectPoints(objp, rvec, tvec, camera_matrix, dist_coeffs)
+    return float(np.sqrt(np.mean(np.sum((projected - corners) ** 2, axis=-1))))
+
+
+def calibrate_views(objp: np.ndarray, imgpoints: List[np.ndarray], chessboard_dims: Tuple[int, int],
+                    image_size: Tuple[int, int], max_views: Optional[int] = DEFAULT_MAX_VIEWS,
+                    outlier_factor: float = OUTLIER_FACTOR):
+    """
+    calibrateCamera on a diverse, outlier-free subset of the detections.
+
+    See calibrate_camera() for the selection and outlier rules. Returns
+    (rms, camera_matrix, dist_coeffs, status, errors) where status[i]
+    is "used", "outlier" or "redundant" (not selected) for imgpoints[i] and
+    errors[i] its RMS reprojection error (px) under the final intrinsics.
+    """
+    status = ["redundant"] * len(imgpoints)
+    outliers = set()
+    for round_ in range(MAX_OUTLIER_ROUNDS + 1):
+        # outliers are replaced by the next most diverse views when there are spare ones
+        keep = select_diverse_views(imgpoints, chessboard_dims, image_size, max_views, outliers)
+        rms, camera_matrix, dist_coeffs, _, _, _, _, per_view = cv2.calibrateCameraExtended(
+            [objp] * len(keep), [imgpoints[i] for i in keep], image_size, None, None
+        )
+        per_view = per_view.ravel()
+        limit = max(outlier_factor * float(np.median(per_view)), OUTLIER_MIN_PX)
+        bad = [keep[j] for j in np.flatnonzero(per_view > limit)]
+        if not bad or len(keep) - len(bad) < MIN_VIEWS or round_ == MAX_OUTLIER_ROUNDS:
+            break
+        outliers.update(bad)
+    for k in outliers:
+        status[k] = "outlier"
+
+    errors = [None] * len(imgpoints)
+    for j, k in enumerate(keep):
+        status[k] = "used"
+        errors[k] = float(per_view[j])
+    for k, corners in enumerate(imgpoints):
+        if errors[k] is None:
+            errors[k] = view_error(objp, corners, camera_matrix, dist_coeffs)
+    return rms, camera_matrix, dist_coeffs, status, errors
+
+
 def calibrate_camera(
     image_files: Iterable[str],
     chessboard_dims: Tuple[int, int],
     square_size_mm: float,
+    workers: Optional[int] = None,
+    cache_dir: Optional[str] = config.CHESSBOARD_CACHE_DIR,
+    max_views: Optional[int] = DEFAULT_MAX_VIEWS,
+    outlier_factor: float = OUTLIER_FACTOR,
+    return_views: bool = False,
 ):
     """
     Calibrate a pinhole camera from chessboard images.
 
+    Boards are detected in parallel over `workers` processes (default: all
+    cores) and per-image corners are cached under cache_dir (None disables the
+    cache), so re-running after adding photos only processes the new ones.
+
+    At most max_views detections (None = all) are calibrated on, chosen for
+    pose/coverage diversity (select_diverse_views). Views whose reprojection
+    error exceeds outlier_factor x the median (and OUTLIER_MIN_PX) are then
+    dropped and the camera recalibrated, for up to MAX_OUTLIER_ROUNDS rounds.
+
     Returns:
         camera_matrix: (3,3) float64
         dist_coeffs:   (k,)  float64
         rms_error:     float (reprojection RMS)
         image_size:    (w, h)
-        n_used:        int   (number of images with valid detections)
+        n_used:        int   (number of images in the final calibration)
+    and, with return_views=True, a sixth value:
+        views:         list of per-image dicts: file, status (used, outlier,
+                       redundant, no_board, unreadable) and, for images with
+                       a board, error_px (RMS reprojection error under the
+                       final intrinsics)
     """
     image_files = list(image_files)
     if not image_files:
         raise RuntimeError("No images provided to calibrate_camera().")
 
-    objpoints: List[np.ndarray] = []
-    imgpoints: List[np.ndarray] = []
-
     objp = _make_object_points(chessboard_dims, square_size_mm)
 
     gray_shape = None
-    used = 0
-
-    # sub-pixel corner refinement criteria
-    crit = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 1e-3)
+    views = []
+    detected: List[int] = []
+    imgpoints: List[np.ndarray] = []
 
-    for fname in image_files:
-        img = cv2.imread(fname)
-        if img is None:
+    detections = detect_images(image_files, chessboard_dims, workers, cache_dir=cache_dir)
+    for fname, (size, corners) in zip(image_files, detections):
+        views.append({"file": fname, "status": "unreadable" if size is None else "no_board"})
+        if size is None:
             continue
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
         if gray_shape is None:
-            gray_shape = gray.shape[::-1]  # (w, h)
-        elif gray.shape[::-1] != gray_shape:
+            gray_shape = size
+        elif size != gray_shape:
             raise RuntimeError(
-                f"Inconsistent image size: {fname} has {gray.shape[::-1]}, expected {gray_shape}"
+                f"Inconsistent image size: {fname} has {size}, expected {gray_shape}"
             )
 
-        found, corners = cv2.findChessboardCorners(gray, chessboard_dims, None)
-        if not found:
+        if corners is None:
             continue
 
-        corners_sub = cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), crit)
-        objpoints.append(objp)
-        imgpoints.append(corners_sub)
-        used += 1
+        detected.append(len(views) - 1)
+        imgpoints.append(corners)
 
-    if not objpoints:
+    if not imgpoints:
         raise RuntimeError("No valid chessboard detections found in supplied images.")
 
-    # Calibrate
-    rms, camera_matrix, dist_coeffs, rvecs, tvecs = cv2.calibrateCamera(
-        objpoints, imgpoints, gray_shape, None, None
+    rms, camera_matrix, dist_coeffs, status, errors = calibrate_views(
+        objp, imgpoints, chessboard_dims, gray_shape, max_views, outlier_factor
     )
+    for k, (st, err) in enumerate(zip(status, errors)):
+        views[detected[k]].update(status=st, error_px=err)
+    used = status.count("used")
 
     # Quick report
+    n_outliers = status.count("outlier")
     print(f"[calibration] images used: {used}/{len(image_files)}")
+    print(f"[calibration] boards found: {len(imgpoints)}, redundant: {len(imgpoints) - used - n_outliers}, "
+          f"outliers dropped: {n_outliers}")
     print(f"[calibration] image size : {gray_shape}")
     print(f"[calibration] RMS error  : {rms:.4f}")
 
-    return camera_matrix, dist_coeffs, float(rms), tuple(gray_shape), int(used)
\ No newline at end of file
+    result = camera_matrix, dist_coeffs, float(rms), tuple(gray_shape), int(used)
+    return result + (views,) if return_views else result
\ No newline at end of file
@@ -0,0 +1,205 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from . import config
+from .engine import LaneMeasurer
+from .output import MeasurementWriter
+from .pipeline import init_worker
+from .sidecar import NO_LANE, save_detections
+from .utils import utc_seconds_from_filename
+
+
+def plan_chunks(n_frames, n_chunks, warmup, keyframe_interval=0):
+    """
+    Split [0, n_frames) into (warm_start, start, stop) ranges.
+
+    Each chunk owns frames [start, stop) and is decoded from warm_start, which is
+    at least `warmup` frames earlier and rounded down to a multiple of
+    keyframe_interval (when > 0) so the seek lands on a keyframe. The last chunk
+    has stop=None and reads to the end of the video, so an inaccurate frame count
+    in the container metadata never drops frames.
+    """
+    # keep every chunk longer than the overlap it hands to the next one
+    min_len = 2 * (warmup + max(0, keyframe_interval))
+    n_chunks = max(1, min(n_chunks, n_frames // max(1, min_len)))
+    bounds = np.linspace(0, n_frames, n_chunks + 1).astype(int)
+    plan = []
+    for i in range(n_chunks):
+        start = int(bounds[i])
+        warm_start = max(0, start - warmup)
+        if keyframe_interval > 0:
+            warm_start -= warm_start % keyframe_interval
+        stop = int(bounds[i + 1]) if i < n_chunks - 1 else None
+        plan.append((warm_start, start, stop))
+    return plan
+
+
+def measure_range(video_path, homog_path, wheel, calib_path, start, stop=None, seed_lane_y=None,
+                  birdseye=False):
+    """
+    Run the detection pipeline over frames [start, stop) of a video.
+
+    seed_lane_y is the temporal-continuity state carried in from the previous
+    frame (None = no previous detection). Returns per-frame arrays: the
+    detection sidecar columns (frame, timestamp_ms, lane_y, band_top,
+    band_bottom, strength), confidence, cm (NaN when no lane) and state, the
+    lane row that find_lane_band would receive as prev_detection
+    for the next frame.
+    With birdseye=True (see engine.LaneMeasurer) band rows and state are patch rows.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video {video_path}")
+    frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    try:
+        measurer = LaneMeasurer.from_files(calib_path, homog_path, wheel, frame_size, birdseye=birdseye)
+    except BaseException:
+        cap.release()
+        raise
+    if seed_lane_y is not None:
+        measurer.prev_detection = (measurer.wheel[0], seed_lane_y)
+
+    if start > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        pos = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if pos != start:
+            cap.release()
+            raise RuntimeError(f"Seek to frame {start} of {video_path} landed on frame {pos}")
+
+    cols = {k: [] for k in ("frame", "timestamp_ms", "lane_y", "band_top", "band_bottom",
+                            "strength", "confidence", "cm", "state")}
+    frame_idx = start
+    try:
+        while stop is None or frame_idx < stop:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            m = measurer.process_frame(frame, frame_idx, cap.get(cv2.CAP_PROP_POS_MSEC))
+            band = m.band
+            cols["cm"].append(m.cm_to_lane if band else np.nan)
+            cols["frame"].append(frame_idx)
+            cols["timestamp_ms"].append(m.timestamp_ms)
+            cols["lane_y"].append(m.lane_y if band else NO_LANE)
+            cols["band_top"].append(band.top if band else NO_LANE)
+            cols["band_bottom"].append(band.bottom if band else NO_LANE)
+            cols["strength"].append(band.strength if band else 0.0)
+            cols["confidence"].append(m.confidence)
+            prev = measurer.prev_detection
+            cols["state"].append(prev[1] if prev else NO_LANE)
+            frame_idx += 1
+    finally:
+        cap.release()
+
+    return {
+        "frame": np.array(cols["frame"], dtype=np.int64),
+        "timestamp_ms": np.array(cols["timestamp_ms"], dtype=np.float64),
+        "lane_y": np.array(cols["lane_y"], dtype=np.int32),
+        "band_top": np.array(cols["band_top"], dtype=np.int32),
+        "band_bottom": np.array(cols["band_bottom"], dtype=np.int32),
+        "strength": np.array(cols["strength"], dtype=np.float32),
+        "confidence": np.array(cols["confidence"], dtype=np.float64),
+        "cm": np.array(cols["cm"], dtype=np.float64),
+        "state": np.array(cols["state"], dtype=np.int32),
+    }
+
+
+def _slice(part, lo):
+    return {k: v[lo:] for k, v in part.items()}
+
+
+def _synchronized(prev_part, part, warm_start, start):
+    """
+    True if `part` (started cold at warm_start) reaches the same tracking state as
+    the sequential run somewhere in the overlap [warm_start - 1, start - 1].
+
+    Detection is deterministic given (frame, state), so from the first frame where
+    both states agree the outputs are identical.
+    """
+    n_overlap = start - warm_start
+    if len(part["state"]) < n_overlap:
+        return False
+    cold = np.concatenate([[NO_LANE], part["state"][:n_overlap]])
+
+    # sequential state just before warm_start and through start - 1
+    if not len(prev_part["frame"]):
+        return False
+    lo = warm_start - 1 - int(prev_part["frame"][0])
+    if lo < 0:
+        return False
+    seq = prev_part["state"][lo:lo + n_overlap + 1]
+    if len(seq) != len(cold):
+        return False
+    return bool(np.any(seq == cold))
+
+
+def measure_video_chunked(video_path, homog_path, wheel, calib_path, out_csv_path,
+                          n_chunks=None, workers=None, warmup=120, keyframe_interval=None,
+                          opencv_threads=1, out_detections_path=None, out_npz_path=None,
+                          birdseye=False):
+    """
+    Measure one video with frame-range chunks processed by separate worker processes.
+
+    Chunks are decoded with a warm-up overlap; when merging in frame order, a chunk
+    is only trusted once its tracking state has converged to that of the preceding
+    (already merged) chunk inside the overlap. Chunks that never converge are
+    re-run from the end of the preceding chunk with the carried-over state, so the
+    CSV (and .npz) are identical to a sequential measure_video() run, bird's-eye
+    mode included (which, as there, writes no detections sidecar).
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video {video_path}")
+    n_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    cap.release()
+
+    workers = workers or os.cpu_count() or 1
+    n_chunks = n_chunks or workers
+    if keyframe_interval is None:
+        keyframe_interval = int(round(fps)) if fps and fps > 1 else 0
+    plan = plan_chunks(n_frames, n_chunks, warmup, keyframe_interval)
+    job_args = (video_path, homog_path, wheel, calib_path)
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(plan))), initializer=init_worker,
+                             initargs=(opencv_threads,)) as pool:
+        futures = [pool.submit(measure_range, *job_args, warm, stop, birdseye=birdseye)
+                   for warm, _, stop in plan]
+
+        merged = []
+        prev_part = None
+        n_reruns = 0
+        for (warm, start, stop), fut in zip(plan, futures):
+            part = fut.result()
+            if prev_part is not None and not _synchronized(prev_part, part, warm, start):
+                # never converged inside the warm-up: continue from the sequential state
+                seed = int(prev_part["state"][-1]) if len(prev_part["state"]) else NO_LANE
+                part = measure_range(*job_args, start, stop,
+                                     seed_lane_y=None if seed == NO_LANE else seed, birdseye=birdseye)
+                n_reruns += 1
+            else:
+                part = _slice(part, start - warm)
+            merged.append(part)
+            prev_part = part
+
+    merged = {k: np.concatenate([p[k] for p in merged]) for k in merged[0]}
+
+    if out_detections_path is not None and not birdseye:
+        save_detections(out_detections_path, merged, (int(wheel[0]), int(wheel[1])), frame_size,
+                        fps if fps and fps > 1 else 30.0, video_path, config.COLUMN_WIDTH)
+
+    out = MeasurementWriter(out_csv_path, out_npz_path, utc_seconds_from_filename(video_path))
+    try:
+        out.extend(merged["frame"], merged["timestamp_ms"], merged["cm"], merged["lane_y"],
+                   merged["confidence"])
+    except BaseException:
+        out.abort()
+        raise
+    stats = out.close()
+    stats.update(seconds=time.perf_counter() - t0, chunks=len(plan), reruns=n_reruns)
+    return stats
@@ -10,6 +10,9 @@ with open(CONFIG_FILE, "r") as f:
 # Default search paths
 CALIB_SEARCH_DIR = "data/calib"
 HOMOGRAPHY_SEARCH_DIR = "data/homography"
+UNDISTORT_CACHE_DIR = "data/cache/undistort"
+CHESSBOARD_CACHE_DIR = "data/cache/chessboard"
+FRAMESTORE_CACHE_DIR = "data/cache/frames"
 
 # Expose config values
 LANE_POINT_MODE    = _cfg.get("lane_point_mode", "far")
@@ -25,3 +28,14 @@ C_CONST            = _cfg.get("c_const", -8)
 MIN_CONTOUR_AREA   = _cfg.get("min_contour_area", 150)
 MIN_ASPECT_RATIO   = _cfg.get("min_aspect_ratio", 5.0)
 MORPH_KERNEL       = tuple(_cfg.get("morph_kernel", [10, 15]))
+
+ROI_CONTOUR_MARGIN = _cfg.get("roi_contour_margin", 150)
+
+# bird's-eye mode: detection in a top-down road-plane patch (see birdseye.py);
+# the search settings are in cm there (defaults = the pixel ones at 0.5 cm/px)
+BIRDSEYE_CM_PER_PX          = _cfg.get("birdseye_cm_per_px", 0.5)
+BIRDSEYE_WIDTH_CM           = _cfg.get("birdseye_width_cm", 200)
+BIRDSEYE_LENGTH_CM          = _cfg.get("birdseye_length_cm", 400)
+BIRDSEYE_COLUMN_WIDTH_CM    = _cfg.get("birdseye_column_width_cm", 2.5)
+BIRDSEYE_MIN_LANE_WIDTH_CM  = _cfg.get("birdseye_min_lane_width_cm", 7.5)
+BIRDSEYE_MAX_JUMP_CM        = _cfg.get("birdseye_max_jump_cm", 15)
@@ -0,0 +1,143 @@
+import os
+import queue
+import threading
+from collections import deque
+
+import cv2
+
+from .profiling import NULL_PROFILER
+from .undistort import undistort
+
+# "off" means no DebugVideo at all; the others are DebugVideo modes
+DEBUG_MODES = ("off", "all", "every", "events")
+
+
+def draw_overlay(img, frame_idx, pt_wheel, pt_lane, lateral_pos):
+    """Measurement line, distance and frame number, drawn in place."""
+    if lateral_pos is not None:
+        # overlay distance + line
+        cv2.line(img, pt_wheel, pt_lane, (255, 255, 255), 2)
+        cv2.putText(img, f"{lateral_pos:.1f}cm",
+                    (img.shape[1]-140, img.shape[0]-20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,0,0), 4)
+        cv2.putText(img, f"{lateral_pos:.1f}cm",
+                    (img.shape[1]-140, img.shape[0]-20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,255,255), 1)
+
+    # overlay frame number on every debug frame
+    cv2.putText(img, f"Frame {frame_idx}",
+                (10, img.shape[0] - 10),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,0,0), 2, cv2.LINE_AA)
+    cv2.putText(img, f"Frame {frame_idx}",
+                (10, img.shape[0] - 10),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,255,255), 1)
+
+
+class DebugVideo:
+    """
+    Debug video encoded on a background thread.
+
+    mode "all" writes every measured frame, "every" every Nth of them, and
+    "events" only the frames within `context` frames of a failed detection or
+    of a lane jump larger than max_jump rows. scale < 1 writes a downscaled
+    video (the overlay is drawn after resizing so it stays legible).
+
+    submit() takes the raw (distorted) BGR or luma frame; undistortion, overlay, resizing
+    and encoding all happen on the encoder thread, so the measurement loop only
+    pays for a queue put (and blocks once queue_size frames are waiting).
+    """
+
+    def __init__(self, path, fps, frame_size, maps, wheel, mode="all", every=10, scale=1.0,
+                 context=15, max_jump=30, queue_size=32, prof=NULL_PROFILER):
+        if mode not in DEBUG_MODES[1:]:
+            raise ValueError(f"Unknown debug video mode {mode!r} (expected one of {', '.join(DEBUG_MODES[1:])})")
+        self.mode, self.every, self.context, self.max_jump = mode, max(1, int(every)), context, max_jump
+        self.maps, self.wheel, self.prof = maps, (int(wheel[0]), int(wheel[1])), prof
+        self.scale = float(scale)
+        w, h = frame_size
+        # even dimensions keep every codec happy
+        self.out_size = (w, h) if self.scale == 1 else \
+            (max(2, int(round(w * self.scale)) // 2 * 2), max(2, int(round(h * self.scale)) // 2 * 2))
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        self.writer = cv2.VideoWriter(path, fourcc, fps / self.every if mode == "every" else fps,
+                                      self.out_size)
+        if not self.writer.isOpened():
+            raise RuntimeError("Failed to open VideoWriter. Check codec/fps/frame size.")
+
+        self.frames_written = 0
+        self._n_submitted = 0
+        self._before = deque(maxlen=max(0, context))  # pre-roll for "events"
+        self._after = 0
+        self._prev_lane_y = None
+        self._error = None
+        self._q = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._encode, daemon=True)
+        self._thread.start()
+
+    def submit(self, frame_idx, frame, pt_lane, lateral_pos):
+        """Hand one measured frame (raw) and its result to the encoder, if the mode keeps it."""
+        if self._error is not None:
+            raise self._error
+        item = (frame_idx, frame, pt_lane, lateral_pos)
+        n = self._n_submitted
+        self._n_submitted += 1
+
+        if self.mode == "all":
+            self._q.put(item)
+        elif self.mode == "every":
+            if n % self.every == 0:
+                self._q.put(item)
+        else:
+            lane_y = pt_lane[1] if pt_lane else None
+            event = lane_y is None or (self._prev_lane_y is not None
+                                       and abs(lane_y - self._prev_lane_y) > self.max_jump)
+            if lane_y is not None:
+                self._prev_lane_y = lane_y
+            if event:
+                while self._before:
+                    self._q.put(self._before.popleft())
+                self._q.put(item)
+                self._after = self.context
+            elif self._after > 0:
+                self._q.put(item)
+                self._after -= 1
+            elif self._before.maxlen:
+                self._before.append(item)
+
+    def _encode(self):
+        while True:
+            item = self._q.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue  # keep draining so submit() never blocks on a dead encoder
+            try:
+                frame_idx, frame, pt_lane, lateral_pos = item
+                t = self.prof.now()
+                img = undistort(frame, self.maps)
+                if img.ndim == 2:  # luma-only decoding: grey video, coloured overlay
+                    img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+                pt_wheel = self.wheel
+                if self.scale != 1:
+                    img = cv2.resize(img, self.out_size, interpolation=cv2.INTER_AREA)
+                    sx, sy = self.out_size[0] / frame.shape[1], self.out_size[1] / frame.shape[0]
+                    pt_wheel = (int(round(pt_wheel[0] * sx)), int(round(pt_wheel[1] * sy)))
+                    if pt_lane is not None:
+                        pt_lane = (int(round(pt_lane[0] * sx)), int(round(pt_lane[1] * sy)))
+                draw_overlay(img, frame_idx, pt_wheel, pt_lane, lateral_pos)
+                t = self.prof.lap("overlay", t)
+                self.writer.write(img)
+                self.prof.lap("encode", t)
+                self.frames_written += 1
+            except Exception as e:  # re-raised on the measuring thread by submit()/close()
+                self._error = e
+
+    def close(self):
+        """Finish encoding queued frames and release the writer; re-raises encoder errors."""
+        self._q.put(None)
+        self._thread.join()
+        self.writer.release()
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,246 @@
+import json
+import shutil
+import subprocess
+import tempfile
+
+import cv2
+import numpy as np
+
+DECODERS = ("opencv", "ffmpeg")
+
+# video-range (16-235) luma -> full-range grey, what BGR decoding + cvtColor gives
+VIDEO_RANGE_LUT = np.clip(np.round((np.arange(256) - 16) * 255 / 219), 0, 255).astype(np.uint8)
+
+
+def scaled_size(size, scale):
+    """Decoded (w, h) for a downscale factor (even-sized, as most decoders/filters want)."""
+    w, h = size
+    if scale == 1:
+        return int(w), int(h)
+    return max(2, int(round(w * scale / 2)) * 2), max(2, int(round(h * scale / 2)) * 2)
+
+
+def resize_transform(src_size, dst_size):
+    """3x3 map from src_size pixel coordinates to dst_size ones (pixel centres aligned, like INTER_AREA)."""
+    sx, sy = dst_size[0] / src_size[0], dst_size[1] / src_size[1]
+    return np.array([[sx, 0, 0.5 * sx - 0.5], [0, sy, 0.5 * sy - 0.5], [0, 0, 1]], dtype=np.float64)
+
+
+def _quiet(fn, *args):
+    """Call fn without OpenCV's warnings: with BGR conversion off its FFmpeg backend warns on open and on
+    every frame that the format is "treated as 8UC1" (which is the Y plane we want)."""
+    level = cv2.utils.logging.getLogLevel()
+    cv2.utils.logging.setLogLevel(cv2.utils.logging.LOG_LEVEL_ERROR)
+    try:
+        return fn(*args)
+    finally:
+        cv2.utils.logging.setLogLevel(level)
+
+
+class OpenCVDecoder:
+    """
+    cv2.VideoCapture behind the decoder interface (see open_decoder).
+
+    With luma=True frames come back as single-channel grey. Where OpenCV's
+    FFmpeg backend can hand over the decoded Y plane directly (8-bit YUV
+    formats) no chroma is upsampled or converted; the plane's range is checked
+    against a normally decoded first frame and video-range luma is stretched to
+    full range with one table lookup, so grey levels match BGR decoding +
+    cvtColor to within a level or two. Other formats fall back to cvtColor.
+    Decoding costs about the same as with BGR output (the codec's work
+    dominates), so luma only saves processing two colour channels, and the
+    extra opens in _setup_y_plane() and the lookup can eat that up.
+    """
+
+    def __init__(self, path, luma=False, threads=0, scale=1.0):
+        self.path, self.luma = path, luma
+        self._params = [cv2.CAP_PROP_N_THREADS, int(threads)] if threads else []
+        self.cap = self._open()
+        self.source_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                            int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self.frame_size = scaled_size(self.source_size, scale)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self._next = 0
+        self.y_plane, self._lut = False, None
+        if luma:
+            self._setup_y_plane()
+
+    def _open(self, raw=False):
+        params = self._params + ([cv2.CAP_PROP_CONVERT_RGB, 0] if raw else [])
+        cap = _quiet(cv2.VideoCapture, self.path, cv2.CAP_ANY, params)
+        if not cap.isOpened():
+            raise RuntimeError(f"Could not open video {self.path}")
+        return cap
+
+    def _read_raw(self, cap, out=None):
+        return _quiet(cap.read, out)
+
+    def _setup_y_plane(self):
+        """Use the raw Y plane if it really is one: same size and linear in the BGR-decoded grey."""
+        raw = self._open(raw=True)
+        ok, y = self._read_raw(raw)
+        ok_bgr, bgr = self.cap.read()
+        if ok and ok_bgr and y.shape == bgr.shape[:2] and y.dtype == np.uint8:
+            gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+            step = max(1, y.size // 50000)
+            ys, gs = y.ravel()[::step].astype(np.float64), gray.ravel()[::step].astype(np.float64)
+            if ys.std() > 2:
+                lut = VIDEO_RANGE_LUT if np.polyfit(ys, gs, 1)[0] > 1.08 else None  # 255/219 = 1.16
+                if np.abs(gs - (ys if lut is None else lut[y.ravel()[::step]])).mean() < 2:
+                    raw.release()
+                    raw = self._open(raw=True)  # rewind
+                    self.cap.release()
+                    self.cap, self.y_plane, self._lut = raw, True, lut
+                    return
+        raw.release()
+        self.cap.release()
+        self.cap = self._open()
+
+    def read(self, out=None):
+        """(frame_idx, timestamp_ms, frame) of the next frame, or None at the end."""
+        direct = out if self.frame_size == self.source_size else None  # decode straight into out
+        if self.y_plane:
+            ok, frame = self._read_raw(self.cap, direct)
+        else:
+            ok, frame = self.cap.read(None if self.luma else direct)
+        if not ok:
+            return None
+        frame_idx = self._next
+        self._next += 1
+        timestamp_ms = self.cap.get(cv2.CAP_PROP_POS_MSEC)  # from the frame's PTS in the FFmpeg backend
+        if self.luma and not self.y_plane:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=direct)
+        if self._lut is not None:
+            frame = cv2.LUT(frame, self._lut, dst=frame)
+        if self.frame_size != self.source_size:
+            frame = cv2.resize(frame, self.frame_size, dst=out, interpolation=cv2.INTER_AREA)
+        return frame_idx, timestamp_ms, frame
+
+    def skip(self, n):
+        """Advance n frames with grab() only (no retrieve / colour conversion)."""
+        for _ in range(n):
+            if not self.cap.grab():
+                return
+            self._next += 1
+
+    def release(self):
+        self.cap.release()
+
+
+def probe_video(path, ffprobe="ffprobe"):
+    """
+    Stream properties and every frame's presentation time of a video's first
+    video stream, from ffprobe's packet list (no decoding). Returns a dict
+    with width, height, fps and pts_ms (sorted, relative to the
+    stream start).
+    """
+    out = subprocess.run([ffprobe, "-v", "error", "-select_streams", "v:0", "-of", "json",
+                          "-show_entries", "stream=width,height,avg_frame_rate,r_frame_rate,start_time:"
+                          "packet=pts_time", path],
+                         check=True, capture_output=True, text=True).stdout
+    info = json.loads(out)
+    stream = info["streams"][0]
+    pts = np.sort([float(p["pts_time"]) for p in info.get("packets", []) if p.get("pts_time", "N/A") != "N/A"])
+    try:
+        start = float(stream["start_time"])
+    except (KeyError, ValueError):
+        start = pts[0] if len(pts) else 0.0
+    num, _, den = (stream.get("avg_frame_rate") or stream.get("r_frame_rate") or "0/1").partition("/")
+    fps = float(num) / float(den or 1) if float(den or 1) else 0.0
+    return {"width": int(stream["width"]), "height": int(stream["height"]), "fps": fps,
+            "pts_ms": (pts - start) * 1000.0}
+
+
+class FFmpegDecoder:
+    """
+    An ffmpeg subprocess decoding straight to full-range grey (the Y plane).
+
+    Frames arrive over a pipe as raw 8-bit luma and are read with readinto()
+    directly into the frame array (or the caller's out buffer), so chroma is
+    never converted to BGR and no intermediate bytes objects are made. threads
+    sets ffmpeg's decoder threads (0 = its default); scale < 1 downscales in
+    ffmpeg's scaler before the pipe. Timestamps are each frame's PTS from
+    ffprobe's packet list rather than frame-count arithmetic.
+    """
+
+    def __init__(self, path, threads=0, scale=1.0):
+        ffmpeg, ffprobe = shutil.which("ffmpeg"), shutil.which("ffprobe")
+        if ffmpeg is None or ffprobe is None:
+            raise RuntimeError("The ffmpeg decoder needs the ffmpeg and ffprobe programs on the PATH")
+        self.luma = True
+        info = probe_video(path, ffprobe)
+        self.source_size = (info["width"], info["height"])
+        self.frame_size = w, h = scaled_size(self.source_size, scale)
+        self.fps = info["fps"]
+        self.pts_ms = info["pts_ms"]
+        self.frame_count = len(self.pts_ms)
+        self._next = 0
+        self._discard = np.empty((h, w), np.uint8)
+        self._stderr = tempfile.TemporaryFile()
+        cmd = [ffmpeg, "-v", "error", "-nostdin", "-threads", str(int(threads)), "-i", path,
+               "-map", "0:v:0", "-an", "-sn", "-fps_mode", "passthrough",
+               "-vf", f"scale={w}:{h}:flags=area:out_range=full,format=gray", "-f", "rawvideo", "pipe:1"]
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=self._stderr, bufsize=0)
+
+    def _read_into(self, buf):
+        view = memoryview(buf).cast("B")
+        got = 0
+        while got < len(view):
+            n = self.proc.stdout.readinto(view[got:])
+            if not n:
+                break
+            got += n
+        if got == len(view):
+            return True
+        if self.proc.wait() != 0:
+            self._stderr.seek(0)
+            raise RuntimeError(f"ffmpeg failed: {self._stderr.read().decode(errors='replace').strip()[-500:]}")
+        return False
+
+    def read(self, out=None):
+        """(frame_idx, timestamp_ms, frame) of the next frame, or None at the end."""
+        frame = np.empty(self.frame_size[::-1], np.uint8) if out is None else out
+        if not self._read_into(frame):
+            return None
+        frame_idx = self._next
+        self._next += 1
+        if frame_idx < len(self.pts_ms):
+            timestamp_ms = float(self.pts_ms[frame_idx])
+        else:  # more frames than packets with a PTS: continue at the nominal rate
+            timestamp_ms = (float(self.pts_ms[-1]) if len(self.pts_ms) else 0.0) + \
+                (frame_idx - len(self.pts_ms) + 1) * 1000.0 / (self.fps or 30.0)
+        return frame_idx, timestamp_ms, frame
+
+    def skip(self, n):
+        for _ in range(n):
+            if not self._read_into(self._discard):
+                return
+            self._next += 1
+
+    def release(self):
+        self.proc.stdout.close()
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        self._stderr.close()
+
+
+def open_decoder(path, backend="opencv", luma=False, threads=0, scale=1.0):
+    """
+    Open a video for measurement with one of DECODERS.
+
+    Every decoder has read(out=None) -> (frame_idx, timestamp_ms, frame) or
+    None at the end, skip(n) and release(), plus source_size / frame_size
+    (w, h before and after decode-time downscaling by scale), fps, frame_count
+    and luma. luma=True returns single-channel grey frames (always the case
+    for "ffmpeg"); out, if given, is a preallocated frame-sized array the
+    decoder may fill instead of allocating.
+    """
+    if not 0 < scale <= 1:
+        raise ValueError(f"Decode scale must be in (0, 1], got {scale}")
+    if backend == "opencv":
+        return OpenCVDecoder(path, luma, threads, scale)
+    if backend == "ffmpeg":
+        return FFmpegDecoder(path, threads, scale)
+    raise ValueError(f"Unknown decoder {backend!r}; expected one of {DECODERS}")
@@ -0,0 +1,291 @@
+import functools
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+from . import config
+from .profiling import NULL_PROFILER
+from .undistort import undistort
+
+
+class DetectionParams(NamedTuple):
+    """
+    Thresholding, shape-filter and histogram-search settings (the config.json
+    keys of the same names), passed as an object so several sets can be tried
+    side by side in one process; None arguments mean the configured values.
+    """
+    gaussian_kernel: tuple
+    block_size: int
+    c_const: float
+    min_contour_area: float
+    min_aspect_ratio: float
+    morph_kernel: tuple
+    column_width: int
+    min_lane_width: int
+    max_jump: float
+
+    @classmethod
+    def from_config(cls, **overrides):
+        """The values loaded from config.json, with overrides (field=value) applied."""
+        return cls(tuple(config.GAUSSIAN_KERNEL), config.BLOCK_SIZE, config.C_CONST, config.MIN_CONTOUR_AREA,
+                   config.MIN_ASPECT_RATIO, tuple(config.MORPH_KERNEL), config.COLUMN_WIDTH,
+                   config.MIN_LANE_WIDTH, config.MAX_JUMP)._replace(**overrides)
+
+    def scaled(self, sx, sy=None):
+        """The same settings for frames resized by (sx, sy): pixel sizes scaled, kernel sizes kept odd."""
+        sy = sx if sy is None else sy
+
+        def odd(v):
+            return max(1, int(round((v - 1) / 2)) * 2 + 1)
+
+        return self._replace(
+            gaussian_kernel=(odd(self.gaussian_kernel[0] * sx), odd(self.gaussian_kernel[1] * sy)),
+            block_size=max(3, odd(self.block_size * (sx + sy) / 2)),
+            min_contour_area=self.min_contour_area * sx * sy,
+            morph_kernel=(odd(self.morph_kernel[0] * sx), odd(self.morph_kernel[1] * sy)),  # even ones shift edges
+            column_width=max(1, int(round(self.column_width * sx))),
+            min_lane_width=max(1, int(round(self.min_lane_width * sy))),
+            max_jump=self.max_jump * sy,
+        )
+
+
+class LaneBand(NamedTuple):
+    lane_y: int       # row reported as the lane line (band edge farther from the wheel)
+    top: int          # first row of the selected histogram band
+    bottom: int       # last row of the selected histogram band (inclusive)
+    strength: float   # lane pixels summed over the band
+
+
+def find_runs(mask):
+    """
+    Runs of True in a 1-D boolean array.
+
+    Returns (starts, ends) as int arrays with inclusive ends, in order.
+    """
+    padded = np.concatenate(([False], np.asarray(mask, dtype=bool), [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges[0::2], edges[1::2] - 1
+
+
+def histogram_peaks(histogram, min_width=None):
+    """
+    Continuous bands of the strip histogram that could be a lane line.
+
+    A band is a run of rows at >= 20% of the histogram maximum that is at least
+    min_width (default MIN_LANE_WIDTH) rows long and holds at least
+    2*min_width lane pixels. Returns (starts, ends, totals) arrays, top to bottom.
+    """
+    if min_width is None:
+        min_width = config.MIN_LANE_WIDTH
+    above = histogram >= histogram.max() * 0.2
+    starts, ends = find_runs(above)
+
+    # band totals in one pass: reduceat over [start, end+1) pairs (padded so end+1 is a valid index)
+    bounds = np.stack([starts, ends + 1], axis=1).ravel()
+    totals = np.add.reduceat(np.append(histogram, 0), bounds)[0::2]
+
+    keep = (ends - starts + 1 >= min_width) & (totals >= min_width * 2)
+    return starts[keep], ends[keep], totals[keep]
+
+
+def select_peak(starts, ends, totals, n_rows, prev_row=None, max_jump=None):
+    """
+    Index of the band to use: the strongest within max_jump (default MAX_JUMP)
+    rows of prev_row if any, otherwise the strongest overall, ties broken
+    towards the strip centre (first band wins remaining ties).
+    """
+    centers = (starts + ends) / 2
+
+    # prefer temporal continuity if available
+    if prev_row is not None:
+        if max_jump is None:
+            max_jump = config.MAX_JUMP
+        candidates = np.flatnonzero(np.abs(centers - prev_row) <= max_jump)
+        if len(candidates):
+            return int(candidates[np.argmax(totals[candidates])])
+
+    # fallback: strongest, then nearer center
+    strongest = totals == totals.max()
+    closeness = np.where(strongest, -np.abs(centers - n_rows / 2), -np.inf)
+    return int(np.argmax(closeness))
+
+
+# Lane band selection by histogram peak finding (None if no plausible band).
+# max_jump overrides MAX_JUMP, e.g. scaled up when only every Nth frame is processed;
+# column_width / min_width override COLUMN_WIDTH / MIN_LANE_WIDTH (bird's-eye patches).
+# rows=(s0, s1) limits the search to those rows (default: every row above the wheel, or
+# below it with below=True) of a binary image whose first row is row y0; rows in and out stay absolute.
+def find_lane_band(binary_img, wheel_x, wheel_y, prev_detection=None, max_jump=None,
+                   column_width=None, min_width=None, y0=0, rows=None, below=False):
+    if column_width is None:
+        column_width = config.COLUMN_WIDTH
+    s0, s1 = (max(y0, wheel_y + 1), y0 + binary_img.shape[0]) if below else (y0, wheel_y)
+    if rows is not None:
+        s0, s1 = max(rows[0], s0), min(rows[1], s1)
+    x_min = max(0, wheel_x - column_width)
+    x_max = min(binary_img.shape[1], wheel_x + column_width)
+    strip = binary_img[s0 - y0:s1 - y0, x_min:x_max]
+    if strip.size == 0:
+        return None
+
+    histogram = np.count_nonzero(strip == 255, axis=1).astype(np.float32)
+    if histogram.max() == 0:
+        return None
+
+    starts, ends, totals = histogram_peaks(histogram, min_width)
+    if not len(starts):
+        return None
+
+    prev_row = prev_detection[1] - s0 if prev_detection is not None else None
+    best = select_peak(starts, ends, totals, len(histogram), prev_row, max_jump)
+    band_top, band_bottom = int(starts[best]) + s0, int(ends[best]) + s0
+
+    # pick the farther side from the wheel
+    d_top = abs(wheel_y - band_top)
+    d_bottom = abs(wheel_y - band_bottom)
+    lane_y = band_top if d_top >= d_bottom else band_bottom
+
+    return LaneBand(lane_y, band_top, band_bottom, float(totals[best]))
+
+
+def lane_strip_width(wheel_x, frame_width, column_width=None):
+    """Columns of the histogram strip around wheel_x (narrower at the frame edges)."""
+    if column_width is None:
+        column_width = config.COLUMN_WIDTH
+    return min(frame_width, wheel_x + column_width) - max(0, wheel_x - column_width)
+
+
+def band_confidence(strength, top, bottom, strip_width):
+    """
+    Detection confidence in [0, 1]: the fraction of the selected band (rows
+    top..bottom of a strip_width-wide strip) that is lane pixels. Works on
+    scalars and on arrays; a missing band (strength 0) gives 0.
+    """
+    return strength / ((bottom - top + 1) * strip_width)
+
+
+def filter_contours(binary, out=None, params=None):
+    """
+    Keep (filled) the external contours whose bounding box passes the
+    MIN_CONTOUR_AREA / MIN_ASPECT_RATIO filter (or those of params).
+
+    out may be a preallocated uint8 array of the image shape, including binary
+    itself (contours are extracted before it is overwritten).
+    """
+    if params is None:
+        params = DetectionParams.from_config()
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if out is None:
+        out = np.zeros_like(binary)
+    else:
+        out.fill(0)
+    for cnt in contours:
+        _, _, w, h = cv2.boundingRect(cnt)
+        if w * h >= params.min_contour_area and max(w, h) / (min(w, h) + 1e-5) >= params.min_aspect_ratio:
+            cv2.drawContours(out, [cnt], -1, 255, -1)
+    return out
+
+
+@functools.lru_cache(maxsize=8)
+def morph_kernel(size):
+    """Rectangular structuring element for the open/close step (built once per size)."""
+    return cv2.getStructuringElement(cv2.MORPH_RECT, size)
+
+
+class FrameBuffers:
+    """
+    Per-video scratch images for prepare_frame()/binarize(), reused frame after frame.
+
+    Every step writes into one of these through OpenCV's dst= argument, so
+    steady-state processing allocates no image-sized arrays (only the contour
+    lists from findContours). Buffers are (re)allocated when the processed
+    image gets wider, narrower or taller than before; a shorter image (a
+    tracked row window) gets views of the first rows instead. The binary image
+    binarize() returns is one of them and is overwritten by the next frame.
+    """
+
+    NAMES = ("undistorted", "gray", "blurred", "binary", "scratch")
+
+    def __init__(self):
+        self.shape = self._capacity = None
+
+    def ensure(self, shape):
+        """Provide buffers for an (h, w) image, allocating only if they don't fit; returns self."""
+        if self.shape != shape:
+            h, w = shape
+            if self._capacity is None or self._capacity[1] != w or self._capacity[0] < h:
+                self._base = {name: np.empty((h, w, 3) if name == "undistorted" else (h, w), np.uint8)
+                              for name in self.NAMES}
+                self._capacity = shape
+            for name, base in self._base.items():
+                setattr(self, name, base[:h])  # leading rows of a C-contiguous array: still contiguous
+            self.shape = shape
+        return self
+
+
+# Threshold + shape filtering of an undistorted grayscale image
+# (prof: optional profiling.StageProfiler timing each step;
+#  buffers: optional FrameBuffers to write every step into instead of new arrays;
+#  params: optional DetectionParams instead of the configured values)
+def binarize(gray, prof=NULL_PROFILER, buffers=None, params=None):
+    if buffers is None:
+        buffers = FrameBuffers()
+    if params is None:
+        params = DetectionParams.from_config()
+    buffers.ensure(gray.shape)
+    t = prof.now()
+    blurred = cv2.GaussianBlur(gray, params.gaussian_kernel, 0, dst=buffers.blurred)
+    t = prof.lap("blur", t)
+    binary = cv2.adaptiveThreshold(
+        blurred, 255,
+        cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY,
+        blockSize=params.block_size, C=params.c_const, dst=buffers.binary
+    )
+    t = prof.lap("threshold", t)
+
+    binary = filter_contours(binary, out=binary, params=params)
+    t = prof.lap("contours", t)
+
+    # close into scratch, open back into binary (morphologyEx keeps its own
+    # intermediate pass internal, which is faster than four separate dilate/erode calls)
+    kernel = morph_kernel(tuple(params.morph_kernel))
+    cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel, dst=buffers.scratch)
+    cv2.morphologyEx(buffers.scratch, cv2.MORPH_OPEN, kernel, dst=binary)
+    prof.lap("morphology", t)
+    return binary
+
+
+# Undistort + binarize one raw (BGR or single-channel luma) frame: whole frame, or only the ROI.
+# Returns (binary, undistorted BGR frame or None in ROI mode, x offset of binary in the frame).
+# buffers: optional FrameBuffers reused across frames (the results then live in them).
+# rows=(r0, r1): undistort and binarize only those rows of the ROI (binary row 0 = ROI row r0).
+def prepare_frame(frame, maps, roi=None, prof=NULL_PROFILER, buffers=None, params=None, rows=None):
+    if buffers is None:
+        buffers = FrameBuffers()
+    t = prof.now()
+    if roi is None:
+        src, x0, use_maps = frame, 0, maps
+    else:
+        sx0, sy0, sx1, sy1 = roi.src_rect
+        src, x0, use_maps = frame[sy0:sy1, sx0:sx1], roi.rect[0], roi.maps
+    if rows is not None:
+        use_maps = (use_maps[0][rows[0]:rows[1]], use_maps[1][rows[0]:rows[1]])
+    buffers.ensure(use_maps[0].shape[:2])
+    if src.ndim == 2:  # luma frames from the decoder: undistort straight into the grey buffer
+        image = gray = undistort(src, use_maps, buffers.gray)
+        prof.lap("undistort", t)
+    else:
+        image = undistort(src, use_maps, buffers.undistorted)
+        t = prof.lap("undistort", t)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=buffers.gray)
+        prof.lap("grayscale", t)
+    return binarize(gray, prof, buffers, params), (image if roi is None else None), x0
+
+
+# Histogram search on a prepared binary image whose first column is frame column x0
+# (and first row row y0; rows=(s0, s1) limits the search, see find_lane_band)
+def search_band(binary, x0, wheel_x, wheel_y, prev_detection=None, max_jump=None,
+                column_width=None, min_width=None, y0=0, rows=None, below=False):
+    return find_lane_band(binary, wheel_x - x0, wheel_y, prev_detection, max_jump, column_width, min_width,
+                          y0, rows, below)
@@ -0,0 +1,357 @@
+import math
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from . import config
+from .birdseye import make_birdseye_view, patch_margin
+from .decoder import resize_transform
+from .detection import (LaneBand, DetectionParams, FrameBuffers, prepare_frame, search_band, band_confidence,
+                        lane_strip_width)
+from .homography import load_homography
+from .measurement import pixel_to_real_world, lateral_position
+from .profiling import NULL_PROFILER
+from .points import DIRECTIONS, check_points
+from .roi import frame_roi
+from .tracking import LaneTracker
+from .undistort import load_intrinsics, get_undistort_maps
+
+
+class LaneMeasurement(NamedTuple):
+    frame: int                    # frame index (source index, or a running count)
+    timestamp_ms: Optional[float]
+    cm_to_lane: Optional[float]   # None = no lane detected
+    lane_y: Optional[int]         # lane pixel row in the undistorted frame
+    confidence: float             # see detection.band_confidence (0 when no lane)
+    band: Optional[LaneBand]
+    smoothed_cm: Optional[float] = None   # tracked mode: cm_to_lane of the filtered row (None = no track)
+    innovation: Optional[float] = None    # tracked mode: detected minus predicted row, in search rows
+
+
+class LaneMeasurer:
+    """
+    GUI-free lane measurement for one camera setup, set up once and then fed frames.
+
+    Undistortion maps, the projected wheel point and the per-frame scratch
+    images (detection.FrameBuffers) are prepared in the constructor, so
+    process_frame() only does per-frame work. The histogram search's temporal
+    continuity (previous lane row) is kept between calls; reset() forgets it,
+    e.g. when switching to another video.
+
+    wheel is the (x, y) reference point in undistorted pixels and frame_size
+    the (w, h) of the raw frames. max_jump overrides the search's continuity
+    window (base_max_jump: the max_jump setting, in search rows; scale it by
+    the stride when feeding every Nth frame) and wheel_offset_cm the
+    configured wheel_offset_cm. params (detection.DetectionParams) replaces
+    the configured thresholding and search settings for this measurer only.
+
+    birdseye=True detects in a top-down road patch instead of the undistorted
+    frame (see birdseye.make_birdseye_view): one remap per frame, search rows
+    in cm_per_px steps and the BIRDSEYE_* search settings in cm. lane_y is still
+    reported as an undistorted-frame row; band rows are patch rows.
+
+    track=True follows the lane row with a constant-velocity Kalman filter
+    (tracking.LaneTracker) and, while it has a track, undistorts, thresholds
+    and searches only a window of rows around the predicted row (at least
+    max_jump, else GATE_SIGMA innovation sigmas either side); the whole frame
+    is processed again once the track is lost. Measurements then also carry the
+    smoothed cm_to_lane and the innovation. process_frame() does all of this
+    itself, since each window depends on the previous frame.
+
+    decoded_size=(w, h) is for frames downscaled while decoding (see
+    decoder.open_decoder): intrinsics, homography, wheel point and pixel
+    settings are rescaled to it once, frames must then arrive at that size and
+    lane_y is still reported as a frame_size row. Frames may be BGR or
+    single-channel luma.
+
+    direction="down" looks for the lane line below the wheel point in the
+    frame instead of above it (not in bird's-eye mode). maps reuses
+    undistortion maps already built for the same camera and frame size.
+
+        measurer = LaneMeasurer.from_files(calib_path, homog_path, (812, 640), (1920, 1080))
+        for m in measurer.process_stream(frames):
+            print(m.frame, m.cm_to_lane)
+    """
+
+    def __init__(self, camera_matrix, dist_coeffs, homography_matrix, wheel, frame_size,
+                 max_jump=None, wheel_offset_cm=None, cache_dir=config.UNDISTORT_CACHE_DIR,
+                 birdseye=False, params=None, track=False, decoded_size=None, direction="up", maps=None):
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {DIRECTIONS}, got {direction!r}")
+        if birdseye and direction != "up":
+            raise ValueError("Bird's-eye mode only searches above the wheel point (direction='up')")
+        self.below = direction == "down"
+        self.homography_matrix = np.asarray(homography_matrix, dtype=np.float64)
+        self.wheel = (int(wheel[0]), int(wheel[1]))
+        self.frame_size = (int(frame_size[0]), int(frame_size[1]))
+        self.wheel_offset_cm = wheel_offset_cm
+        self.params = DetectionParams.from_config() if params is None else params
+        self.real_wheel = pixel_to_real_world(self.wheel, self.homography_matrix)  # fixed for the run
+
+        self.source_size, self.to_decoded = self.frame_size, None
+        if decoded_size is not None and tuple(decoded_size) != self.frame_size:
+            # work at the decoded resolution throughout: same road, fewer pixels
+            A = resize_transform(self.frame_size, decoded_size)
+            self.to_decoded = A
+            camera_matrix = A @ np.asarray(camera_matrix, dtype=np.float64)
+            self.homography_matrix = self.homography_matrix @ np.linalg.inv(A)
+            self.wheel = tuple(int(round(v)) for v in (A @ [*self.wheel, 1.0])[:2])
+            self.frame_size = (int(decoded_size[0]), int(decoded_size[1]))
+            if not birdseye:  # bird's-eye settings are in road cm already
+                self.params = self.params.scaled(A[0, 0], A[1, 1])
+
+        self.maps = get_undistort_maps(camera_matrix, dist_coeffs, self.frame_size, cache_dir=cache_dir) \
+            if maps is None else maps
+        if birdseye:
+            self.view = make_birdseye_view(camera_matrix, dist_coeffs, self.homography_matrix,
+                                           self.wheel, self.frame_size, params=self.params)
+            self.roi = self.view.roi
+            self.search_wheel = self.view.wheel
+            self.column_width, self.min_width = self.view.column_width, self.view.min_width
+            self.base_max_jump = self.view.max_jump
+            search_width = self.roi.rect[2]
+        else:
+            self.view = None
+            # the whole frame: the contour filter classifies shapes from their full extent, and lane
+            # markings cross any strip around the wheel, so a cropped strip would change the result
+            self.roi = frame_roi(self.maps, self.frame_size)
+            self.search_wheel = self.wheel
+            self.column_width, self.min_width = self.params.column_width, self.params.min_lane_width
+            self.base_max_jump = self.params.max_jump
+            search_width = self.frame_size[0]
+        self.max_jump = self.base_max_jump if max_jump is None else max_jump
+        self.strip_width = lane_strip_width(self.search_wheel[0], search_width, self.column_width)
+
+        x0, y0, x1, y1 = self.roi.rect
+        self.buffers = FrameBuffers().ensure((y1 - y0, x1 - x0))  # frame- or patch-sized scratch images
+        self.tracker = LaneTracker() if track else None
+        # rows processed beyond a search window: the blur/threshold/morphology footprint (contours
+        # cut at the window edge are that far from the searched rows, unlike at the frame's edge)
+        self.window_margin = patch_margin(self.params)
+        self.reset()
+
+    @classmethod
+    def from_files(cls, calib_path, homog_path, wheel, frame_size, **kwargs):
+        """Build from a run_calibration.py .npz and a homography JSON."""
+        camera_matrix, dist_coeffs = load_intrinsics(calib_path)
+        return cls(camera_matrix, dist_coeffs, load_homography(homog_path), wheel, frame_size, **kwargs)
+
+    def reset(self):
+        """Forget the previous detection (and the track) and restart the frame count."""
+        self.prev_detection = None
+        self._next_frame = 0
+        self._last_frame = None
+        if self.tracker is not None:
+            self.tracker.reset()
+
+    def check_frame(self, frame):
+        if frame.shape[1::-1] != self.frame_size[:2] or frame.shape[2:] not in ((), (3,)):
+            raise ValueError(f"Expected a {self.frame_size[0]}x{self.frame_size[1]} BGR or luma frame, "
+                             f"got shape {frame.shape}")
+
+    def prepare(self, frame, prof=NULL_PROFILER, reuse=True, rows=None):
+        """
+        Undistort + binarize one raw BGR or luma frame (or the bird's-eye patch); returns (binary, x0).
+
+        Stateless, so it may run on worker threads ahead of measure() as long
+        as reuse=False. reuse=True works in the measurer's FrameBuffers, so the
+        returned binary image is only valid until the next prepare(). rows=(r0,
+        r1) processes only those rows (binary row 0 = row r0).
+        """
+        self.check_frame(frame)
+        binary, _, x0 = prepare_frame(frame, self.maps, self.roi, prof, self.buffers if reuse else None,
+                                      self.params, rows)
+        return binary, x0
+
+    def measure(self, binary, x0, frame_idx=None, timestamp_ms=None, prof=NULL_PROFILER, y0=None, rows=None):
+        """
+        Histogram search + projection on a prepare()d frame; frames must arrive in order.
+
+        y0 is the search-image row of the binary image's first row (default:
+        the first processed row) and rows=(s0, s1) limits the search to those
+        rows (see detection.find_lane_band).
+        """
+        if frame_idx is None:
+            frame_idx = self._next_frame
+        self._next_frame = frame_idx + 1
+        if y0 is None:
+            y0 = self.roi.rect[1]
+
+        wheel_x, wheel_y = self.search_wheel
+        t = prof.now()
+        band = search_band(binary, x0, wheel_x, wheel_y, self.prev_detection, self.max_jump,
+                           self.column_width, self.min_width, y0, rows, self.below)
+        t = prof.lap("search", t)
+        if band is None:
+            return LaneMeasurement(frame_idx, timestamp_ms, None, None, 0.0, None)
+
+        self.prev_detection = (wheel_x, band.lane_y)
+        lane_y, cm = self.project(band.lane_y)
+        prof.lap("projection", t)
+        return LaneMeasurement(frame_idx, timestamp_ms, cm, lane_y,
+                               band_confidence(band.strength, band.top, band.bottom, self.strip_width),
+                               band)
+
+    def project(self, row):
+        """(undistorted source-frame row, cm_to_lane) of a search row on the wheel's column."""
+        if self.view is None:
+            image_row, cm = row, lateral_position(self.real_wheel, (self.search_wheel[0], row),
+                                                  self.homography_matrix, self.wheel_offset_cm)
+        else:
+            # patch rows are cm along the wheel's column already
+            image_row, cm = self.view.image_row(row), self.view.distance_cm(row) + \
+                (config.WHEEL_OFFSET_CM if self.wheel_offset_cm is None else self.wheel_offset_cm)
+        return self.source_row(image_row), cm
+
+    def source_row(self, row):
+        """Decoded-frame row -> frame_size row (the same row without decode-time downscaling)."""
+        if self.to_decoded is None:
+            return row
+        return int(round((row - self.to_decoded[1, 2]) / self.to_decoded[1, 1]))
+
+    def decoded_row(self, row):
+        """frame_size row -> decoded-frame row (inverse of source_row, for drawing on decoded frames)."""
+        if self.to_decoded is None:
+            return row
+        return int(round(row * self.to_decoded[1, 1] + self.to_decoded[1, 2]))
+
+    def track_window(self, row, sigma):
+        """Search rows (s0, s1) around a predicted row with innovation sigma."""
+        half = max(self.max_jump, self.tracker.gate_sigma * sigma)
+        lo, hi = (self.search_wheel[1] + 1, self.roi.rect[3]) if self.below else (0, self.search_wheel[1])
+        return max(lo, int(math.floor(row - half))), min(hi, int(math.ceil(row + half)) + 1)
+
+    def process_frame(self, frame, frame_idx=None, timestamp_ms=None, prof=NULL_PROFILER):
+        """Measure one raw BGR frame (the next one in the stream)."""
+        if self.tracker is None:
+            binary, x0 = self.prepare(frame, prof)
+            return self.measure(binary, x0, frame_idx, timestamp_ms, prof)
+
+        if frame_idx is None:
+            frame_idx = self._next_frame
+        dt = 1 if self._last_frame is None else max(1, frame_idx - self._last_frame)
+        self._last_frame = frame_idx
+        prediction = self.tracker.predict(dt)
+        if prediction is None:  # no track: whole frame
+            binary, x0 = self.prepare(frame, prof)
+            m = self.measure(binary, x0, frame_idx, timestamp_ms, prof)
+        else:
+            row, sigma = prediction
+            s0, s1 = self.track_window(row, sigma)
+            top = self.roi.rect[1]  # processed rows -> search rows
+            r0 = max(0, s0 - top - self.window_margin)
+            r1 = min(self.roi.rect[3] - top, s1 - top + self.window_margin)
+            binary, x0 = self.prepare(frame, prof, rows=(r0, r1))
+            self.prev_detection = (self.search_wheel[0], row)  # continuity towards the prediction
+            m = self.measure(binary, x0, frame_idx, timestamp_ms, prof, y0=top + r0, rows=(s0, s1))
+
+        state = self.tracker.update(m.band.lane_y if m.band else None)
+        if state is None:
+            return m
+        return m._replace(smoothed_cm=float(self.project(state.smoothed)[1]), innovation=state.innovation)
+
+    def process_stream(self, frames, prof=NULL_PROFILER):
+        """
+        Generator over an iterable of raw BGR frames, or of (frame_idx,
+        timestamp_ms, frame) tuples such as read_frames() yields, producing
+        one LaneMeasurement per frame.
+        """
+        for item in frames:
+            if isinstance(item, tuple):
+                frame_idx, timestamp_ms, frame = item
+                yield self.process_frame(frame, frame_idx, timestamp_ms, prof)
+            else:
+                yield self.process_frame(item, prof=prof)
+
+
+class MultiPointMeasurer:
+    """
+    Several named reference points (points.ReferencePoint) measured from the
+    same frames in one pass.
+
+    Each point gets its own LaneMeasurer (homography, wheel offset, search
+    direction, continuity, track), all on one set of undistortion maps. The
+    frame is undistorted and thresholded once and every point searches its
+    own column of that binary image; bird's-eye patches and tracked windows
+    are per point and share just the decoded frame.
+
+    homographies maps point names to their own homography matrix (default:
+    homography_matrix); kwargs go to every LaneMeasurer. measure() and
+    process_frame() return one LaneMeasurement per point, in points order.
+    """
+
+    def __init__(self, camera_matrix, dist_coeffs, homography_matrix, points, frame_size, homographies=None,
+                 **kwargs):
+        self.points = check_points(points)
+        homographies = homographies or {}
+        self.measurers = []
+        for p in self.points:
+            self.measurers.append(LaneMeasurer(
+                camera_matrix, dist_coeffs, homographies.get(p.name, homography_matrix), p.wheel, frame_size,
+                wheel_offset_cm=p.wheel_offset_cm, direction=p.direction,
+                maps=self.measurers[0].maps if self.measurers else None, **kwargs))
+        first = self.measurers[0]
+        # the debug video follows the first point
+        self.maps, self.wheel, self.decoded_row = first.maps, first.wheel, first.decoded_row
+        self.to_decoded = first.to_decoded
+
+        self.shared = first.view is None and first.tracker is None  # one binary frame for all points
+
+    @classmethod
+    def from_files(cls, calib_path, homog_path, points, frame_size, **kwargs):
+        """Build from a run_calibration.py .npz, the run's homography JSON and the points' own ones."""
+        camera_matrix, dist_coeffs = load_intrinsics(calib_path)
+        homographies = {p.name: load_homography(p.homography) for p in points if p.homography}
+        return cls(camera_matrix, dist_coeffs, load_homography(homog_path), points, frame_size, homographies,
+                   **kwargs)
+
+    @property
+    def names(self):
+        return [p.name for p in self.points]
+
+    def reset(self):
+        for m in self.measurers:
+            m.reset()
+
+    def prepare(self, frame, prof=NULL_PROFILER, reuse=True):
+        """Undistort + binarize once for every point; returns (binaries, offsets) for measure()."""
+        if not self.shared:
+            prepared = [m.prepare(frame, prof, reuse) for m in self.measurers]
+            return [b for b, _ in prepared], [(x0, m.roi.rect[1]) for (_, x0), m in zip(prepared, self.measurers)]
+        first = self.measurers[0]
+        binary, x0 = first.prepare(frame, prof, reuse)
+        n = len(self.measurers)
+        return [binary] * n, [(x0, first.roi.rect[1])] * n
+
+    def measure(self, binaries, offsets, frame_idx=None, timestamp_ms=None, prof=NULL_PROFILER):
+        """Every point's LaneMeasurement on a prepare()d frame; frames must arrive in order."""
+        return [m.measure(b, x0, frame_idx, timestamp_ms, prof, y0=y0)
+                for m, b, (x0, y0) in zip(self.measurers, binaries, offsets)]
+
+    def process_frame(self, frame, frame_idx=None, timestamp_ms=None, prof=NULL_PROFILER):
+        """Every point's LaneMeasurement for one raw frame (the next one in the stream)."""
+        if self.measurers[0].tracker is not None:  # windows differ per point
+            return [m.process_frame(frame, frame_idx, timestamp_ms, prof) for m in self.measurers]
+        binaries, offsets = self.prepare(frame, prof)
+        return self.measure(binaries, offsets, frame_idx, timestamp_ms, prof)
+
+    process_stream = LaneMeasurer.process_stream  # yields a list of LaneMeasurements per frame
+
+
+def read_frames(cap, stride=1):
+    """
+    (frame_idx, timestamp_ms, frame) for every stride-th frame of an opened
+    cv2.VideoCapture; the frames in between are skipped with grab().
+    """
+    import cv2
+
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            return
+        frame_idx = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+        timestamp_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+        for _ in range(stride - 1):
+            if not cap.grab():
+                break
+        yield frame_idx, timestamp_ms, frame
@@ -0,0 +1,97 @@
+import hashlib
+import os
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+from . import config
+from .engine import read_frames
+from .roi import frame_roi, make_strip_roi
+from .undistort import get_undistort_maps, intrinsics_key, undistort
+
+
+class FrameStore(NamedTuple):
+    frames: np.ndarray         # (n, h, w) uint8 memmap: undistorted grayscale strip per stored frame
+    frame_idx: np.ndarray      # source frame index of each stored frame
+    timestamps_ms: np.ndarray
+    x0: int                    # frame column of the strips' first column
+    stride: int
+    path: str                  # metadata .npz; open_frame_store(path) maps the same store again
+
+
+def store_key(video_path, camera_matrix, dist_coeffs, frame_size, rect, stride) -> str:
+    """Cache key: the video file (path, size, mtime), intrinsics, stored rectangle and stride."""
+    st = os.stat(video_path)
+    h = hashlib.sha1(f"{os.path.abspath(video_path)}|{st.st_size}|{st.st_mtime_ns}|"
+                     f"{intrinsics_key(camera_matrix, dist_coeffs, frame_size)}|{rect}|{stride}".encode())
+    return h.hexdigest()[:16]
+
+
+def open_frame_store(meta_path) -> FrameStore:
+    """Map a store written by build_frame_store() (read-only; the frames stay on disk)."""
+    with np.load(meta_path) as meta:
+        shape = tuple(int(v) for v in meta["shape"])
+        frames = np.memmap(str(meta["data_path"]), dtype=np.uint8, mode="r", shape=shape) if shape[0] \
+            else np.zeros(shape, np.uint8)
+        return FrameStore(frames, meta["frame_idx"], meta["timestamps_ms"], int(meta["x0"]),
+                          int(meta["stride"]), meta_path)
+
+
+def build_frame_store(video_path, camera_matrix, dist_coeffs, wheel, params=None, full_frame=False,
+                      stride=1, cache_dir: str = config.FRAMESTORE_CACHE_DIR) -> FrameStore:
+    """
+    Decode and undistort a video once into a memory-mapped grayscale frame store.
+
+    Each stored frame is what binarize() starts from: the undistorted strip
+    around the wheel (sized with make_strip_roi for params, e.g. the widest
+    settings of a sweep) or, with full_frame, the whole frame. Frames go
+    straight to a raw uint8 file under cache_dir, so the store never has to fit
+    in memory; the same video, intrinsics, strip and stride reuse it.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video {video_path}")
+    try:
+        frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        maps = get_undistort_maps(camera_matrix, dist_coeffs, frame_size)
+        if full_frame:
+            roi = frame_roi(maps, frame_size)
+        else:
+            roi = make_strip_roi(maps, int(wheel[0]), int(wheel[1]), frame_size, params)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        key = store_key(video_path, camera_matrix, dist_coeffs, frame_size, roi.rect, stride)
+        base = os.path.join(cache_dir, f"frames_{key}")
+        meta_path = f"{base}.npz"
+        if os.path.exists(meta_path):
+            try:
+                return open_frame_store(meta_path)
+            except (OSError, KeyError, ValueError):
+                pass  # corrupt/partial store -> decode again
+
+        x0, y0, x1, y1 = roi.rect
+        sx0, sy0, sx1, sy1 = roi.src_rect
+        undistorted = np.empty((y1 - y0, x1 - x0, 3), np.uint8)
+        gray = np.empty((y1 - y0, x1 - x0), np.uint8)
+        frame_idx, timestamps = [], []
+        # write-then-rename so concurrent runs never see a half-written store
+        data_path = f"{base}.u8"
+        tmp_path = f"{data_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            for idx, ts, frame in read_frames(cap, stride):
+                undistort(frame[sy0:sy1, sx0:sx1], roi.maps, undistorted)
+                cv2.cvtColor(undistorted, cv2.COLOR_BGR2GRAY, dst=gray)
+                f.write(gray.data)
+                frame_idx.append(idx)
+                timestamps.append(ts)
+        os.replace(tmp_path, data_path)
+    finally:
+        cap.release()
+
+    tmp_meta = f"{base}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_meta, data_path=data_path, shape=np.array([len(frame_idx), *gray.shape]),
+             frame_idx=np.array(frame_idx, np.int64), timestamps_ms=np.array(timestamps, np.float64),
+             x0=x0, stride=stride)
+    os.replace(tmp_meta, meta_path)
+    return open_frame_store(meta_path)
@@ -1,7 +1,16 @@
 import cv2, numpy as np, json, os
 import sys, os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
+from .calibration import find_corners, init_detect_worker
+from .measurement import pixels_to_real_world
+
+# automatic (board-detection) homography: frames sampled from the video, RANSAC inlier threshold (cm)
+DEFAULT_MAX_FRAMES = 60
+RANSAC_CM = 1.0
+
 def compute_homography(image_pts, real_pts):
     image_pts = np.array(image_pts, dtype=np.float32)
     real_pts  = np.array(real_pts,  dtype=np.float32)
@@ -17,3 +26,184 @@ def save_homography(H, out_json):
     os.makedirs(os.path.dirname(out_json) or ".", exist_ok=True)
     with open(out_json, "w") as f:
         json.dump({"homography_matrix": H.tolist()}, f, indent=2)
+
+def load_homography(homog_path):
+    """Load a 3x3 homography from JSON (tolerant to key names)."""
+    with open(homog_path, "r") as f:
+        data = json.load(f)
+    H_list = data.get("homography_matrix") or data.get("H") or data
+    homography_matrix = np.array(H_list, dtype=np.float64)
+    if homography_matrix.shape != (3, 3):
+        raise RuntimeError(f"Homography is not 3x3. Got shape {homography_matrix.shape} from {homog_path}")
+    return homography_matrix
+
+
+def board_points_cm(chessboard_dims, cell_cm):
+    """
+    Road-plane (x, y) in cm of a board's inner corners, in findChessboardCorners
+    order. The first corner is (0, 0); x runs along a row of corners, y down the
+    columns. cell_cm is (width, height) of one square.
+    """
+    cols, rows = chessboard_dims
+    grid = np.mgrid[0:cols, 0:rows].T.reshape(-1, 2).astype(np.float64)
+    return grid * np.asarray(cell_cm, dtype=np.float64)
+
+
+def canonical_corner_order(corners):
+    """
+    findChessboardCorners may list the grid from either end (a 180 degree turn);
+    start from the end nearer the image top-left so every frame agrees.
+    """
+    pts = corners.reshape(-1, 2)
+    return pts[::-1].copy() if pts[-1].sum() < pts[0].sum() else pts
+
+
+def sample_frames(video_path, max_frames=DEFAULT_MAX_FRAMES):
+    """
+    Up to max_frames (frame_idx, frame) spread evenly over the video; frames in
+    between are only grab()bed. Without a frame count, the first max_frames.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video {video_path}")
+    n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    wanted = np.unique(np.linspace(0, n - 1, max_frames).round().astype(int)) if n > 0 \
+        else np.arange(max_frames)
+    try:
+        idx = 0
+        for target in wanted:
+            while idx < target:
+                if not cap.grab():
+                    return
+                idx += 1
+            ok, frame = cap.read()
+            if not ok:
+                return
+            yield idx, frame
+            idx += 1
+    finally:
+        cap.release()
+
+
+def detect_board(gray, chessboard_dims, camera_matrix, dist_coeffs):
+    """Board corners (N,2) in undistorted pixels, or None. Detected and refined on the raw frame."""
+    corners = find_corners(gray, chessboard_dims)
+    if corners is None:
+        return None
+    undist = cv2.undistortPoints(corners, camera_matrix, dist_coeffs, P=camera_matrix)
+    return canonical_corner_order(undist).astype(np.float64)
+
+
+def detect_board_frames(video_path, chessboard_dims, camera_matrix, dist_coeffs,
+                        max_frames=DEFAULT_MAX_FRAMES, workers=None):
+    """
+    detect_board() on sampled frames over a process pool (workers=1 runs inline).
+
+    Frames are decoded here and handed to the workers as they are read, at
+    most two per worker in flight. Returns (frame_size, [(frame_idx, corners or None)]).
+    """
+    workers = workers or os.cpu_count() or 1
+    args = (chessboard_dims, camera_matrix, dist_coeffs)
+    results, size = [], None
+
+    def gray_frames():
+        nonlocal size
+        for idx, frame in sample_frames(video_path, max_frames):
+            size = frame.shape[1::-1]
+            yield idx, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    if workers == 1:
+        results = [(idx, detect_board(gray, *args)) for idx, gray in gray_frames()]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_detect_worker) as pool:
+            pending = deque()
+            for idx, gray in gray_frames():
+                pending.append((idx, pool.submit(detect_board, gray, *args)))
+                if len(pending) >= 2 * workers:
+                    idx0, fut = pending.popleft()
+                    results.append((idx0, fut.result()))
+            results += [(idx, fut.result()) for idx, fut in pending]
+    if size is None:
+        raise RuntimeError(f"No frames read from {video_path}")
+    return size, results
+
+
+def reprojection_errors(H, image_pts, real_pts):
+    """Per-point error on the road (cm, image -> road) and in the image (px, road -> image)."""
+    err_cm = np.linalg.norm(pixels_to_real_world(image_pts, H) - real_pts, axis=1)
+    err_px = np.linalg.norm(pixels_to_real_world(real_pts, np.linalg.inv(H)) - image_pts, axis=1)
+    return err_cm, err_px
+
+
+def error_summary(errors):
+    """mean / median / p95 / max of an error array (JSON-ready)."""
+    return {"mean": float(np.mean(errors)), "median": float(np.median(errors)),
+            "p95": float(np.percentile(errors, 95)), "max": float(np.max(errors))}
+
+
+def fit_homography(image_pts, real_pts, ransac_cm=RANSAC_CM):
+    """
+    Robust homography over many correspondences: RANSAC (threshold ransac_cm on
+    the road) to drop mis-detections, then a least-squares fit on the inliers.
+    Returns (H, inlier mask).
+    """
+    image_pts = np.asarray(image_pts, dtype=np.float32)
+    real_pts = np.asarray(real_pts, dtype=np.float32)
+    H, mask = cv2.findHomography(image_pts, real_pts, cv2.RANSAC, ransac_cm)
+    if H is None:
+        raise RuntimeError("Homography computation failed.")
+    inliers = mask.ravel().astype(bool)
+    H, _ = cv2.findHomography(image_pts[inliers], real_pts[inliers], method=0)
+    if H is None:
+        raise RuntimeError("Homography computation failed.")
+    return H / H[2, 2], inliers
+
+
+def estimate_homography(video_path, chessboard_dims, cell_cm, camera_matrix, dist_coeffs,
+                        max_frames=DEFAULT_MAX_FRAMES, workers=None, ransac_cm=RANSAC_CM):
+    """
+    Headless homography from a video of a chessboard lying on the road.
+
+    The board is detected (sub-pixel) in up to max_frames frames spread over the
+    video, in parallel, and one homography is fitted to the corners of all
+    frames together (fit_homography), so per-frame noise averages out and
+    frames with a bad detection are outvoted. The camera and board must not
+    move during the video. Boards need different corner counts per row and per
+    column, so their orientation is unambiguous.
+
+    Returns (H, report): report holds frame counts, inlier count and
+    reprojection error summaries in cm and px over the inliers, plus
+    per-frame RMS errors (px).
+    """
+    cols, rows = chessboard_dims
+    if cols == rows:
+        raise ValueError("Use a board with different numbers of inner corners per row and column")
+    real = board_points_cm(chessboard_dims, cell_cm)
+    size, detections = detect_board_frames(video_path, chessboard_dims, camera_matrix, dist_coeffs,
+                                           max_frames, workers)
+    found = [(idx, c) for idx, c in detections if c is not None]
+    if not found:
+        raise RuntimeError(f"No {cols}x{rows} board found in {len(detections)} frames of {video_path}")
+
+    image_pts = np.concatenate([c for _, c in found])
+    real_pts = np.tile(real, (len(found), 1))
+    H, inliers = fit_homography(image_pts, real_pts, ransac_cm)
+    err_cm, err_px = reprojection_errors(H, image_pts, real_pts)
+
+    per_frame = err_px.reshape(len(found), -1)
+    rms = dict(zip([idx for idx, _ in found], np.sqrt(np.mean(per_frame ** 2, axis=1)).tolist()))
+    report = {
+        "video": video_path,
+        "frame_size": [int(v) for v in size],
+        "chessboard_dims": {"cols": cols, "rows": rows},
+        "cell_cm": [float(v) for v in np.broadcast_to(cell_cm, 2)],
+        "frames_sampled": len(detections),
+        "frames_with_board": len(found),
+        "points": int(len(image_pts)),
+        "inliers": int(inliers.sum()),
+        "ransac_cm": ransac_cm,
+        "error_cm": error_summary(err_cm[inliers]),
+        "error_px": error_summary(err_px[inliers]),
+        "frames": [{"frame": idx, "found": idx in rms, "rms_px": rms.get(idx)} for idx, _ in detections],
+    }
+    return H, report
@@ -0,0 +1,314 @@
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from array import array
+
+import cv2
+import numpy as np
+
+from .engine import LaneMeasurer
+from .output import MeasurementWriter
+from .profiling import PERCENTILES
+from .sidecar import NO_LANE
+
+
+class CameraSource:
+    """
+    A live VideoCapture: device index (e.g. "0") or stream URL (rtsp://, http://, ...).
+
+    read() returns (frame_idx, frame) with frame_idx counting the frames
+    delivered by the device, or None when the stream ends.
+    """
+
+    def __init__(self, source):
+        self.cap = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open camera/stream {source}")
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # ask the driver not to queue old frames (if supported)
+        self._n = 0
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        self._n += 1
+        return self._n - 1, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class FileAsCamera:
+    """
+    A recorded video played back at real-time pace as a stand-in camera.
+
+    read() blocks until the next frame is due (fps * speed); frames whose time
+    has already passed when the reader comes back are skipped with grab(), as
+    a camera would have produced them with nobody listening. frame_idx is the
+    index in the file.
+    """
+
+    def __init__(self, path, speed=1.0):
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open video {path}")
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.rate = (fps if fps and fps > 1 else 30.0) * speed
+        self.skipped = 0
+        self._next = 0
+        self._t0 = None
+
+    def read(self):
+        now = time.perf_counter()
+        if self._t0 is None:
+            self._t0 = now
+        due = self._t0 + self._next / self.rate
+        if now < due:
+            time.sleep(due - now)
+        else:
+            live = int((now - self._t0) * self.rate)
+            for _ in range(live - self._next):
+                if not self.cap.grab():
+                    return None
+                self.skipped += 1
+            self._next = max(self._next, live)
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        self._next += 1
+        return self._next - 1, frame
+
+    def release(self):
+        self.cap.release()
+
+
+def open_source(source, speed=1.0):
+    """
+    Device index / stream URL -> CameraSource, existing file -> FileAsCamera;
+    anything with read()/release() like those is used as is.
+    """
+    if hasattr(source, "read"):
+        return source
+    if not str(source).isdigit() and "://" not in str(source) and os.path.isfile(source):
+        return FileAsCamera(source, speed)
+    return CameraSource(source)
+
+
+class LatestFrame:
+    """
+    Reads a source on a background thread and keeps only its newest frame.
+
+    get() hands out the freshest frame not yet taken, so a consumer that falls
+    behind skips stale frames instead of working through a backlog; the
+    latency of a frame is then bounded by one processing time plus one frame
+    interval. OpenCV releases the GIL while decoding, so reading overlaps
+    processing.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.frames_read = 0
+        self.overwritten = 0  # frames replaced by a newer one before anybody took them
+        self._item = None
+        self._ended = False
+        self._error = None
+        self._stop = threading.Event()
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                item = self.source.read()
+                if item is None:
+                    break
+                t_capture, wall = time.perf_counter(), time.time()
+                with self._cond:
+                    self.frames_read += 1
+                    if self._item is not None:
+                        self.overwritten += 1
+                    self._item = (*item, t_capture, wall)
+                    self._cond.notify()
+        except Exception as e:  # surfaced by get()
+            self._error = e
+        finally:
+            with self._cond:
+                self._ended = True
+                self._cond.notify()
+
+    def get(self, timeout=None):
+        """(frame_idx, frame, t_capture perf_counter, t_capture unix time); None once the source has ended."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._item is not None or self._ended, timeout):
+                raise TimeoutError(f"No frame from the source within {timeout} s")
+            item, self._item = self._item, None
+        if item is None and self._error is not None:
+            raise self._error
+        return item
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.source.release()
+
+
+class NdjsonPublisher:
+    """One JSON object per line to a text stream (stdout by default), flushed per message."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def publish(self, message):
+        self.stream.write(json.dumps(message) + "\n")
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+class UdpPublisher:
+    """One JSON line per datagram to host:port; a missing listener never blocks the loop."""
+
+    def __init__(self, host, port):
+        self.address = (host, int(port))
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def publish(self, message):
+        try:
+            self.sock.sendto((json.dumps(message) + "\n").encode(), self.address)
+        except OSError:
+            pass  # e.g. ECONNREFUSED from an earlier datagram: live output is best effort
+
+    def close(self):
+        self.sock.close()
+
+
+def open_publisher(target="-"):
+    """"-" = stdout, "udp://host:port" = UDP datagrams."""
+    if target == "-":
+        return NdjsonPublisher()
+    if target.startswith("udp://"):
+        host, _, port = target[len("udp://"):].rpartition(":")
+        if not host or not port.isdigit():
+            raise ValueError(f"Expected udp://host:port, got {target}")
+        return UdpPublisher(host, port)
+    raise ValueError(f"Unknown publish target {target} (use - or udp://host:port)")
+
+
+def latency_summary(latencies_ms):
+    """Mean / percentiles / max of per-frame latencies in ms (JSON-ready)."""
+    ms = np.frombuffer(latencies_ms, dtype=np.float64) if len(latencies_ms) else np.zeros(1)
+    return {
+        "mean_ms": float(ms.mean()),
+        **{f"p{p}_ms": float(v) for p, v in zip(PERCENTILES, np.percentile(ms, PERCENTILES))},
+        "max_ms": float(ms.max()),
+    }
+
+
+def run_live(source, homog_path, wheel, calib_path, publisher, speed=1.0, max_frames=None,
+             duration_s=None, out_csv_path=None, stop=None, birdseye=False, track=False):
+    """
+    Measure a live camera/stream, always on its freshest frame, and publish every result.
+
+    source is a device index, stream URL, (stand-in camera) video file played
+    at speed x real time or a source object, see open_source(). Each processed
+    frame is published as one JSON object: frame, t_capture (unix seconds when
+    the frame was read), cm_to_lane (null = no lane), lane_y, confidence,
+    dropped (frames skipped since the previous one) and latency_ms, capture to
+    publish. The histogram search's MAX_JUMP window is widened by the number
+    of skipped frames, as for --stride.
+
+    Runs until the source ends, max_frames frames were processed, duration_s
+    has passed, stop (a threading.Event) is set or Ctrl-C. birdseye=True
+    detects in a top-down road patch and track=True follows the lane with a
+    Kalman filter, adding cm_smooth and innovation to each message (see
+    engine.LaneMeasurer). out_csv_path, if
+    given, also receives the usual measurements CSV. Returns frame counts,
+    latency and processing-time summaries (ms) and, with a CSV, its summary
+    statistics.
+    """
+    reader = LatestFrame(open_source(source, speed))
+    latencies, process_ms = array("d"), array("d")
+    processed = dropped = 0
+    out = None
+    t_start, wall_start = time.perf_counter(), time.time()
+    try:
+        first = reader.get(timeout=10.0)
+        if first is None:
+            raise RuntimeError(f"No frames from {source}")
+        h, w = first[1].shape[:2]
+        measurer = LaneMeasurer.from_files(calib_path, homog_path, wheel, (w, h), birdseye=birdseye,
+                                           track=track)
+        # CSV time_s counts from the start of the session, utc_s is the wall clock
+        out = MeasurementWriter(out_csv_path, utc_start_s=wall_start % 86400, tracking=track) \
+            if out_csv_path is not None else None
+        prev_idx = first[0] - 1  # the first frame itself went stale during setup
+
+        while (max_frames is None or processed < max_frames) and \
+                (duration_s is None or time.perf_counter() - t_start < duration_s) and \
+                not (stop is not None and stop.is_set()):
+            item = reader.get(timeout=10.0)
+            if item is None:
+                break
+            frame_idx, frame, t_capture, wall = item
+            gap = frame_idx - prev_idx
+            prev_idx = frame_idx
+            t0 = time.perf_counter()
+            measurer.max_jump = measurer.base_max_jump * gap
+            m = measurer.process_frame(frame, frame_idx, (t_capture - t_start) * 1000.0)
+            t1 = time.perf_counter()
+
+            message = {
+                "frame": frame_idx,
+                "t_capture": round(wall, 4),
+                "cm_to_lane": m.cm_to_lane,
+                "lane_y": m.lane_y,
+                "confidence": round(m.confidence, 3),
+                "dropped": gap - 1,
+                "latency_ms": round((time.perf_counter() - t_capture) * 1000.0, 2),
+            }
+            if track:
+                message["cm_smooth"] = None if m.smoothed_cm is None else round(m.smoothed_cm, 3)
+                message["innovation"] = None if m.innovation is None else round(m.innovation, 2)
+            publisher.publish(message)
+            latencies.append(message["latency_ms"])
+            process_ms.append((t1 - t0) * 1000.0)
+            processed += 1
+            dropped += gap - 1
+            if out is not None:
+                tracked = (np.nan if m.smoothed_cm is None else m.smoothed_cm,
+                           np.nan if m.innovation is None else m.innovation) if track else ()
+                out.append(frame_idx, m.timestamp_ms, np.nan if m.cm_to_lane is None else m.cm_to_lane,
+                           NO_LANE if m.lane_y is None else m.lane_y, m.confidence, *tracked)
+    except KeyboardInterrupt:
+        pass  # Ctrl-C ends a live session normally
+    except BaseException:
+        if out is not None:
+            out.abort()
+        raise
+    finally:
+        reader.close()
+
+    stats = out.close() if out is not None else {}
+    stats.update(
+        frames_processed=processed,
+        frames_dropped=dropped,
+        seconds=time.perf_counter() - t_start,
+        latency=latency_summary(latencies),
+        process=latency_summary(process_ms),
+    )
+    return stats
+
+
+def print_live_summary(stats, file=sys.stderr):
+    n = stats["frames_processed"]
+    print(f"[live] processed {n} frames, dropped {stats['frames_dropped']} stale "
+          f"({n / max(stats['seconds'], 1e-9):.1f} frames/sec)", file=file)
+    for name in ("latency", "process"):
+        s = stats[name]
+        print(f"[live] {name:<8} mean {s['mean_ms']:7.2f} ms  p50 {s['p50_ms']:7.2f}  "
+              f"p99 {s['p99_ms']:7.2f}  max {s['max_ms']:7.2f}", file=file)
@@ -1,13 +1,65 @@
 import numpy as np
 import math
 
+from . import config
+
+
+def pixels_to_real_world(pixel_points, H, eps=1e-9):
+    """
+    Map an (N,2) array of pixel points through homography H in one shot (float64).
+
+    Points on (or numerically at) the horizon line of H have no finite road-plane
+    position; their rows are NaN.
+    """
+    pts = np.asarray(pixel_points, dtype=np.float64).reshape(-1, 2)
+    H = np.asarray(H, dtype=np.float64)
+    x, y = pts[:, 0], pts[:, 1]
+
+    # explicit elementwise products (no BLAS) so a point maps to the same bits alone or in a batch
+    X = H[0, 0] * x + H[0, 1] * y + H[0, 2]
+    Y = H[1, 0] * x + H[1, 1] * y + H[1, 2]
+    W = H[2, 0] * x + H[2, 1] * y + H[2, 2]
+
+    world = np.full((len(pts), 2), np.nan)
+    ok = np.abs(W) > eps * np.abs(H[2]).max()
+    world[ok, 0] = X[ok] / W[ok]
+    world[ok, 1] = Y[ok] / W[ok]
+    return world
+
+
 def pixel_to_real_world(pixel_point, H):
-    pt = np.array([[pixel_point[0], pixel_point[1], 1]], dtype=np.float32).T
-    world = np.dot(H, pt)
-    if world[2] == 0:
+    world = pixels_to_real_world(pixel_point, H)[0]
+    if np.isnan(world[0]):
         raise ValueError("Invalid homography transform (division by zero).")
-    return (world[0] / world[2])[0], (world[1] / world[2])[0]
+    return world[0], world[1]
 
 
 def calculate_distance(p1, p2):
     return math.sqrt((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)
+
+
+def lateral_position(real_wheel, pt_lane, H, offset_cm=None):
+    """
+    Wheel-to-lane distance in cm, corrected to the vehicle centre.
+
+    real_wheel is the wheel point already mapped to the road plane (it never
+    changes within a run, so callers project it once). offset_cm overrides the
+    configured wheel_offset_cm.
+    """
+    if offset_cm is None:
+        offset_cm = config.WHEEL_OFFSET_CM
+    return calculate_distance(real_wheel, pixel_to_real_world(pt_lane, H)) + offset_cm
+
+
+def lateral_positions(real_wheel, lane_points, H, offset_cm=None):
+    """
+    Vectorized lateral_position() for an (N,2) array of lane pixels (NaN rows stay NaN).
+
+    offset_cm overrides the configured wheel_offset_cm.
+    """
+    world = pixels_to_real_world(lane_points, H)
+    dx = real_wheel[0] - world[:, 0]
+    dy = real_wheel[1] - world[:, 1]
+    if offset_cm is None:
+        offset_cm = config.WHEEL_OFFSET_CM
+    return np.sqrt(dx**2 + dy**2) + offset_cm
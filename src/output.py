@@ -0,0 +1,291 @@
+import csv
+import itertools
+import os
+import shutil
+import zipfile
+
+import numpy as np
+
+from .stats import RunningStats
+
+BLOCK_SIZE = 4096  # rows buffered per column before they are written out
+SECONDS_PER_DAY = 86400.0
+
+# per-frame columns of a measurements CSV / .npz, in file order, with their dtypes
+MEASUREMENT_COLUMNS = {
+    "frame": np.int64,
+    "cm_to_lane": np.float64,   # NaN = no lane detected
+    "time_s": np.float64,       # video time of the frame
+    "utc_s": np.float64,        # UTC seconds since midnight, wraps at 86400 (NaN if no start time in the name)
+    "lane_y": np.int32,         # lane pixel row in the undistorted frame (-1 = no lane)
+    "confidence": np.float32,   # see detection.band_confidence
+}
+
+# extra columns of a tracked run (see engine.LaneMeasurer, track=True)
+TRACKING_COLUMNS = {
+    "cm_smooth": np.float64,    # cm_to_lane of the Kalman-filtered lane row (NaN = no track)
+    "innovation": np.float32,   # detected minus predicted lane row, search rows (NaN = none)
+}
+
+
+# per-point columns of a multi-point run (see engine.MultiPointMeasurer), suffixed with _<point name>
+POINT_COLUMNS = {k: MEASUREMENT_COLUMNS[k] for k in ("cm_to_lane", "lane_y", "confidence")}
+
+
+def point_columns(names, tracking=False):
+    """Columns of a multi-point measurements CSV / .npz: frame, time_s, utc_s, then each point's."""
+    per_point = {**POINT_COLUMNS, **TRACKING_COLUMNS} if tracking else POINT_COLUMNS
+    columns = {k: MEASUREMENT_COLUMNS[k] for k in ("frame", "time_s", "utc_s")}
+    for name in names:
+        columns.update((f"{k}_{name}", dt) for k, dt in per_point.items())
+    return columns
+
+
+# printf-style CSV cell of each MEASUREMENT_COLUMNS / TRACKING_COLUMNS kind (default "%.3f");
+# "%r" is the shortest round-trip text, as csv.writer writes floats
+_CELL_FORMAT = {"frame": "%d", "cm_to_lane": "%r", "lane_y": "%.0f"}
+
+
+def _csv_block(kinds, columns):
+    """
+    CSV text (csv.writer's \\r\\n line ends) of a block of rows given as one array
+    per column: one %-format over the whole block instead of a Python step per
+    value. NaN cells, and lane_y < 0, come out as "NaN".
+    """
+    values = []
+    for kind, col in zip(kinds, columns):
+        if kind == "lane_y":
+            col = np.where(col < 0, np.nan, col)
+        values.append(col.tolist())
+    row = ",".join(_CELL_FORMAT.get(kind, "%.3f") for kind in kinds) + "\r\n"
+    text = (row * len(values[0])) % tuple(itertools.chain.from_iterable(zip(*values)))
+    return text.replace("nan", "NaN")  # the only letters a cell can hold besides inf
+
+
+def measurements_npz_path_for(out_csv_path):
+    """Columnar .npz path that goes with a measurements CSV."""
+    return os.path.splitext(out_csv_path)[0] + ".npz"
+
+
+class NpzColumnWriter:
+    """
+    Columnar .npz written in constant memory.
+
+    Rows are buffered block_size at a time, each full block is appended to a
+    raw temporary file per column, and close() streams those files into an
+    uncompressed .npz (np.load reads it like any np.savez output) that is
+    renamed into place, so an existing path always means a complete file.
+    """
+
+    def __init__(self, path, columns, block_size=BLOCK_SIZE):
+        self.path = path
+        self.columns = {k: np.dtype(dt) for k, dt in columns.items()}
+        self.n_rows = 0
+        self.block_size = block_size
+        self._rows = []
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._files = {k: open(self._part_path(k), "wb") for k in self.columns}
+
+    def _part_path(self, name):
+        return f"{self.path}.part.{name}"
+
+    def append(self, *row):
+        """Buffer one row, values in column order."""
+        self._rows.append(row)
+        if len(self._rows) == self.block_size:
+            self.flush()
+
+    def extend(self, columns):
+        """Write many rows at once from a dict of equal-length arrays."""
+        self.flush()
+        self._write(columns)
+
+    def flush(self):
+        if self._rows:
+            self._write(dict(zip(self.columns, zip(*self._rows))))
+            self._rows = []
+
+    def _write(self, columns):
+        n = 0
+        for k, dt in self.columns.items():
+            arr = np.ascontiguousarray(columns[k], dtype=dt)
+            self._files[k].write(arr)
+            n = len(arr)
+        self.n_rows += n
+
+    def close(self, **metadata):
+        """Assemble the .npz from the column files plus metadata arrays (scalars, small arrays)."""
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        tmp_path = self.path + ".part.npz"
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for k, dt in self.columns.items():
+                header = {"descr": np.lib.format.dtype_to_descr(dt), "fortran_order": False,
+                          "shape": (self.n_rows,)}
+                with zf.open(k + ".npy", "w", force_zip64=True) as out, \
+                        open(self._part_path(k), "rb") as src:
+                    np.lib.format.write_array_header_1_0(out, header)
+                    shutil.copyfileobj(src, out, 1 << 20)
+                os.remove(self._part_path(k))
+            for k, value in metadata.items():
+                with zf.open(k + ".npy", "w", force_zip64=True) as out:
+                    np.lib.format.write_array(out, np.asanyarray(value), allow_pickle=False)
+        os.replace(tmp_path, self.path)
+
+    def abort(self):
+        """Drop everything written so far."""
+        for k, f in self._files.items():
+            f.close()
+            if os.path.exists(self._part_path(k)):
+                os.remove(self._part_path(k))
+
+
+class MeasurementWriter:
+    """
+    Buffered per-frame measurement output: a CSV (always) and optionally the
+    same columns as a columnar .npz, plus summary statistics accumulated on the
+    fly (stats.RunningStats), so memory stays constant however long the video.
+
+    Rows are collected block_size at a time, turned into NumPy columns and
+    formatted into CSV text with one %-operation per block (see _csv_block). The CSV is written to a
+    temporary file and renamed into place by close(), so an existing
+    out_csv_path always means a complete result. tracking=True adds the
+    TRACKING_COLUMNS, passed to append()/extend() after confidence.
+    """
+
+    def __init__(self, out_csv_path, out_npz_path=None, utc_start_s=None, block_size=BLOCK_SIZE,
+                 tracking=False):
+        self.out_csv_path = out_csv_path
+        self.columns = self._make_columns(tracking)
+        self.utc_start_s = np.nan if utc_start_s is None else float(utc_start_s)
+        self.stats = RunningStats()
+        self.block_size = block_size
+        self._rows = []
+
+        os.makedirs(os.path.dirname(out_csv_path) or ".", exist_ok=True)
+        self._tmp_csv_path = out_csv_path + ".part"
+        self._f = open(self._tmp_csv_path, "w", newline="")
+        csv.writer(self._f).writerow(self.columns)
+        self._npz = NpzColumnWriter(out_npz_path, self.columns, block_size) \
+            if out_npz_path is not None else None
+
+    def _make_columns(self, tracking):
+        return {**MEASUREMENT_COLUMNS, **TRACKING_COLUMNS} if tracking else MEASUREMENT_COLUMNS
+
+    def append(self, frame_idx, timestamp_ms, cm, lane_y, confidence, *tracked):
+        """One frame; cm is NaN and lane_y negative when no lane was found."""
+        self._rows.append((frame_idx, timestamp_ms, cm, lane_y, confidence, *tracked))
+        if len(self._rows) == self.block_size:
+            self.flush()
+
+    def extend(self, frame, timestamp_ms, cm, lane_y, confidence, *tracked):
+        """Many frames at once (equal-length arrays), written in blocks."""
+        self.flush()
+        for lo in range(0, len(frame), self.block_size):
+            hi = lo + self.block_size
+            self._write(frame[lo:hi], timestamp_ms[lo:hi], cm[lo:hi], lane_y[lo:hi], confidence[lo:hi],
+                        *(c[lo:hi] for c in tracked))
+
+    def flush(self):
+        if self._rows:
+            self._write(*zip(*self._rows))
+            self._rows = []
+
+    def _utc(self, time_s):
+        """UTC time of day of each video time; recordings that run past midnight start again at 0."""
+        return (self.utc_start_s + time_s) % SECONDS_PER_DAY
+
+    def _write(self, frame, timestamp_ms, cm, lane_y, confidence, *tracked):
+        time_s = np.asarray(timestamp_ms, dtype=np.float64) / 1000.0
+        cols = {
+            "frame": np.asarray(frame, dtype=np.int64),
+            "cm_to_lane": np.asarray(cm, dtype=np.float64),
+            "time_s": time_s,
+            "utc_s": self._utc(time_s),
+            "lane_y": np.asarray(lane_y, dtype=np.int32),
+            "confidence": np.asarray(confidence, dtype=np.float32),
+        }
+        for (k, dt), values in zip(TRACKING_COLUMNS.items(), tracked):
+            cols[k] = np.asarray(values, dtype=dt)
+        self.stats.add_many(cols["cm_to_lane"])
+
+        self._f.write(_csv_block(self.columns, [cols[k] for k in self.columns]))
+        if self._npz is not None:
+            self._npz.extend(cols)
+
+    def close(self):
+        """Write out the last block, move the files into place; returns the summary statistics."""
+        self.flush()
+        self._f.close()
+        if self._npz is not None:
+            self._npz.close()
+        os.replace(self._tmp_csv_path, self.out_csv_path)
+        return self.stats.summary()
+
+    def abort(self):
+        """Drop the partial output (the previous out_csv_path, if any, is left alone)."""
+        self._f.close()
+        if os.path.exists(self._tmp_csv_path):
+            os.remove(self._tmp_csv_path)
+        if self._npz is not None:
+            self._npz.abort()
+
+
+class MultiPointWriter(MeasurementWriter):
+    """
+    MeasurementWriter for a multi-point run: one row per frame with every
+    point's columns side by side (see point_columns), and summary statistics
+    per point. append() takes each point's (cm, lane_y, confidence, *tracked)
+    tuple in names order; close() returns the first point's statistics with
+    every point's under "points".
+    """
+
+    def __init__(self, out_csv_path, names, out_npz_path=None, utc_start_s=None, block_size=BLOCK_SIZE,
+                 tracking=False):
+        self.names = list(names)
+        self.point_stats = {name: RunningStats() for name in self.names}
+        self._tracking = tracking
+        super().__init__(out_csv_path, out_npz_path, utc_start_s, block_size, tracking)
+        self.stats = self.point_stats[self.names[0]]
+
+    def _make_columns(self, tracking):
+        return point_columns(self.names, tracking)
+
+    def append(self, frame_idx, timestamp_ms, *points):
+        """One frame: each point's (cm, lane_y, confidence, *tracked); cm NaN and lane_y negative = no lane."""
+        self._rows.append((frame_idx, timestamp_ms, *points))
+        if len(self._rows) == self.block_size:
+            self.flush()
+
+    def extend(self, frame, timestamp_ms, *points):
+        """Many frames at once: frame and timestamp arrays, then each point's tuple of column arrays."""
+        self.flush()
+        for lo in range(0, len(frame), self.block_size):
+            hi = lo + self.block_size
+            self._write_columns(frame[lo:hi], timestamp_ms[lo:hi], [[c[lo:hi] for c in p] for p in points])
+
+    def flush(self):
+        if self._rows:
+            frame, timestamp_ms, *points = zip(*self._rows)
+            self._write_columns(frame, timestamp_ms, [list(zip(*p)) for p in points])
+            self._rows = []
+
+    def _write_columns(self, frame, timestamp_ms, points):
+        time_s = np.asarray(timestamp_ms, dtype=np.float64) / 1000.0
+        cols = {"frame": np.asarray(frame, dtype=np.int64), "time_s": time_s, "utc_s": self._utc(time_s)}
+        kinds = {"frame": "frame", "time_s": "time_s", "utc_s": "utc_s"}
+        per_point = {**POINT_COLUMNS, **TRACKING_COLUMNS} if self._tracking else POINT_COLUMNS
+        for name, values in zip(self.names, points):
+            for (k, dt), v in zip(per_point.items(), values):
+                cols[f"{k}_{name}"] = np.asarray(v, dtype=dt)
+                kinds[f"{k}_{name}"] = k
+            self.point_stats[name].add_many(cols[f"cm_to_lane_{name}"])
+        self._f.write(_csv_block([kinds[k] for k in self.columns], [cols[k] for k in self.columns]))
+        if self._npz is not None:
+            self._npz.extend(cols)
+
+    def close(self):
+        stats = super().close()
+        stats["points"] = {name: s.summary() for name, s in self.point_stats.items()}
+        return stats
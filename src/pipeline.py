@@ -0,0 +1,391 @@
+import collections
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from .debug_video import DebugVideo
+from .decoder import open_decoder
+from .engine import LaneMeasurer, MultiPointMeasurer
+from .output import MeasurementWriter, MultiPointWriter
+from .profiling import NULL_PROFILER, StageProfiler, save_profile
+from .sidecar import NO_LANE, open_detections, detection_metadata
+from .utils import utc_seconds_from_filename
+
+
+def init_worker(opencv_threads):
+    """Process-pool initializer: stop OpenCV oversubscribing cores with its own pool."""
+    cv2.setNumThreads(opencv_threads)
+
+
+def stride_for_hz(fps, target_hz):
+    """Frame stride that samples a fps video at (about) target_hz, never below 1."""
+    return max(1, int(round(fps / target_hz)))
+
+
+def _run_serial(decoder, prepare, emit, timings, prof=NULL_PROFILER, stride=1, reuse_frame=False):
+    """
+    Decode, process and emit every stride-th frame one after another on the
+    calling thread. reuse_frame decodes every frame into the same array (only
+    when nothing holds on to a frame after emit()).
+    """
+    frame = None
+    while True:
+        t0 = time.perf_counter()
+        t = prof.now()
+        got = decoder.read(frame if reuse_frame else None)
+        if got is None:
+            break
+        frame_idx, timestamp_ms, frame = got
+        decoder.skip(stride - 1)
+        prof.lap("decode", t)
+        t1 = time.perf_counter()
+        prepared = prepare(frame)
+        t2 = time.perf_counter()
+        timings["decode"] += t1 - t0
+        timings["process"] += t2 - t1
+        emit(frame_idx, timestamp_ms, prepared)
+
+
+def _run_threaded(decoder, prepare, emit, timings, n_threads, queue_size, prof=NULL_PROFILER, stride=1):
+    """
+    Decode on one thread, process on n_threads, emit in frame order on the caller.
+
+    Stages talk over bounded queues, so a slow stage blocks the ones feeding it
+    and at most ~2*queue_size + n_threads frames are in memory at once. Frames
+    are reassembled in decode order before emit(), which keeps the temporal
+    continuity of the histogram search identical to the serial path. OpenCV
+    releases the GIL while decoding, remapping and thresholding, so the stages
+    genuinely overlap.
+    """
+    decode_q = queue.Queue(maxsize=queue_size)
+    result_q = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    done = object()
+    thread_timings = [collections.defaultdict(float) for _ in range(n_threads + 1)]
+
+    def put(q, item):
+        # blocking put that gives up once the run is being torn down
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(q):
+        # blocking get that returns done once the run is being torn down
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return done
+
+    def decode(t):
+        try:
+            seq = 0
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                t_prof = prof.now()
+                got = decoder.read()
+                if got is None:
+                    break
+                frame_idx, timestamp_ms, frame = got
+                decoder.skip(stride - 1)
+                prof.lap("decode", t_prof)
+                t["decode"] += time.perf_counter() - t0
+                if not put(decode_q, (seq, (frame_idx, timestamp_ms), frame)):
+                    return
+                seq += 1
+        except Exception as e:  # surface decoder errors on the emitting thread
+            put(result_q, (None, e, None))
+        finally:
+            for _ in range(n_threads):
+                put(decode_q, done)
+
+    def worker(t):
+        try:
+            while True:
+                item = get(decode_q)
+                if item is done:
+                    break
+                seq, frame_info, frame = item
+                t0 = time.perf_counter()
+                prepared = prepare(frame)
+                t["process"] += time.perf_counter() - t0
+                if not put(result_q, (seq, frame_info, prepared)):
+                    return
+        except Exception as e:
+            put(result_q, (None, e, None))
+        finally:
+            put(result_q, done)
+
+    threads = [threading.Thread(target=decode, args=(thread_timings[0],), daemon=True)]
+    threads += [threading.Thread(target=worker, args=(thread_timings[i + 1],), daemon=True)
+                for i in range(n_threads)]
+    for th in threads:
+        th.start()
+
+    pending = {}
+    next_seq = 0
+    workers_left = n_threads
+    try:
+        while workers_left:
+            t0 = time.perf_counter()
+            item = result_q.get()
+            timings["emit_wait"] += time.perf_counter() - t0
+            if item is done:
+                workers_left -= 1
+                continue
+            seq, frame_info, prepared = item
+            if seq is None:
+                raise frame_info  # exception forwarded from a stage thread
+            pending[seq] = (*frame_info, prepared)
+            while next_seq in pending:
+                emit(*pending.pop(next_seq))
+                next_seq += 1
+    finally:
+        stop.set()
+        for th in threads:
+            th.join()
+
+    for t in thread_timings:
+        for k, v in t.items():
+            timings[k] += v
+
+
+def measurement_row(m, track=False):
+    """Output values (cm, lane_y, confidence, *tracked) of a LaneMeasurement; NaN / NO_LANE without a lane."""
+    row = (m.cm_to_lane, m.lane_y, m.confidence) if m.band else (np.nan, NO_LANE, 0.0)
+    if track:
+        row += (np.nan if m.smoothed_cm is None else m.smoothed_cm,
+                np.nan if m.innovation is None else m.innovation)
+    return row
+
+
+def print_stage_timings(timings, n_frames):
+    print("\n[stage timings]")
+    n = max(n_frames, 1)
+    for stage in ("decode", "process", "search", "csv", "encode", "emit_wait"):
+        if stage in timings:
+            print(f"  {stage:<10} {timings[stage]:8.2f} s total  {timings[stage] / n * 1000:7.2f} ms/frame")
+
+
+def measure_video(video_path, homog_path, wheel, calib_path, out_csv_path,
+                  out_video_path=None, progress=True, threads=0, queue_size=16,
+                  out_detections_path=None, out_profile_path=None, stride=1, target_hz=None,
+                  debug_mode="all", debug_every=10, debug_scale=1.0, debug_context=15,
+                  out_npz_path=None, birdseye=False, track=False, decoder="opencv", luma=False,
+                  decode_threads=0, downscale=1.0, points=None):
+    """
+    Measure lateral lane position for every frame of a video, without any GUI.
+
+    wheel is the (x, y) reference point in undistorted pixels. The CSV is written
+    to a temporary file and renamed into place once the whole video has been
+    processed, so an existing out_csv_path always means a complete result.
+    Whole undistorted frames are thresholded for the measurement (see
+    engine.LaneMeasurer), with or without a debug video.
+
+    Rows (see output.MEASUREMENT_COLUMNS) hold the frame index, cm_to_lane,
+    video time, UTC time of day (from the recording start in the file name,
+    see utils.extract_aest_from_filename), lane pixel row and detection
+    confidence. They are buffered and written in blocks by
+    output.MeasurementWriter, which also writes them to out_npz_path as a
+    columnar .npz when given; summary statistics are accumulated on the way,
+    so memory use does not grow with the length of the video.
+
+    out_video_path, if given, receives a debug video (see debug_video.DebugVideo)
+    encoded on a background thread: debug_mode "all" writes every measured
+    frame, "every" every debug_every-th one, "events" only debug_context frames
+    either side of failed detections and jumps; debug_scale < 1 downscales it.
+    debug_mode "off" (or out_video_path=None) skips the encoder entirely.
+
+    threads > 0 runs decoding, frame processing (threads workers) and CSV/video
+    output as a pipeline over bounded queues of queue_size frames; the output is
+    identical to the serial path.
+
+    out_detections_path, if given, receives the raw per-frame pixel detections
+    (see sidecar.open_detections) so the CSV can later be recomputed under a
+    different homography or wheel offset with sidecar.remeasure(). Runs that
+    write no sidecar (see below) remove one left there by an earlier run.
+
+    stride > 1 processes only every stride-th frame (the others are skipped
+    with grab(), without retrieval); target_hz picks the stride from the
+    video's frame rate instead. Rows keep the source frame index and
+    timestamp, and the histogram search's MAX_JUMP continuity window is
+    scaled by the stride.
+
+    birdseye=True detects in a top-down, fixed cm-per-pixel road patch around
+    the wheel, remapped from the raw frame in one step (see birdseye.py). Its
+    detections depend on the homography, so no detections sidecar is written.
+
+    track=True follows the lane with a Kalman filter and processes only a
+    window of rows around its prediction (see engine.LaneMeasurer); rows gain
+    the output.TRACKING_COLUMNS. Each window depends on the previous frame, so
+    with threads > 0 only decoding runs ahead on its own thread. The sidecar
+    can't carry the tracker state, so none is written.
+
+    decoder picks the decode backend (see decoder.DECODERS): "opencv"
+    (cv2.VideoCapture) or "ffmpeg" (an ffmpeg subprocess piping raw luma,
+    with per-frame PTS from ffprobe). luma=True decodes straight to grey,
+    skipping the BGR conversion ("ffmpeg" always does); with "opencv" the
+    decoder does the same work either way, so it saves little and can be
+    slower than BGR. decode_threads sets
+    the decoder's own thread count (0 = backend default). downscale < 1
+    shrinks frames while decoding and measures at that resolution (see
+    engine.LaneMeasurer); lane_y stays in full-resolution rows, the debug
+    video is at the decoded size and no detections sidecar is written.
+    Default settings give output identical to plain cv2.VideoCapture BGR
+    decoding; luma and downscale change cm_to_lane slightly.
+
+    points, a list of points.ReferencePoint (see points.load_points),
+    measures several named reference points in the same pass instead of
+    wheel (which is then ignored): the frame is decoded, undistorted and
+    thresholded once for all of them (see engine.MultiPointMeasurer) and each
+    row holds every point's columns (output.point_columns). No detections
+    sidecar is written, the debug video follows the first point and the
+    returned statistics are the first point's, with every point's under
+    "points".
+
+    out_profile_path, if given, turns on per-stage profiling (decode, undistort,
+    ... encode, csv; see profiling.STAGES) and receives a JSON report with
+    per-frame percentiles and histograms for each stage.
+
+    Returns summary statistics (see stats.RunningStats) plus per-stage seconds under
+    "stage_seconds" and, when profiling, the profile report under "profile".
+    """
+    from tqdm import tqdm  # progress bar only; keeps the engine importable without it
+
+    dec = open_decoder(video_path, decoder, luma, decode_threads, downscale)
+    total_frames_meta = dec.frame_count  # metadata
+
+    # fps fallback (some containers report 0)
+    fps = dec.fps
+    if not fps or fps <= 1:
+        fps = 30.0
+
+    if target_hz:
+        stride = stride_for_hz(fps, target_hz)
+    stride = max(1, int(stride))
+
+    frame_size = dec.source_size
+
+    # undistortion maps (cached on disk), scratch images and projected wheel point are
+    # set up once; the debug video undistorts its own (full) frames on the encoder thread
+    try:
+        if points:
+            measurer = MultiPointMeasurer.from_files(calib_path, homog_path, points, frame_size,
+                                                     birdseye=birdseye, track=track, decoded_size=dec.frame_size)
+        else:
+            measurer = LaneMeasurer.from_files(calib_path, homog_path, wheel, frame_size, birdseye=birdseye,
+                                               track=track, decoded_size=dec.frame_size)
+    except BaseException:
+        dec.release()
+        raise
+    measurers = measurer.measurers if points else (measurer,)
+    for m in measurers:
+        m.max_jump = m.base_max_jump * stride
+    # the sidecar only reproduces plain runs: no tracker state, no patch/downscale geometry, one point
+    stale_detections_path = None
+    if birdseye or track or points or measurer.to_decoded is not None:
+        stale_detections_path, out_detections_path = out_detections_path, None
+    pt_wheel = measurer.wheel  # in decoded-frame pixels
+    prof = StageProfiler() if out_profile_path is not None else NULL_PROFILER
+
+    debug = None
+    if out_video_path is not None and debug_mode != "off":
+        debug = DebugVideo(out_video_path, fps / stride, dec.frame_size, measurer.maps, pt_wheel,
+                           mode=debug_mode, every=debug_every, scale=debug_scale, context=debug_context,
+                           max_jump=measurers[0].max_jump, prof=prof)
+
+    timings = collections.defaultdict(float)
+    reuse = threads == 0  # FrameBuffers can only be shared when frames are prepared one at a time
+
+    def prepare(frame):
+        if track:  # windowed processing happens in order, in emit()
+            return None, None, frame
+        binary, x0 = measurer.prepare(frame, prof, reuse)
+        return binary, x0, frame if debug is not None else None
+
+    utc_start_s = utc_seconds_from_filename(video_path)
+    if points:
+        out = MultiPointWriter(out_csv_path, measurer.names, out_npz_path, utc_start_s, tracking=track)
+    else:
+        out = MeasurementWriter(out_csv_path, out_npz_path, utc_start_s, tracking=track)
+    detections = open_detections(out_detections_path) if out_detections_path is not None else None
+    t_start = time.perf_counter()
+    try:
+        with tqdm(total=-(-total_frames_meta // stride) if total_frames_meta > 0 else None, unit="frame",
+                  disable=not progress) as pbar:
+
+            # ordered stage: histogram search (needs the previous detection), CSV, debug video
+            def emit(frame_idx, timestamp_ms, prepared):
+                binary, x0, frame = prepared
+                t0 = time.perf_counter()
+                if track:
+                    m = measurer.process_frame(frame, frame_idx, timestamp_ms, prof)
+                else:
+                    m = measurer.measure(binary, x0, frame_idx, timestamp_ms, prof)
+                t1 = time.perf_counter()
+                t = prof.now()
+                if points:
+                    out.append(frame_idx, timestamp_ms, *(measurement_row(pm, track) for pm in m))
+                    m = m[0]
+                else:
+                    out.append(frame_idx, timestamp_ms, *measurement_row(m, track))
+                if detections is not None:
+                    detections.append(frame_idx, timestamp_ms, *(m.band or (NO_LANE, NO_LANE, NO_LANE, 0.0)))
+                prof.lap("csv", t)
+                t2 = time.perf_counter()
+
+                if debug is not None:
+                    pt_lane = (pt_wheel[0], measurer.decoded_row(m.lane_y)) if m.band else None
+                    debug.submit(frame_idx, frame, pt_lane, m.cm_to_lane)
+                    timings["encode"] += time.perf_counter() - t2
+
+                timings["process" if track else "search"] += t1 - t0
+                timings["csv"] += t2 - t1
+                pbar.update(1)
+
+            if threads > 0:
+                _run_threaded(dec, prepare, emit, timings, threads, queue_size, prof, stride)
+            else:
+                _run_serial(dec, prepare, emit, timings, prof, stride, reuse_frame=debug is None)
+    except BaseException:
+        out.abort()
+        if detections is not None:
+            detections.abort()
+        raise
+    finally:
+        dec.release()
+        if debug is not None:
+            t0 = time.perf_counter()
+            debug.close()  # drain the encoder queue
+            timings["encode"] += time.perf_counter() - t0
+
+    # sidecar first: a finished CSV always has its detections next to it
+    if detections is not None:
+        detections.close(**detection_metadata(pt_wheel, frame_size, fps, video_path, measurer.column_width))
+    elif stale_detections_path is not None and os.path.exists(stale_detections_path):
+        os.remove(stale_detections_path)  # from an earlier run; it would not reproduce this CSV
+    stats = out.close()
+    stats["seconds"] = time.perf_counter() - t_start
+    stats["stage_seconds"] = dict(timings)
+    stats["stride"] = stride
+    if debug is not None:
+        stats["debug_frames"] = debug.frames_written
+    if out_profile_path is not None:
+        stats["profile"] = prof.report(
+            stats["frames_total"], stats["seconds"], video=video_path, frame_size=frame_size,
+            mode="birdseye" if birdseye else "image", threads=threads, stride=stride, track=track,
+            points=measurer.names if points else None,
+            decoder=decoder, luma=dec.luma, decode_threads=decode_threads, decoded_size=dec.frame_size,
+            debug_video=debug.mode if debug is not None else "off",
+        )
+        save_profile(out_profile_path, stats["profile"])
+    return stats
@@ -0,0 +1,54 @@
+import json
+import re
+from typing import NamedTuple, Optional, Tuple
+
+DIRECTIONS = ("up", "down")
+_NAME = re.compile(r"^[A-Za-z0-9_-]+$")  # point names end up in column names
+
+
+class ReferencePoint(NamedTuple):
+    name: str                            # column suffix, e.g. "front" -> cm_to_lane_front
+    wheel: Tuple[int, int]               # (x, y) in undistorted pixels
+    wheel_offset_cm: Optional[float] = None   # None = configured wheel_offset_cm
+    direction: str = "up"                # lane line above ("up") or below ("down") the point in the frame
+    homography: Optional[str] = None     # homography JSON for this point (None = the run's)
+
+
+def check_points(points):
+    """Validate a list of ReferencePoints (unique names, known directions); returns it as a list."""
+    points = list(points)
+    if not points:
+        raise ValueError("No reference points given")
+    seen = set()
+    for p in points:
+        if not _NAME.match(p.name):
+            raise ValueError(f"Reference point name {p.name!r} must be letters, digits, '_' or '-'")
+        if p.name in seen:
+            raise ValueError(f"Duplicate reference point name {p.name!r}")
+        if p.direction not in DIRECTIONS:
+            raise ValueError(f"Reference point {p.name!r}: direction must be one of {DIRECTIONS}, "
+                             f"got {p.direction!r}")
+        seen.add(p.name)
+    return points
+
+
+def load_points(path):
+    """
+    Reference points from a JSON list of objects with name, x, y and
+    optionally wheel_offset_cm, direction and homography, e.g.
+
+        [{"name": "front", "x": 812, "y": 640},
+         {"name": "rear", "x": 240, "y": 655, "wheel_offset_cm": 70, "homography": "rear_homography.json"}]
+    """
+    with open(path, "r") as f:
+        rows = json.load(f)
+    points = []
+    for i, row in enumerate(rows, 1):
+        missing = [k for k in ("name", "x", "y") if row.get(k) in (None, "")]
+        if missing:
+            raise RuntimeError(f"Reference point {i} in {path} is missing {', '.join(missing)}")
+        offset = row.get("wheel_offset_cm")
+        points.append(ReferencePoint(str(row["name"]), (int(float(row["x"])), int(float(row["y"]))),
+                                     None if offset in (None, "") else float(offset),
+                                     row.get("direction") or "up", row.get("homography") or None))
+    return check_points(points)
@@ -0,0 +1,157 @@
+import json
+import math
+import os
+import platform
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from . import config
+
+# pipeline stages in processing order (a run only reports the ones it executed)
+STAGES = ("decode", "undistort", "grayscale", "blur", "threshold", "contours", "morphology",
+          "search", "projection", "overlay", "encode", "csv")
+
+# fixed log-spaced histogram bins (ms, 4 per decade) so reports from different runs line up
+HISTOGRAM_EDGES_MS = np.round(np.geomspace(1e-3, 1e4, 29), 6)
+PERCENTILES = (50, 90, 95, 99)
+
+# samples are counted on a finer grid of the same range (64 bins per decade, 16 per report bin):
+# memory stays fixed however long the video, and percentiles come out within ~2% of the exact ones
+FINE_BINS_PER_DECADE = 64
+_FINE_LOG_NS = 3  # log10 of HISTOGRAM_EDGES_MS[0] in ns
+_FINE_BINS = (len(HISTOGRAM_EDGES_MS) - 1) * FINE_BINS_PER_DECADE // 4
+FINE_EDGES_MS = np.geomspace(1e-3, 1e4, _FINE_BINS + 1)
+
+
+class StageProfiler:
+    """
+    Per-frame wall-clock timings of each pipeline stage (perf_counter_ns).
+
+    Stages are timed as laps: t = prof.lap("blur", t) records the time since t
+    and returns the current time, so back-to-back stages share one clock read.
+    Each stage keeps a count, sum, min and max plus counts on fixed
+    log-spaced bins (FINE_EDGES_MS), so memory does not grow with the video;
+    percentiles are interpolated from the bins. A lock makes the profiler
+    safe to share between processing threads.
+    """
+
+    def __init__(self):
+        self.totals = {stage: [0, 0, math.inf, 0] for stage in STAGES}  # count, sum, min, max (ns)
+        self.bins = {stage: [0] * _FINE_BINS for stage in STAGES}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def now():
+        return time.perf_counter_ns()
+
+    def lap(self, stage, t0):
+        t = time.perf_counter_ns()
+        ns = t - t0
+        i = int((math.log10(ns) - _FINE_LOG_NS) * FINE_BINS_PER_DECADE) if ns > 1000 else 0
+        with self._lock:
+            tot = self.totals[stage]
+            tot[0] += 1
+            tot[1] += ns
+            if ns < tot[2]:
+                tot[2] = ns
+            if ns > tot[3]:
+                tot[3] = ns
+            self.bins[stage][i if i < _FINE_BINS else _FINE_BINS - 1] += 1
+        return t
+
+    def percentiles(self, stage, percentiles=PERCENTILES):
+        """Percentiles (ms) of one stage, interpolated within the log-spaced bins and kept in [min, max]."""
+        count, _, lo_ns, hi_ns = self.totals[stage]
+        counts = np.asarray(self.bins[stage], dtype=np.float64)
+        cum = np.cumsum(counts)
+        out = []
+        for p in percentiles:
+            rank = p / 100 * (count - 1)  # 0-based, as np.percentile
+            i = int(np.searchsorted(cum, rank, side="right"))
+            frac = (rank - (cum[i] - counts[i]) + 0.5) / counts[i]
+            lo, hi = FINE_EDGES_MS[i], FINE_EDGES_MS[i + 1]
+            out.append(float(np.clip(lo * (hi / lo) ** frac, lo_ns / 1e6, hi_ns / 1e6)))
+        return out
+
+    def report(self, n_frames, wall_seconds, **meta):
+        """Per-stage totals, percentiles and histograms plus run/machine metadata (JSON-ready)."""
+        stages = {}
+        for stage, (count, total_ns, _, max_ns) in self.totals.items():
+            if not count:
+                continue
+            counts = np.asarray(self.bins[stage]).reshape(len(HISTOGRAM_EDGES_MS) - 1, -1).sum(axis=1)
+            stages[stage] = {
+                "count": count,
+                "total_s": total_ns / 1e9,
+                "mean_ms": total_ns / count / 1e6,
+                **{f"p{p}_ms": v for p, v in zip(PERCENTILES, self.percentiles(stage))},
+                "max_ms": max_ns / 1e6,
+                "histogram_counts": counts.tolist(),
+            }
+        return {
+            "frames": n_frames,
+            "wall_seconds": wall_seconds,
+            "frames_per_second": n_frames / wall_seconds if wall_seconds > 0 else None,
+            **meta,
+            "stages": stages,
+            "histogram_edges_ms": HISTOGRAM_EDGES_MS.tolist(),
+            "machine": machine_info(),
+            "config": config_snapshot(),
+        }
+
+
+def machine_info():
+    """Where a timing was taken (JSON-ready)."""
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "opencv_threads": cv2.getNumThreads(),
+    }
+
+
+def config_snapshot():
+    """Effective config.json tunables, so reports from different settings can be compared."""
+    return {k: v for k, v in vars(config).items() if k.isupper() and not k.endswith(("_DIR", "_FILE"))}
+
+
+class _NullProfiler:
+    """Stand-in when profiling is off: no clock reads, nothing recorded."""
+
+    @staticmethod
+    def now():
+        return 0
+
+    @staticmethod
+    def lap(stage, t0):
+        return 0
+
+
+NULL_PROFILER = _NullProfiler()
+
+
+def profile_path_for(out_csv_path):
+    """Profile report path that goes with a measurements CSV."""
+    base = out_csv_path[:-len("_measurements.csv")] if out_csv_path.endswith("_measurements.csv") \
+        else os.path.splitext(out_csv_path)[0]
+    return base + "_profile.json"
+
+
+def save_profile(path, report):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def print_profile(report):
+    print("\n[stage profile]  (ms per frame)")
+    print(f"  {'stage':<11}{'count':>7}{'mean':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+    for stage, s in report["stages"].items():
+        print(f"  {stage:<11}{s['count']:>7}{s['mean_ms']:>9.3f}{s['p50_ms']:>9.3f}"
+              f"{s['p90_ms']:>9.3f}{s['p99_ms']:>9.3f}{s['max_ms']:>9.3f}")
@@ -0,0 +1,92 @@
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+from . import config
+from .undistort import UndistortMaps
+
+Rect = Tuple[int, int, int, int]  # (x0, y0, x1, y1), end-exclusive
+
+
+class StripROI(NamedTuple):
+    rect: Rect            # region of the undistorted frame that gets processed
+    src_rect: Rect        # region of the raw (distorted) frame it is sampled from
+    maps: UndistortMaps   # remap tables for src_rect -> rect
+
+
+def strip_margins(params=None) -> Tuple[int, int]:
+    """
+    Extra (x, y) pixels kept around the histogram strip for a strip store
+    (framestore.build_frame_store).
+
+    Blur and adaptive threshold read half a kernel/block around each pixel and
+    close+open is four passes of the morphology kernel; ROI_CONTOUR_MARGIN is
+    headroom for the contours near the strip, which the area/aspect filter
+    classifies from their bounding boxes. A contour that still reaches the
+    strip's edge can be classified differently than in the whole frame, so
+    results on a strip only approximate whole-frame processing. params:
+    optional detection.DetectionParams instead of the configured kernel sizes.
+    """
+    gx, gy = config.GAUSSIAN_KERNEL if params is None else params.gaussian_kernel
+    kx, ky = config.MORPH_KERNEL if params is None else params.morph_kernel
+    half_block = (config.BLOCK_SIZE if params is None else params.block_size) // 2
+    mx = gx // 2 + half_block + 4 * kx + config.ROI_CONTOUR_MARGIN
+    my = gy // 2 + half_block + 4 * ky + config.ROI_CONTOUR_MARGIN
+    return mx, my
+
+
+def strip_rect(wheel_x: int, wheel_y: int, frame_size: Tuple[int, int], params=None, below=False) -> Rect:
+    """
+    Undistorted-frame rectangle covering the histogram strip plus margins. The
+    strip runs from row 0 down to the wheel, or with below=True from the wheel
+    to the bottom row.
+    """
+    w, h = frame_size
+    mx, my = strip_margins(params)
+    column_width = config.COLUMN_WIDTH if params is None else params.column_width
+    x0 = max(0, wheel_x - column_width - mx)
+    x1 = min(w, wheel_x + column_width + mx)
+    if below:
+        return x0, max(0, wheel_y - my), x1, h
+    return x0, 0, x1, min(h, wheel_y + my)
+
+
+def crop_maps(maps: UndistortMaps, rect: Rect, frame_size: Tuple[int, int]) -> Tuple[Rect, UndistortMaps]:
+    """
+    Back-project an undistorted rectangle through fixed-point remap tables.
+
+    Returns the bounding rectangle of the raw frame the rectangle samples from,
+    and remap tables relative to that crop. Remapping the crop with them gives
+    exactly the same pixels as remapping the full frame and slicing rect.
+    """
+    x0, y0, x1, y1 = rect
+    w, h = frame_size
+    map1 = maps[0][y0:y1, x0:x1]
+    map2 = maps[1][y0:y1, x0:x1]
+
+    # bilinear sampling reads the integer source pixel and its +1 neighbours
+    sx0 = int(np.clip(map1[..., 0].min(), 0, w))
+    sy0 = int(np.clip(map1[..., 1].min(), 0, h))
+    sx1 = int(np.clip(int(map1[..., 0].max()) + 2, 0, w))
+    sy1 = int(np.clip(int(map1[..., 1].max()) + 2, 0, h))
+
+    shifted = map1.astype(np.int32) - np.array([sx0, sy0], dtype=np.int32)
+    return (sx0, sy0, sx1, sy1), (shifted.astype(np.int16), np.ascontiguousarray(map2))
+
+
+def make_roi(maps: UndistortMaps, rect: Rect, frame_size: Tuple[int, int]) -> StripROI:
+    """Precompute everything needed to process only rect of the undistorted frame."""
+    src_rect, roi_maps = crop_maps(maps, rect, frame_size)
+    return StripROI(rect, src_rect, roi_maps)
+
+
+def frame_roi(maps: UndistortMaps, frame_size: Tuple[int, int]) -> StripROI:
+    """The whole undistorted frame as a StripROI (no cropping)."""
+    w, h = frame_size
+    return StripROI((0, 0, w, h), (0, 0, w, h), maps)
+
+
+def make_strip_roi(maps: UndistortMaps, wheel_x: int, wheel_y: int, frame_size: Tuple[int, int],
+                   params=None, below=False) -> StripROI:
+    """Precompute everything needed to process only the strip around the wheel point."""
+    return make_roi(maps, strip_rect(wheel_x, wheel_y, frame_size, params, below), frame_size)
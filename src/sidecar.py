@@ -0,0 +1,115 @@
+import os
+
+import numpy as np
+
+from . import config
+from .detection import band_confidence, lane_strip_width
+from .homography import load_homography
+from .measurement import pixel_to_real_world, lateral_positions
+from .output import MeasurementWriter, NpzColumnWriter
+from .utils import utc_seconds_from_filename
+
+NO_LANE = -1  # lane_y / band rows for frames without a detection
+
+# per-frame columns stored in a detections sidecar, with their dtypes
+DETECTION_COLUMNS = {
+    "frame": np.int64,
+    "timestamp_ms": np.float64,
+    "lane_y": np.int32,
+    "band_top": np.int32,
+    "band_bottom": np.int32,
+    "strength": np.float32,
+}
+
+
+def detections_path_for(out_csv_path):
+    """Sidecar path that goes with a measurements CSV."""
+    base = out_csv_path[:-len("_measurements.csv")] if out_csv_path.endswith("_measurements.csv") \
+        else os.path.splitext(out_csv_path)[0]
+    return base + "_detections.npz"
+
+
+def detection_metadata(wheel, frame_size, fps, video_path, column_width):
+    """Per-run metadata arrays stored next to the DETECTION_COLUMNS in a sidecar."""
+    return {
+        "wheel": np.asarray(wheel, dtype=np.int32),
+        "frame_size": np.asarray(frame_size, dtype=np.int32),
+        "fps": np.float64(fps),
+        "video_path": np.str_(video_path),
+        "column_width": np.int32(column_width),
+    }
+
+
+def open_detections(path):
+    """
+    Streaming sidecar writer: append() one row per frame in DETECTION_COLUMNS
+    order, then close(**detection_metadata(...)).
+    """
+    return NpzColumnWriter(path, DETECTION_COLUMNS)
+
+
+def save_detections(path, columns, wheel, frame_size, fps, video_path, column_width):
+    """
+    Write raw per-frame pixel detections to an uncompressed .npz sidecar.
+
+    columns maps each DETECTION_COLUMNS name to a sequence of per-frame values.
+    Everything needed to recompute cm_to_lane and confidence without decoding
+    the video is stored: lane pixel rows, the fixed wheel point, the frame
+    size and the histogram column width.
+    """
+    writer = open_detections(path)
+    writer.extend(columns)
+    writer.close(**detection_metadata(wheel, frame_size, fps, video_path, column_width))
+
+
+def load_detections(path):
+    """Load a detections sidecar into a dict of arrays (metadata as scalars)."""
+    with np.load(path) as data:
+        out = {k: data[k] for k in data.files}
+    out["wheel"] = tuple(int(v) for v in out["wheel"])
+    out["fps"] = float(out["fps"])
+    out["video_path"] = str(out["video_path"])
+    out["column_width"] = int(out["column_width"]) if "column_width" in out else None  # older sidecars
+    return out
+
+
+def remeasure(detections_path, homog_path, out_csv_path, wheel_offset_cm=None, out_npz_path=None):
+    """
+    Recompute a measurements CSV (and optionally its .npz) from a detections
+    sidecar under a (new) homography and/or wheel offset, without touching the
+    video.
+
+    Produces exactly the files a fresh measurement run would write with the
+    same settings. Confidence uses the column width the detections were made
+    with; a different config column_width is reported, since only a full run
+    applies it. Sidecars written before the width was stored use the config
+    value. Returns summary statistics (see stats.RunningStats).
+    """
+    det = load_detections(detections_path)
+    H = load_homography(homog_path)
+    column_width = det["column_width"]
+    if column_width is None:
+        column_width = config.COLUMN_WIDTH
+        print(f"[remeasure] {detections_path} has no column_width; assuming the configured {column_width}")
+    elif column_width != config.COLUMN_WIDTH:
+        print(f"[remeasure] detections were made with column_width {column_width}, config has "
+              f"{config.COLUMN_WIDTH}; keeping {column_width} (a full run is needed to apply the new width)")
+
+    wheel_x, wheel_y = det["wheel"]
+    real_wheel = pixel_to_real_world((wheel_x, wheel_y), H)
+    lane_y = det["lane_y"]
+    found = lane_y != NO_LANE
+
+    lane_points = np.column_stack([np.full(len(lane_y), wheel_x), lane_y]).astype(np.float64)
+    cms = np.full(len(lane_y), np.nan)
+    cms[found] = lateral_positions(real_wheel, lane_points[found], H, wheel_offset_cm)
+    confidence = band_confidence(det["strength"], det["band_top"], det["band_bottom"],
+                                 lane_strip_width(wheel_x, int(det["frame_size"][0]), column_width))
+
+    writer = MeasurementWriter(out_csv_path, out_npz_path, utc_seconds_from_filename(det["video_path"]))
+    try:
+        writer.extend(det["frame"], det["timestamp_ms"], cms, lane_y, confidence)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close()
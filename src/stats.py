@@ -0,0 +1,160 @@
+import csv
+
+import numpy as np
+
+
+EXACT_MEDIAN_VALUES = 1 << 16  # values kept for an exact median before switching to binned counts
+MEDIAN_BIN = 0.01     # bin width of the binned median (cm)
+MEDIAN_RANGE = 1e4    # values beyond +-this are counted in the outermost bins
+
+
+class BinnedQuantile:
+    """
+    Streaming quantile in bounded memory.
+
+    The first exact_limit values are kept and the quantile is exact. After that
+    every value is counted on MEDIAN_BIN-wide bins that grow to span the values
+    seen (at most 2 * MEDIAN_RANGE / MEDIAN_BIN of them) and the quantile is the
+    centre of the bin it falls in, so it stays within one bin of the exact one
+    however long the stream. Each add_many() block is one np.bincount, and the
+    result does not depend on how the values are split into blocks.
+    """
+
+    def __init__(self, p=0.5, exact_limit=EXACT_MEDIAN_VALUES, bin_width=MEDIAN_BIN):
+        self.p = p
+        self.count = 0
+        self.bin_width = bin_width
+        self._exact = np.empty(exact_limit)
+        self._counts = None   # counts[i]: values in bin first_bin + i
+        self._first_bin = 0
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if self._counts is None:
+            take = min(len(values), len(self._exact) - self.count)
+            self._exact[self.count:self.count + take] = values[:take]
+            self.count += take
+            values = values[take:]
+            if not len(values):
+                return
+            self._counts = np.zeros(0, dtype=np.int64)
+            self._count_bins(self._exact)
+            self._exact = None
+        self.count += len(values)
+        self._count_bins(values)
+
+    def _count_bins(self, values):
+        limit = MEDIAN_RANGE / self.bin_width
+        bins = np.floor(np.clip(values / self.bin_width, -limit, limit - 1)).astype(np.int64)
+        lo = min(self._first_bin, int(bins.min())) if len(self._counts) else int(bins.min())
+        hi = max(self._first_bin + len(self._counts), int(bins.max()) + 1)
+        if lo != self._first_bin or hi != self._first_bin + len(self._counts):
+            grown = np.zeros(hi - lo, dtype=np.int64)
+            grown[self._first_bin - lo:self._first_bin - lo + len(self._counts)] = self._counts
+            self._counts, self._first_bin = grown, lo
+        self._counts += np.bincount(bins - lo, minlength=hi - lo)
+
+    def value(self):
+        if self.count == 0:
+            return None
+        if self._counts is None:
+            return float(np.quantile(self._exact[:self.count], self.p))
+        rank = self.p * (self.count - 1)  # 0-based, as np.quantile
+        i = int(np.searchsorted(np.cumsum(self._counts), rank, side="right"))
+        return (self._first_bin + i + 0.5) * self.bin_width
+
+
+class RunningStats:
+    """
+    Summary statistics accumulated in bounded memory: count of NaNs,
+    Welford/Chan mean and variance, min/max and a median that is exact up to
+    EXACT_MEDIAN_VALUES valid values and within MEDIAN_BIN beyond (see
+    BinnedQuantile).
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.nan_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.median = BinnedQuantile(0.5)
+
+    def add_many(self, values):
+        """Add a block of values (NaN = frame without a detection)."""
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        x = values[valid]
+        self.nan_count += len(values) - len(x)
+        if not len(x):
+            return
+        # merge the block's count/mean/M2 into the running ones (Chan et al.)
+        nb, mb = len(x), float(x.mean())
+        m2b = float(np.square(x - mb).sum())
+        n = self.n + nb
+        delta = mb - self.mean
+        self.mean += delta * nb / n
+        self.m2 += m2b + delta * delta * self.n * nb / n
+        self.n = n
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+        self.median.add_many(x)
+
+    def summary(self):
+        """Summary statistics (dict) of the valid distances and NaN count (median: see BinnedQuantile)."""
+        stats = {
+            "frames_total": self.n + self.nan_count,
+            "frames_valid": self.n,
+            "frames_nan": self.nan_count,
+        }
+        if self.n > 0:
+            stats.update(
+                mean=self.mean,
+                median=self.median.value(),
+                min=self.min,
+                max=self.max,
+                sd=float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else None,
+            )
+        return stats
+
+
+def print_summary(stats):
+    print("\n[summary statistics]")
+    frames_valid = stats["frames_valid"]
+    nan_count = stats["frames_nan"]
+    frames_total = stats["frames_total"] if stats["frames_total"] > 0 else 1
+
+    if frames_valid > 0:
+        print(f"  Frames with valid data: {frames_valid} / {frames_total} ({frames_valid/frames_total*100:.1f}%)")
+        print(f"  Frames with NaN: {nan_count} / {frames_total} ({nan_count/frames_total*100:.1f}%)")
+        print(f"  Mean:   {stats['mean']:.2f} cm")
+        print(f"  Median: {stats['median']:.2f} cm")
+        print(f"  Min:    {stats['min']:.2f} cm")
+        print(f"  Max:    {stats['max']:.2f} cm")
+        if stats["sd"] is not None:
+            print(f"  SD:     {stats['sd']:.2f} cm")
+        else:
+            print("  SD:     n/a (only one valid frame)")
+    else:
+        print(f"  Frames with valid data: 0 / {frames_total} (0.0%)")
+        print(f"  Frames with NaN: {nan_count} / {frames_total} (100.0%)")
+        print("  No valid lane detections.")
+
+
+def csv_stats(csv_path, block_size=4096):
+    """Recompute summary statistics from a finished measurements CSV (streamed in blocks)."""
+    stats = RunningStats()
+    with open(csv_path, "r", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        # cm_to_lane, or the first point's cm_to_lane_<name> in a multi-point CSV
+        col = next((i for i, k in enumerate(header or ()) if k.startswith("cm_to_lane")), 1)
+        block = []
+        for row in reader:
+            block.append(float(row[col]))
+            if len(block) == block_size:
+                stats.add_many(block)
+                block = []
+        stats.add_many(block)
+    return stats.summary()
@@ -0,0 +1,170 @@
+import functools
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from .detection import DetectionParams, FrameBuffers, binarize, search_band, band_confidence, lane_strip_width
+from .framestore import open_frame_store
+from .measurement import pixel_to_real_world, lateral_positions
+
+KERNEL_FIELDS = ("gaussian_kernel", "morph_kernel")
+
+
+def parse_grid_value(field, text):
+    """One --grid value: "15x15" (or "15") for kernels, a number otherwise."""
+    if field in KERNEL_FIELDS:
+        w, _, h = text.lower().partition("x")
+        return int(w), int(h or w)
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def expand_grid(grid, base=None):
+    """
+    Every combination of {field: [values]} applied to base (default: the
+    configured DetectionParams), in a stable order. Rejects unknown fields and
+    settings OpenCV would refuse (even blur kernels / block sizes).
+    """
+    base = DetectionParams.from_config() if base is None else base
+    unknown = set(grid) - set(DetectionParams._fields)
+    if unknown:
+        raise ValueError(f"Unknown parameter(s) {sorted(unknown)}; expected some of {DetectionParams._fields}")
+    fields = list(grid)
+    sets = [base._replace(**dict(zip(fields, values)))
+            for values in itertools.product(*(grid[f] for f in fields))]
+    for p in sets:
+        if p.block_size < 3 or p.block_size % 2 == 0 or any(k % 2 == 0 for k in p.gaussian_kernel):
+            raise ValueError(f"block_size and gaussian_kernel must be odd (block_size >= 3): {p}")
+    return sets
+
+
+def widest_params(sets):
+    """Field-wise largest blur/threshold/morphology footprint and strip width: sizes a store for all sets."""
+    first = sets[0]
+    return first._replace(
+        gaussian_kernel=tuple(max(p.gaussian_kernel[i] for p in sets) for i in range(2)),
+        morph_kernel=tuple(max(p.morph_kernel[i] for p in sets) for i in range(2)),
+        block_size=max(p.block_size for p in sets),
+        column_width=max(p.column_width for p in sets),
+    )
+
+
+def evaluate_params(store, params, H, wheel, wheel_offset_cm=None):
+    """
+    Run detection with one DetectionParams over every frame of a FrameStore.
+
+    On a full-frame store this is the same binarize() + search_band() that
+    measure_video() runs (untracked, not bird's-eye), so the scores match a
+    real run. On a strip store they are approximations: blur, adaptive
+    threshold and the contour size filter only see the strip, so lane marks
+    cut by its edges can be kept or dropped differently than in a real run.
+
+    Returns detection rate and stability figures: mean confidence, the median
+    and p95 frame-to-frame change of cm_to_lane, and "jumps", consecutive
+    detections further apart than max_jump rows (lost track / switched line),
+    plus ms per frame.
+    """
+    wheel_x, wheel_y = int(wheel[0]), int(wheel[1])
+    max_jump = params.max_jump * store.stride
+    strip_width = lane_strip_width(wheel_x, store.x0 + store.frames.shape[2], params.column_width)
+    buffers = FrameBuffers()
+    n = len(store.frames)
+    lane_y = np.full(n, np.nan)
+    confidence = np.zeros(n)
+
+    prev = None
+    t0 = time.perf_counter()
+    for i in range(n):
+        binary = binarize(store.frames[i], buffers=buffers, params=params)
+        band = search_band(binary, store.x0, wheel_x, wheel_y, prev, max_jump,
+                           params.column_width, params.min_lane_width)
+        if band is not None:
+            prev = (wheel_x, band.lane_y)
+            lane_y[i] = band.lane_y
+            confidence[i] = band_confidence(band.strength, band.top, band.bottom, strip_width)
+    seconds = time.perf_counter() - t0
+
+    found = ~np.isnan(lane_y)
+    points = np.column_stack([np.full(n, wheel_x), lane_y])
+    cm = lateral_positions(pixel_to_real_world(wheel, H), points, H, wheel_offset_cm)
+    both = found[1:] & found[:-1]
+    step_cm = np.abs(np.diff(cm))[both]
+    step_rows = np.abs(np.diff(lane_y))[both]
+    return {
+        "params": params._asdict(),
+        "frames": n,
+        "detected": int(found.sum()),
+        "detection_rate": float(found.mean()) if n else 0.0,
+        "mean_confidence": float(confidence[found].mean()) if found.any() else 0.0,
+        "mean_cm": float(cm[found].mean()) if found.any() else None,
+        "step_cm_median": float(np.median(step_cm)) if len(step_cm) else None,
+        "step_cm_p95": float(np.percentile(step_cm, 95)) if len(step_cm) else None,
+        "jumps": int((step_rows > max_jump).sum()),
+        "ms_per_frame": seconds / max(n, 1) * 1000.0,
+    }
+
+
+_worker_store = None
+
+
+def _init_sweep_worker(store_path):
+    global _worker_store
+    cv2.setNumThreads(1)  # one parameter set per process; no nested OpenCV pools
+    _worker_store = open_frame_store(store_path)
+
+
+def _evaluate_in_worker(params, H, wheel, wheel_offset_cm):
+    return evaluate_params(_worker_store, params, H, wheel, wheel_offset_cm)
+
+
+def rank_key(result):
+    """Best first: most frames detected, then fewest jumps, then the smallest typical change per frame."""
+    step = result["step_cm_median"]
+    return -result["detection_rate"], result["jumps"], np.inf if step is None else step
+
+
+def run_sweep(store, sets, H, wheel, wheel_offset_cm=None, workers=None, progress=None):
+    """
+    evaluate_params() for every set over a process pool (workers=1 runs inline).
+
+    Each worker maps the same store file, so the frames are shared through the
+    page cache rather than copied. progress(done, total) is called as sets
+    finish. Returns the results ranked by rank_key().
+    """
+    workers = min(workers or os.cpu_count() or 1, len(sets))
+    H = np.asarray(H, dtype=np.float64)
+    results = []
+    if workers <= 1:
+        for p in sets:
+            results.append(evaluate_params(store, p, H, wheel, wheel_offset_cm))
+            if progress:
+                progress(len(results), len(sets))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker,
+                                 initargs=(store.path,)) as pool:
+            evaluate = functools.partial(_evaluate_in_worker, H=H, wheel=wheel, wheel_offset_cm=wheel_offset_cm)
+            for r in pool.map(evaluate, sets):
+                results.append(r)
+                if progress:
+                    progress(len(results), len(sets))
+    return sorted(results, key=rank_key)
+
+
+def print_sweep(results, top=10):
+    changed = [f for f in DetectionParams._fields
+               if len({str(r["params"][f]) for r in results}) > 1] or list(DetectionParams._fields[:3])
+    print(f"\n[sweep] {len(results)} parameter sets, best {min(top, len(results))}:")
+    print("  " + "  ".join(f"{f:>16}" for f in changed) + "  detected  jumps  step p50/p95 cm  conf")
+    for r in results[:top]:
+        step = "n/a" if r["step_cm_median"] is None else f"{r['step_cm_median']:.2f}/{r['step_cm_p95']:.2f}"
+        print("  " + "  ".join(f"{str(r['params'][f]):>16}" for f in changed) +
+              f"  {r['detection_rate'] * 100:7.1f}%  {r['jumps']:5d}  {step:>15}  {r['mean_confidence']:.2f}")
+
+
+def default_sweep_path(video_path, out_dir=None):
+    base = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(out_dir or os.path.join("output", "sweeps"), f"{base}_sweep.json")
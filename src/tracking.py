@@ -0,0 +1,97 @@
+import math
+from typing import NamedTuple, Optional
+
+# constant-velocity Kalman filter over the lane row (search rows, per frame)
+PROCESS_NOISE = 0.5       # white acceleration (rows / frame^2) driving the velocity
+MEASUREMENT_NOISE = 2.0   # detection noise (rows, 1 sigma)
+GATE_SIGMA = 3.0          # search window / re-acquisition gate, in innovation sigmas
+MAX_MISSES = 5            # consecutive frames without a detection before the track is dropped
+
+
+class TrackState(NamedTuple):
+    predicted: float              # row predicted from the previous frames
+    smoothed: float               # filtered row after this frame (= predicted when coasting)
+    velocity: float               # rows per frame
+    innovation: Optional[float]   # detected minus predicted row (None: no detection / new track)
+    sigma: float                  # innovation standard deviation (rows)
+
+
+class LaneTracker:
+    """
+    Constant-velocity Kalman filter on the lane row.
+
+    predict(dt) advances the track by dt frames (dt > 1 for strides or
+    dropped live frames) and gives the row and innovation sigma to search
+    around; update(row) then folds in the detection, or coasts on None. A
+    detection outside the gate (GATE_SIGMA sigmas) restarts the track there,
+    and after max_misses frames in a row without one the track is dropped, so
+    the caller searches the full column again.
+    """
+
+    def __init__(self, process_noise=PROCESS_NOISE, measurement_noise=MEASUREMENT_NOISE,
+                 gate_sigma=GATE_SIGMA, max_misses=MAX_MISSES):
+        self.q = process_noise ** 2
+        self.r = measurement_noise ** 2
+        self.gate_sigma = gate_sigma
+        self.max_misses = max_misses
+        self.reset()
+
+    @property
+    def tracking(self):
+        return self.y is not None
+
+    def reset(self):
+        self.y = self.v = None
+        self.misses = 0
+        self._pred = None
+
+    def _start(self, row):
+        self.y, self.v = float(row), 0.0
+        # velocity unknown: wide enough that the next frame's window covers a lane moving a few rows/frame
+        self.p00, self.p01, self.p11 = self.r, 0.0, 25.0
+        self.misses = 0
+
+    def predict(self, dt=1):
+        """(predicted row, innovation sigma) for the next frame, or None when there is no track."""
+        if self.y is None:
+            self._pred = None
+            return None
+        dt = float(dt)
+        q = self.q
+        y = self.y + self.v * dt
+        p00 = self.p00 + dt * (2 * self.p01 + dt * self.p11) + q * dt ** 4 / 4
+        p01 = self.p01 + dt * self.p11 + q * dt ** 3 / 2
+        p11 = self.p11 + q * dt ** 2
+        self._pred = (y, p00, p01, p11)
+        return y, math.sqrt(p00 + self.r)
+
+    def update(self, row=None):
+        """Fold in this frame's detected row (None = no lane); returns the TrackState or None."""
+        if self._pred is None:
+            if row is None:
+                return None
+            self._start(row)
+            return TrackState(float(row), float(row), 0.0, None, math.sqrt(self.p00 + self.r))
+
+        y, p00, p01, p11 = self._pred
+        self._pred = None
+        sigma = math.sqrt(p00 + self.r)
+        if row is None:
+            self.y, self.p00, self.p01, self.p11 = y, p00, p01, p11
+            self.misses += 1
+            if self.misses > self.max_misses:
+                self.reset()
+            return TrackState(y, y, self.v, None, sigma)
+
+        innovation = row - y
+        if abs(innovation) > self.gate_sigma * sigma:  # a different line (or a jump): start over there
+            self._start(row)
+            return TrackState(y, float(row), 0.0, innovation, sigma)
+
+        s = p00 + self.r
+        k0, k1 = p00 / s, p01 / s
+        self.y = y + k0 * innovation
+        self.v += k1 * innovation
+        self.p00, self.p01, self.p11 = (1 - k0) * p00, (1 - k0) * p01, p11 - k1 * p01
+        self.misses = 0
+        return TrackState(y, self.y, self.v, innovation, sigma)
@@ -0,0 +1,82 @@
+import hashlib
+import os
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from . import config
+
+UndistortMaps = Tuple[np.ndarray, np.ndarray]
+
+
+def load_intrinsics(calib_path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Load (camera_matrix, dist_coeffs) from a run_calibration.py .npz file."""
+    if not os.path.exists(calib_path):
+        raise RuntimeError("No calibration found. Run calibration first.")
+    calib = np.load(calib_path)
+    return calib["camera_matrix"], calib["dist_coeffs"]
+
+
+def intrinsics_key(camera_matrix, dist_coeffs, image_size: Tuple[int, int]) -> str:
+    """Stable cache key for a set of intrinsics at a given (w, h) image size."""
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(camera_matrix, dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(dist_coeffs, dtype=np.float64).ravel().tobytes())
+    w, ht = int(image_size[0]), int(image_size[1])
+    return f"{h.hexdigest()[:16]}_{w}x{ht}"
+
+
+def build_undistort_maps(camera_matrix, dist_coeffs, image_size: Tuple[int, int]) -> UndistortMaps:
+    """
+    Build fixed-point (CV_16SC2) remap tables equivalent to cv2.undistort().
+
+    The new camera matrix is the original one, as cv2.undistort() does by default,
+    so remapping with these tables reproduces its output exactly.
+    """
+    map1, map2 = cv2.initUndistortRectifyMap(
+        camera_matrix, dist_coeffs, None, camera_matrix,
+        (int(image_size[0]), int(image_size[1])), cv2.CV_16SC2
+    )
+    return map1, map2
+
+
+def get_undistort_maps(
+    camera_matrix,
+    dist_coeffs,
+    image_size: Tuple[int, int],
+    cache_dir: Optional[str] = config.UNDISTORT_CACHE_DIR,
+) -> UndistortMaps:
+    """
+    Return remap tables for the given intrinsics, building them only once.
+
+    Maps are cached on disk under cache_dir, keyed by intrinsics hash and image
+    size. Pass cache_dir=None to skip the disk cache.
+    """
+    if cache_dir is None:
+        return build_undistort_maps(camera_matrix, dist_coeffs, image_size)
+
+    cache_path = os.path.join(
+        cache_dir, f"undistort_{intrinsics_key(camera_matrix, dist_coeffs, image_size)}.npz"
+    )
+    if os.path.exists(cache_path):
+        try:
+            cached = np.load(cache_path)
+            return cached["map1"], cached["map2"]
+        except (OSError, KeyError, ValueError):
+            pass  # corrupt/partial cache entry -> rebuild below
+
+    map1, map2 = build_undistort_maps(camera_matrix, dist_coeffs, image_size)
+
+    # write-then-rename so concurrent runs never see a half-written file
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, map1=map1, map2=map2)
+    os.replace(tmp_path, cache_path)
+    return map1, map2
+
+
+def undistort(frame: np.ndarray, maps: UndistortMaps, dst: Optional[np.ndarray] = None) -> np.ndarray:
+    """Undistort a frame with precomputed maps (same result as cv2.undistort)."""
+    return cv2.remap(frame, maps[0], maps[1], cv2.INTER_LINEAR, dst=dst,
+                     borderMode=cv2.BORDER_CONSTANT)
@@ -18,6 +18,13 @@ def utc_to_decimal(utc_time):
     midnight = utc_time.replace(hour=0, minute=0, second=0, microsecond=0)
     return round((utc_time - midnight).total_seconds(), 1)
 
+# UTC seconds since midnight at the recording start in the filename (None if absent)
+def utc_seconds_from_filename(filename):
+    aest_time = extract_aest_from_filename(os.path.basename(filename))
+    if aest_time is None:
+        return None
+    return utc_to_decimal(convert_aest_to_utc(aest_time))
+
 def find_file(base_dir, ext="*.npz"):
     matches = glob.glob(os.path.join(base_dir, "**", ext), recursive=True)
     if len(matches) == 0: